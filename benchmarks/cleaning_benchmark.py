@@ -0,0 +1,114 @@
+"""Compares the chained pandas cleaning of the game data text columns with the single-pass rules of processor.py.
+
+Usage:
+    python benchmarks/cleaning_benchmark.py [--rows N] [--repeat N]
+
+Synthetic abilities, items and moves tables are generated with long, messy descriptions (newlines, runs of whitespace, quotes,
+colons, missing values and the separators the cleaning truncates on). Every table is cleaned the old way, one pandas .str call at
+a time, and with the clean_*_data functions, and both must produce exactly the same values. Only the dtype may differ: under
+pandas 3, .str.split(...).str[0] turns the string column into an object column, which writes the same CSV.
+
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from datacollection import processor  # noqa: E402
+
+WORDS = ["Raises", "the", "user's", "Attack", "by", "one", "stage", "Pokémon", "holder", "\n", "  ", "\t", '"', ":", " : "]
+
+
+def description(rng, words):
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    if rng.random() < 0.3:
+        text += " Overworld: " + " ".join(rng.choice(WORDS) for _ in range(words // 4))
+    if rng.random() < 0.3:
+        text += " Used on a party Pokémon: " + " ".join(rng.choice(WORDS) for _ in range(words // 4))
+    return text
+
+
+def column(rng, rows, words):
+    return [None if rng.random() < 0.02 else description(rng, words) for _ in range(rows)]
+
+
+def synthetic_tables(rows, seed=0):
+    rng = random.Random(seed)
+    return {
+        "abilities": pd.DataFrame({"ability_id": range(rows), "description": column(rng, rows, 60)}),
+        "items": pd.DataFrame({"item_id": range(rows), "item_description": column(rng, rows, 60)}),
+        "moves": pd.DataFrame(
+            {"move_id": range(rows), "long_effect": column(rng, rows, 80), "short_effect": column(rng, rows, 20)}
+        ),
+    }
+
+
+def chained_abilities(df):
+    df = df.drop_duplicates()
+    df["description"] = df["description"].fillna("").astype(str)
+    df["description"] = df["description"].str.split("Overworld:", n=1).str[0]
+    df["description"] = df["description"].str.replace("\n", "", regex=False).str.strip()
+    df["description"] = df["description"].str.replace(r"\s*.\n\s*", "", regex=True)
+    df["description"] = df["description"].str.replace(r"\s+", " ", regex=True)
+    df["description"] = df["description"].str.replace('"', "")
+    return df
+
+
+def chained_items(df):
+    df = df.drop_duplicates()
+    df["item_description"] = df["item_description"].fillna("").astype(str)
+    df["item_description"] = df["item_description"].str.split("Used on a", n=1).str[0]
+    df["item_description"] = df["item_description"].str.replace("\n", "", regex=False).str.strip()
+    df["item_description"] = df["item_description"].str.replace(r"\s*:\s*", ": ", regex=True)
+    df["item_description"] = df["item_description"].str.replace(r"\s+", " ", regex=True)
+    df["item_description"] = df["item_description"].str.replace('"', "")
+    return df
+
+
+def chained_moves(df):
+    df = df.drop_duplicates()
+    for name in ["long_effect", "short_effect"]:
+        df[name] = df[name].fillna("").astype(str)
+        df[name] = df[name].str.replace("\n", "")
+    return df
+
+
+CLEANERS = {
+    "abilities": (chained_abilities, processor.clean_abilities_data),
+    "items": (chained_items, processor.clean_items_data),
+    "moves": (chained_moves, processor.clean_moves_data),
+}
+
+
+def bench(clean, df, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        table = df.copy()
+        start = time.perf_counter()
+        result = clean(table)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for name, df in synthetic_tables(args.rows).items():
+        chained, fused = CLEANERS[name]
+        baseline, expected = bench(chained, df, args.repeat)
+        elapsed, result = bench(fused, df, args.repeat)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+        print(f"{name} ({args.rows} rows): chained {baseline * 1000:8.1f} ms   single pass {elapsed * 1000:8.1f} ms   x{baseline / elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Runs the processor pipeline against a recorded corpus, fully offline.
+
+Usage:
+    python benchmarks/offline_pipeline.py record CORPUS_DIR [--stage NAME ...]
+    python benchmarks/offline_pipeline.py replay CORPUS_DIR [--stage NAME ...] [--latency SECONDS] [--jitter SECONDS]
+                                                           [--error-rate RATE] [--seed N]
+
+record runs the chosen stages against the live sites and saves every response into CORPUS_DIR.
+replay serves CORPUS_DIR from a local server and runs the same stages against it, reporting the wall time, what the server served,
+and the client's connection, cache and rate limiter statistics. Output CSVs go to a scratch directory (--output) so the real
+datasets under src/data are never touched.
+
+Stages are processor function names, e.g. make_tournaments_csv, make_standings_csv, make_teams_csv. The default is make_all_csv.
+
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import datacollection.httpclient as httpclient  # noqa: E402
+import datacollection.processor as processor  # noqa: E402
+import datacollection.ratelimit as ratelimit  # noqa: E402
+import datacollection.replay as replay  # noqa: E402
+
+PATH_SETTINGS = [
+    "TOURNAMENT_PATH",
+    "STANDINGS_PATH",
+    "TEAMS_PATH",
+    "POKEMON_PATH",
+    "ABILITIES_PATH",
+    "MOVES_PATH",
+    "ITEMS_PATH",
+    "ICONS_PATH",
+    "TEAMS_FRONTIER_PATH",
+    "IMAGES_DIR",
+    "GAME_FINGERPRINTS_PATH",
+    "STAGES_STATE_PATH",
+    "USAGE_PATH",
+    "SIMILARITY_PATH",
+]
+
+
+def redirect_outputs(output_dir):
+    """Points every processor output path at output_dir."""
+
+    for name in PATH_SETTINGS:
+        filename = getattr(processor, name).replace("\\", "/").rsplit("/", 1)[-1]
+        setattr(processor, name, os.path.join(output_dir, filename))
+
+
+def run_stages(stages):
+    for stage in stages:
+        start = time.perf_counter()
+        getattr(processor, stage)()
+        print(f"{stage}: {time.perf_counter() - start:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("corpus")
+    parser.add_argument("--stage", action="append", dest="stages")
+    parser.add_argument("--output", default=None, help="directory for the generated CSVs (default: a temporary directory)")
+    parser.add_argument("--latency", type=float, default=0.0, help="base latency added to every replayed response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency on top of --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of replayed responses answered with a 503")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stages = args.stages or ["make_all_csv"]
+    output_dir = args.output or tempfile.mkdtemp(prefix="vgc_offline_")
+    os.makedirs(output_dir, exist_ok=True)
+    redirect_outputs(output_dir)
+    print(f"Writing CSVs to {output_dir}")
+
+    start = time.perf_counter()
+    if args.mode == "record":
+        with replay.recording(args.corpus) as client:
+            run_stages(stages)
+        print(f"Recorded {len(client.recorder.corpus)} responses into {args.corpus}")
+    else:
+        latency = (args.latency, args.latency + args.jitter) if args.jitter else args.latency
+        client = httpclient.HttpClient(rate_limiter=ratelimit.RateLimiter())
+        with replay.offline(args.corpus, latency, args.error_rate, args.seed, client=client) as server:
+            run_stages(stages)
+            client.print_stats()
+        print(f"Replay server: {server.counters}")
+
+    print(f"Total: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
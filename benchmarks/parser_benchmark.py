@@ -0,0 +1,69 @@
+"""Compares the roster parsing backends in parsers.py.
+
+Usage:
+    python benchmarks/parser_benchmark.py [roster.html ...] [--repeat N]
+
+Pass one or more saved roster pages (e.g. curl https://rk9.gg/roster/<rk9_id> > roster.html). Without any file, a synthetic
+roster with a few thousand players is generated, mixing rows with and without the country column.
+Every backend must produce exactly the same standings rows as the original BeautifulSoup backend.
+
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from datacollection import parsers  # noqa: E402
+
+
+def synthetic_roster(players=3000):
+    rows = []
+    for i in range(players):
+        country = "" if i % 5 == 0 else f"<td>{['US', 'JP', 'GB', 'CA'][i % 4]}</td>"
+        team = f'<a href="/teamlist/public/RK9/{i:06d}">View</a>' if i % 7 else "Submitted"
+        rows.append(
+            f"<tr><td>{i}.....{i % 10}</td><td>First{i}</td><td>Last{i}</td>{country}"
+            f"<td>{'Masters' if i % 3 else 'Seniors'}</td><td>Trainer{i}</td><td>{team}</td><td>{i + 1}</td></tr>"
+        )
+    header = "<tr><th>ID</th><th>First</th><th>Last</th><th>Country</th><th>Division</th><th>Trainer</th><th>Team</th><th>Standing</th></tr>"
+    return f"<html><body><table><thead>{header}</thead><tbody>{''.join(rows)}</tbody></table></body></html>"
+
+
+def bench(html, backend, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = parsers.parse_roster(html, "benchmark", backend)
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="saved roster HTML files")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = []
+    for path in args.pages:
+        with open(path, encoding="utf-8") as file:
+            pages.append((os.path.basename(path), file.read()))
+    if not pages:
+        pages.append(("synthetic (3000 players)", synthetic_roster()))
+
+    for name, html in pages:
+        print(f"{name}: {len(html) / 1024:.0f} KiB")
+        baseline, expected = bench(html, "soup", args.repeat)
+        for backend in parsers.BACKENDS:
+            seconds, rows = bench(html, backend, args.repeat) if backend != "soup" else (baseline, expected)
+            status = "ok" if rows == expected else "MISMATCH"
+            print(
+                f"  {backend:<9} {seconds * 1000:8.1f} ms  {baseline / seconds:5.1f}x  {len(rows)} rows  {status}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Compares the MinHash/LSH similar-team search of similarity.py with scoring every team exactly.
+
+Usage:
+    python benchmarks/similarity_benchmark.py [--teams N] [--tournament-size N] [--queries N] [--k N]
+
+A synthetic teams table is generated from a few hundred archetypes, every team being an archetype with some species, items, moves
+and tera types swapped out, so each query has real neighbors among many unrelated teams. The index is built one tournament at a
+time, then every query is answered both by SimilarityIndex.query and by SimilarityIndex.brute_force. Recall@k is the share of the
+brute force top k that the index found, counting ties with the k-th score as found.
+
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from datacollection import similarity  # noqa: E402
+
+TEAM_COLUMNS = ["tournament_id", "player_id", "icon", "pokemon", "form", "tera_type", "ability", "held_item", "move1", "move2", "move3", "move4"]
+SPECIES = [f"Species {n}" for n in range(400)]
+ITEMS = [f"Item {n}" for n in range(80)]
+MOVES = [f"Move {n}" for n in range(500)]
+TYPES = [f"Type {n}" for n in range(19)]
+
+
+def random_member(rng):
+    return [rng.choice(SPECIES), rng.choice(TYPES), rng.choice(ITEMS), *rng.sample(MOVES, 4)]
+
+
+def mutate(rng, member, rate):
+    if rng.random() < rate / 2:
+        return random_member(rng)
+    species, tera, item, *moves = member
+    tera = rng.choice(TYPES) if rng.random() < rate else tera
+    item = rng.choice(ITEMS) if rng.random() < rate else item
+    moves = [rng.choice(MOVES) if rng.random() < rate else move for move in moves]
+    return [species, tera, item, *moves]
+
+
+def synthetic_teams(teams, tournament_size, archetypes=300, rate=0.2, seed=0):
+    rng = random.Random(seed)
+    bases = [[random_member(rng) for _ in range(6)] for _ in range(archetypes)]
+    rows = []
+    for team in range(teams):
+        tournament = f"tournament {team // tournament_size}"
+        for member in rng.choice(bases):
+            species, tera, item, *moves = mutate(rng, member, rate)
+            rows.append([tournament, f"player {team}", None, species, None, tera, "Ability", item, *moves])
+    return pd.DataFrame(rows, columns=TEAM_COLUMNS)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def recall(found, expected, k):
+    if expected.empty:
+        return 1.0
+    threshold = expected["similarity"].iloc[min(k, len(expected)) - 1]
+    return min((found["similarity"] >= threshold).sum(), len(expected)) / min(k, len(expected))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=100_000)
+    parser.add_argument("--tournament-size", type=int, default=1_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    # The queries are drawn from the same archetypes as the indexed teams, but aren't indexed themselves.
+    df = synthetic_teams(args.teams + args.queries, args.tournament_size)
+    indexed = df["player_id"].str.removeprefix("player ").astype(int) < args.teams
+    df, queries = df[indexed], df[~indexed]
+    index = similarity.SimilarityIndex(":memory:")
+    start = time.perf_counter()
+    for _, tournament in df.groupby("tournament_id", sort=False):
+        index.update(tournament)
+    print(f"built index of {len(index)} teams in {df['tournament_id'].nunique()} tournaments: {time.perf_counter() - start:.1f} s")
+
+    # The index is loaded and the LSH buckets are sorted on the first query after an update.
+    _, elapsed = timed(index.query, queries[queries["player_id"] == queries["player_id"].iloc[0]], args.k)
+    print(f"first query, loading the index and sorting the buckets: {elapsed * 1000:.1f} ms")
+
+    lsh_times, brute_times, recalls, candidates = [], [], [], []
+    for _, team in queries.groupby("player_id", sort=False):
+        found, elapsed = timed(index.query, team, args.k)
+        expected, brute = timed(index.brute_force, team, args.k)
+        lsh_times.append(elapsed)
+        brute_times.append(brute)
+        recalls.append(recall(found, expected, args.k))
+        signature = index.hasher.signatures(*similarity.team_tokens(team)[1:])[0]
+        candidates.append(len(index.candidates(signature)))
+
+    for name, times in [("lsh", lsh_times), ("brute force", brute_times)]:
+        print(f"{name:<12} mean {np.mean(times) * 1000:8.2f} ms   p95 {np.percentile(times, 95) * 1000:8.2f} ms")
+    print(f"recall@{args.k}: {np.mean(recalls):.3f}   candidates per query: {np.mean(candidates):.0f} of {len(index)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Compares the teamlist extractors in parsers.py.
+
+Usage:
+    python benchmarks/teamlist_benchmark.py [teamlist.html ... | CORPUS_DIR ...] [--repeat N]
+
+Pass saved teamlist pages (e.g. curl https://rk9.gg/teamlist/public/<team_list> > teamlist.html) or corpus directories recorded
+with benchmarks/offline_pipeline.py, in which case every recorded teamlist page is used. Without any argument, the teamlist
+fixture from tests/data is used. Every backend must produce exactly the same records as the original BeautifulSoup extractor.
+
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from datacollection import parsers, replay  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "data", "teamlist.html")
+
+
+def load_pages(paths):
+    pages = []
+    for path in paths:
+        if os.path.isdir(path):
+            corpus = replay.Corpus(path)
+            for url in corpus.entries:
+                if "/teamlist/public/" in url:
+                    status, _, body = corpus.get(url)
+                    if status == 200:
+                        pages.append(body.decode("utf-8", errors="replace"))
+        else:
+            with open(path, encoding="utf-8") as file:
+                pages.append(file.read())
+    return pages
+
+
+def bench(pages, backend, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        teams = [parsers.parse_teamlist(html, backend) for html in pages]
+        best = min(best, time.perf_counter() - start)
+    return best, teams
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="saved teamlist HTML files or recorded corpus directories")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages or [FIXTURE])
+    if not pages:
+        sys.exit("No teamlist pages found")
+    print(f"{len(pages)} teamlist pages, {sum(map(len, pages)) / 1024:.0f} KiB")
+
+    baseline, expected = bench(pages, "soup", args.repeat)
+    for backend in parsers.TEAMLIST_BACKENDS:
+        seconds, teams = bench(pages, backend, args.repeat) if backend != "soup" else (baseline, expected)
+        status = "ok" if teams == expected else "MISMATCH"
+        print(
+            f"  {backend:<6} {seconds * 1000:8.1f} ms  {seconds * 1e6 / len(pages):8.0f} us/page  "
+            f"{baseline / seconds:5.1f}x  {status}"
+        )
+
+
+if __name__ == "__main__":
+    main()
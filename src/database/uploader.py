@@ -11,26 +11,47 @@ import os
 import sqlalchemy as sqlachl
 import pandas as pd
 import datacollection.processor as process
+import datacollection.changes as changes
 from dotenv import load_dotenv
 
 
-POKEMON_PATH = "src/data/pokemon.csv"
-MOVES_PATH = "src/data/moves.csv"
-ABILITIES_PATH = "src/data/abilities.csv"
-ITEMS_PATH = "src/data/items.csv"
-TORNAMENTS_PATH = "src/data/tournaments.csv"
-STANDINGS_PATH = "src/data/standings.csv"
-TEAMS_PATH = "src/data/teams.csv"
+# The same paths the processor writes to, so the uploader reads exactly the files (and deltas) it produced.
+POKEMON_PATH = process.POKEMON_PATH
+MOVES_PATH = process.MOVES_PATH
+ABILITIES_PATH = process.ABILITIES_PATH
+ITEMS_PATH = process.ITEMS_PATH
+TORNAMENTS_PATH = process.TOURNAMENT_PATH
+STANDINGS_PATH = process.STANDINGS_PATH
+TEAMS_PATH = process.TEAMS_PATH
 
 load_dotenv()
 dbAPI = os.getenv("DATABASE_URL")
 
 
+def upload_chunks(table, filepath, engine, clean=None, memory_budget=process.MEMORY_BUDGET):
+    """Uploads a dataset one chunk at a time: the first chunk replaces the table and the following ones are appended.
+
+    Args:
+        table: The name of the table.
+        filepath: The CSV path of the dataset.
+        engine: The SQLAlchemy engine to upload with.
+        clean: Optional cleaning function applied to each chunk before it is uploaded.
+        memory_budget: Roughly how many bytes the chunks may take up while they are processed.
+    """
+
+    if_exists = "replace"
+    for chunk in process.iter_dataset(filepath, memory_budget=memory_budget):
+        if clean is not None:
+            chunk = clean(chunk)
+        chunk.to_sql(table, engine, if_exists=if_exists, index=False)
+        if_exists = "append"
+
+
 def upload_tournaments(filepath):
     """Uploads the tournament data to the PostgreSQL database."""
 
     # Read the CSV file into a pandas DataFrame
-    df = pd.read_csv(filepath)
+    df = process.load_dataset(filepath)
 
     # Create a connection to the PostgreSQL database
     engine = sqlachl.create_engine(dbAPI, echo=True)
@@ -59,9 +80,7 @@ def upload_tournaments(filepath):
 
 
 def upload_standings(filepath):
-    """Uploads the standings data to the PostgreSQL database."""
-
-    df = pd.read_csv(filepath)
+    """Uploads the standings data to the PostgreSQL database, one chunk at a time."""
 
     engine = sqlachl.create_engine(dbAPI, echo=True)
 
@@ -84,14 +103,12 @@ def upload_standings(filepath):
             )
         )
 
-    df.to_sql("Standings", engine, if_exists="replace", index=False)
+    upload_chunks("Standings", filepath, engine)
     connection.commit()
 
 
 def upload_teams(filepath):
-    """Uploads the teams data to the PostgreSQL database."""
-
-    df = pd.read_csv(filepath)
+    """Uploads the teams data to the PostgreSQL database, one chunk at a time."""
 
     engine = sqlachl.create_engine(dbAPI, echo=True)
 
@@ -118,14 +135,14 @@ def upload_teams(filepath):
             )
         )
 
-    df.to_sql("Team_members", engine, if_exists="replace", index=False)
+    upload_chunks("Team_members", filepath, engine)
     connection.commit()
 
 
 def upload_pokemon(filepath):
     """Uploads the pokemon data to the PostgreSQL database."""
 
-    df = pd.read_csv(filepath)
+    df = process.load_dataset(filepath)
 
     engine = sqlachl.create_engine(dbAPI, echo=True)
 
@@ -159,7 +176,7 @@ def upload_pokemon(filepath):
 def upload_moves(filepath):
     """Uploads the moves data to the PostgreSQL database."""
 
-    df = pd.read_csv(filepath)
+    df = process.load_dataset(filepath)
 
     engine = sqlachl.create_engine(dbAPI, echo=True)
 
@@ -188,7 +205,7 @@ def upload_moves(filepath):
 def upload_abilities(filepath):
     """Uploads the abilities data to the PostgreSQL database."""
 
-    df = pd.read_csv(filepath)
+    df = process.load_dataset(filepath)
 
     engine = sqlachl.create_engine(dbAPI, echo=True)
 
@@ -212,7 +229,7 @@ def upload_abilities(filepath):
 def upload_items(filepath):
     """Uploads the items data to the PostgreSQL database."""
 
-    df = pd.read_csv(filepath)
+    df = process.load_dataset(filepath)
 
     engine = sqlachl.create_engine(dbAPI, echo=True)
 
@@ -237,7 +254,7 @@ def update_tournament(filepath):
     """Updates the tournament data in the PostgreSQL database."""
 
     try:
-        df = pd.read_csv(filepath)
+        df = process.load_dataset(filepath)
 
         df = process.clean_tournament_data(df)
 
@@ -267,13 +284,9 @@ def update_tournament(filepath):
 
 
 def update_standings(filepath):
-    """Updates the standings data in the PostgreSQL database."""
+    """Updates the standings data in the PostgreSQL database, cleaning and uploading one chunk at a time."""
 
     try:
-        df = pd.read_csv(filepath)
-
-        df = process.clean_standings_data(df)
-
         engine = sqlachl.create_engine(dbAPI, echo=True)
 
         with engine.connect() as connection:
@@ -295,20 +308,16 @@ def update_standings(filepath):
                 )
             )
 
-        df.to_sql("Standings", engine, if_exists="replace", index=False)
+        upload_chunks("Standings", filepath, engine, process.clean_standings_data)
 
     except Exception as e:
         print(e)
 
 
 def update_teams(filepath):
-    """Updates the teams data in the PostgreSQL database."""
+    """Updates the teams data in the PostgreSQL database, cleaning and uploading one chunk at a time."""
 
     try:
-        df = pd.read_csv(filepath)
-
-        df = process.clean_teams_data(df)
-
         engine = sqlachl.create_engine(dbAPI, echo=True)
 
         with engine.connect() as connection:
@@ -334,7 +343,7 @@ def update_teams(filepath):
                 )
             )
 
-        df.to_sql("Team_members", engine, if_exists="replace", index=False)
+        upload_chunks("Team_members", filepath, engine, process.clean_teams_data)
 
     except Exception as e:
         print(e)
@@ -365,6 +374,54 @@ def upload_game_data():
     except Exception as e:
         print(f'Error, failed to upload game data.{e}')
 
+def upload_game_delta():
+    """Uploads only the game data rows that changed in the last refresh, using the delta files written next to each CSV.
+
+    Changed rows are deleted and re-inserted and deleted rows are removed, all in one transaction per table.
+    Tables without a delta file, or missing from the database, are uploaded in full instead.
+    Once a table is uploaded, its latest build becomes the baseline the next delta is computed against.
+    """
+
+    game_tables = [
+        ("Pokemon", "pokemon", POKEMON_PATH, "pokemon_id", process.clean_pokemon_data, upload_pokemon),
+        ("Moves", "moves", MOVES_PATH, "move_id", process.clean_moves_data, upload_moves),
+        ("Abilities", "abilities", ABILITIES_PATH, "ability_id", process.clean_abilities_data, upload_abilities),
+        ("Items", "items", ITEMS_PATH, "item_id", process.clean_items_data, upload_items),
+    ]
+
+    engine = sqlachl.create_engine(dbAPI, echo=True)
+    store = changes.FingerprintStore(process.GAME_FINGERPRINTS_PATH)
+
+    for table, dataset, filepath, key, clean, upload in game_tables:
+        try:
+            upserts, deleted = changes.read_delta(process.local_path(filepath), key)
+            if upserts is None or not sqlachl.inspect(engine).has_table(table):
+                upload(filepath)
+                store.commit(dataset)
+                continue
+            if upserts.empty and not deleted:
+                print(f"{table}: no changes")
+                store.commit(dataset)
+                continue
+
+            upserts = clean(upserts)
+            stale_ids = [int(record_id) for record_id in list(upserts[key]) + deleted]
+
+            with engine.begin() as connection:
+                connection.execute(
+                    sqlachl.text(f'DELETE FROM "{table}" WHERE {key} IN :ids').bindparams(
+                        sqlachl.bindparam("ids", expanding=True)
+                    ),
+                    {"ids": stale_ids},
+                )
+                upserts.to_sql(table, connection, if_exists="append", index=False)
+            store.commit(dataset)
+            print(f"{table}: {len(upserts)} rows upserted, {len(deleted)} rows deleted")
+        except Exception as e:
+            print(f'Error, failed to upload the {table} delta.{e}')
+
+    store.close()
+
 def upload_official_data():
     """Uploads all official data to the PostgreSQL database."""
 
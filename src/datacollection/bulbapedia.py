@@ -0,0 +1,251 @@
+"""Batched Bulbapedia fallback for effects missing from PokeAPI.
+
+PokeAPI has no English effect for a handful of abilities, moves and items. We used to download the whole rendered Bulbapedia article
+for each of them and run it through BeautifulSoup just to read the first paragraph of its Effect section, one request per article.
+EffectFallback asks the MediaWiki API instead: one query returns the latest revision ID of up to fifty titles at once, and only the
+articles whose revision isn't cached yet are downloaded, again fifty per request, as wikitext. The Effect section is extracted from the
+wikitext and stored in a small SQLite cache keyed by title and revision, so a refresh costs a couple of requests as long as nobody edits
+those articles.
+
+Typical use case example:
+    fallback = bulbapedia.get_fallback()
+    fallback.effects(["Leftovers", "Tackle (move)"])     <--- {"Leftovers": "At the end of every turn, ...", "Tackle (move)": "..."}
+
+"""
+
+import re
+import sqlite3
+import threading
+import time
+
+from . import httpclient
+
+API_URL = "https://bulbapedia.bulbagarden.net/w/api.php"
+CACHE_PATH = "src/data/bulbapedia.sqlite"
+BATCH_SIZE = 50
+SECTION = "Effect"
+
+# Templates whose last parameter is the text they display, e.g. {{m|Tackle}} or {{type|Fire}}.
+TEXT_TEMPLATES = {"a", "i", "m", "p", "t", "ability", "item", "move", "pkmn", "stat", "status", "type", "tt"}
+
+_HEADING = re.compile(r"^(=+)\s*(.*?)\s*\1\s*$", re.M)
+_COMMENT = re.compile(r"<!--.*?-->", re.S)
+_REF = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.S)
+_TAG = re.compile(r"<[^>]+>")
+_TEMPLATE = re.compile(r"\{\{([^{}]*)\}\}")
+_FILE_LINK = re.compile(r"\[\[(?:File|Image|Category):[^\[\]]*\]\]", re.I)
+_LINK = re.compile(r"\[\[([^\[\]|]*)(?:\|([^\[\]]*))?\]\]")
+_EXTERNAL_LINK = re.compile(r"\[https?://\S+\s*([^\]]*)\]")
+
+
+# Lines that render as tables, lists, images or indents rather than as a paragraph.
+_NOT_PARAGRAPH = ("{|", "|", "!", "*", "#", ":", ";", "[[File:", "[[Image:")
+
+
+def _is_template_line(line):
+    """Lines made of a single template, like {{main|...}} hatnotes and infoboxes, render outside of paragraphs."""
+    return line.startswith("{{") and line.endswith("}}") and not _TEMPLATE.sub("", line).strip()
+
+
+def _template_text(match):
+    name, *params = [part.strip() for part in match.group(1).split("|")]
+    params = [param for param in params if "=" not in param]
+    return params[-1] if params and name.lower() in TEXT_TEMPLATES else ""
+
+
+def plain_text(wikitext):
+    """Strips wiki markup from a paragraph, keeping the text that would be rendered."""
+
+    text = _COMMENT.sub("", wikitext)
+    text = _REF.sub("", text)
+    while _TEMPLATE.search(text):
+        text = _TEMPLATE.sub(_template_text, text)
+    text = _FILE_LINK.sub("", text)
+    text = _LINK.sub(lambda match: match.group(2) or match.group(1), text)
+    text = _EXTERNAL_LINK.sub(lambda match: match.group(1), text)
+    text = _TAG.sub("", text)
+    text = text.replace("'''", "").replace("''", "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def effect_section(wikitext, section=SECTION):
+    """Returns the first paragraph of the given section as plain text, or None if the article has no such section.
+
+    Like the rendered page, this skips subsection headings, tables and templates that come before the first paragraph.
+    """
+
+    for heading in _HEADING.finditer(wikitext):
+        if heading.group(2) != section:
+            continue
+        paragraph = []
+        for line in wikitext[heading.end() :].splitlines():
+            stripped = line.strip()
+            subheading = _HEADING.match(stripped)
+            if subheading and len(subheading.group(1)) <= len(heading.group(1)):
+                break
+            if not stripped or subheading or stripped.startswith(_NOT_PARAGRAPH) or _is_template_line(stripped):
+                if paragraph:
+                    break
+                continue
+            paragraph.append(stripped)
+        return plain_text(" ".join(paragraph)) or None
+    return None
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _resolve_titles(query):
+    """Maps every requested title to the title MediaWiki answered with, following normalization and redirects."""
+
+    mapping = {}
+    for key in ("normalized", "redirects"):
+        for entry in query.get(key, []):
+            mapping[entry["from"]] = entry["to"]
+
+    def resolve(title):
+        seen = set()
+        while title in mapping and title not in seen:
+            seen.add(title)
+            title = mapping[title]
+        return title
+
+    return resolve
+
+
+class EffectFallback:
+    """Resolves Effect sections of Bulbapedia articles in batches, caching them by title and revision.
+
+    Args:
+        cache_path: Location of the SQLite cache. Use ":memory:" for a cache that doesn't survive the process.
+        batch_size: Titles per MediaWiki API request. Anonymous clients may ask for up to 50.
+    """
+
+    def __init__(self, cache_path=CACHE_PATH, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.counters = {"requests": 0, "cached": 0, "downloaded": 0, "missing": 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(cache_path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS effects (
+                title TEXT,
+                revision INTEGER,
+                effect TEXT,
+                fetched_at REAL,
+                PRIMARY KEY (title, revision)
+            )
+            """
+        )
+        self._db.commit()
+
+    def _query(self, titles, **params):
+        self.counters["requests"] += 1
+        response = httpclient.get_json(
+            API_URL,
+            params={
+                "action": "query",
+                "format": "json",
+                "formatversion": 2,
+                "redirects": 1,
+                "titles": "|".join(titles),
+                **params,
+            },
+        )
+        query = response.get("query", {})
+        return _resolve_titles(query), {page["title"]: page for page in query.get("pages", [])}
+
+    def revisions(self, titles):
+        """Returns the latest revision ID of every title that exists, in batched requests."""
+
+        revisions = {}
+        for batch in _batches(titles, self.batch_size):
+            resolve, pages = self._query(batch, prop="info")
+            for title in batch:
+                page = pages.get(resolve(title))
+                if page is not None and not page.get("missing") and page.get("lastrevid"):
+                    revisions[title] = page["lastrevid"]
+        return revisions
+
+    def _download(self, titles):
+        """Downloads the current wikitext of the titles and returns {title: (revision, wikitext)}."""
+
+        contents = {}
+        for batch in _batches(titles, self.batch_size):
+            resolve, pages = self._query(batch, prop="revisions", rvprop="ids|content", rvslots="main")
+            for title in batch:
+                page = pages.get(resolve(title))
+                if page and page.get("revisions"):
+                    revision = page["revisions"][0]
+                    contents[title] = (revision["revid"], revision["slots"]["main"]["content"])
+        return contents
+
+    def effects(self, titles):
+        """Looks up the Effect section of every title.
+
+        Args:
+            titles: Article titles, e.g. "Leftovers" or "Stance Change (Ability)". Duplicates are only resolved once.
+
+        Returns:
+            A dictionary of title to effect text. Titles without an article or an Effect section map to None.
+        """
+
+        titles = list(dict.fromkeys(titles))
+        if not titles:
+            return {}
+
+        with self._lock:
+            revisions = self.revisions(titles)
+            results = {title: None for title in titles}
+            stale = []
+            for title, revision in revisions.items():
+                row = self._db.execute(
+                    "SELECT effect FROM effects WHERE title = ? AND revision = ?", (title, revision)
+                ).fetchone()
+                if row is None:
+                    stale.append(title)
+                else:
+                    results[title] = row[0]
+                    self.counters["cached"] += 1
+
+            now = time.time()
+            for title, (revision, wikitext) in self._download(stale).items():
+                effect = effect_section(wikitext)
+                results[title] = effect
+                self._db.execute(
+                    "INSERT OR REPLACE INTO effects (title, revision, effect, fetched_at) VALUES (?, ?, ?, ?)",
+                    (title, revision, effect, now),
+                )
+                self.counters["downloaded"] += 1
+            self._db.commit()
+
+            self.counters["missing"] += sum(effect is None for effect in results.values())
+        return results
+
+    def close(self):
+        self._db.close()
+
+
+_fallback = None
+_fallback_lock = threading.Lock()
+
+
+def get_fallback():
+    """Returns the shared EffectFallback, creating it on first use."""
+
+    global _fallback
+    with _fallback_lock:
+        if _fallback is None:
+            _fallback = EffectFallback()
+        return _fallback
+
+
+def set_fallback(fallback):
+    """Replaces the shared EffectFallback, e.g. with one using an in-memory cache. Returns the previous one."""
+
+    global _fallback
+    with _fallback_lock:
+        previous, _fallback = _fallback, fallback
+        return previous
@@ -0,0 +1,203 @@
+"""Change detection for the game data tables.
+
+Pokémon, moves, abilities and items barely change between two refreshes, yet every refresh used to rewrite and re-upload all of them.
+Each record of a freshly built table now gets a fingerprint, a hash of every value in its row, and the fingerprints of the previous
+build are kept in a small SQLite database. Comparing the two tells us exactly which IDs were inserted, updated or deleted. That delta
+is written next to the full snapshot (pokemon.csv gets pokemon.delta.csv), so the uploader only has to touch the rows that changed.
+
+The fingerprints of a build only become the baseline once its delta has been uploaded (FingerprintStore.commit). Until then every
+build is diffed against the last uploaded one, so refreshing twice without uploading writes a delta holding the changes of both.
+
+"""
+
+import os
+import sqlite3
+import time
+from typing import NamedTuple
+
+import pandas as pd
+
+FINGERPRINTS_PATH = "src/data/game_fingerprints.sqlite"
+CHANGE_COLUMN = "change"
+
+INSERTED = "inserted"
+UPDATED = "updated"
+DELETED = "deleted"
+
+
+class Delta(NamedTuple):
+    """IDs of the records that changed since the previous build, each list sorted."""
+
+    inserted: list
+    updated: list
+    deleted: list
+
+    def __len__(self):
+        return len(self.inserted) + len(self.updated) + len(self.deleted)
+
+
+def fingerprints(df, key):
+    """Hashes every row of df, keyed by its ID.
+
+    Values are compared as text, so a row only counts as changed when what ends up in the CSV changes.
+
+    Returns:
+        A dictionary of ID (as text) to a 16 digit hex fingerprint.
+    """
+
+    hashes = pd.util.hash_pandas_object(df.astype(str), index=False)
+    return {str(record_id): f"{value:016x}" for record_id, value in zip(df[key], hashes)}
+
+
+def delta_path(filepath):
+    """pokemon.csv -> pokemon.delta.csv"""
+
+    root, extension = os.path.splitext(filepath)
+    return f"{root}.delta{extension or '.csv'}"
+
+
+class FingerprintStore:
+    """Remembers the fingerprint of every record of every game data table from the last build.
+
+    Args:
+        path: Location of the SQLite database. Use ":memory:" for a store that doesn't survive the process.
+    """
+
+    def __init__(self, path=FINGERPRINTS_PATH):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                dataset TEXT,
+                record_id TEXT,
+                fingerprint TEXT,
+                updated_at REAL,
+                PRIMARY KEY (dataset, record_id)
+            )
+            """
+        )
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pending (
+                dataset TEXT,
+                record_id TEXT,
+                fingerprint TEXT,
+                PRIMARY KEY (dataset, record_id)
+            )
+            """
+        )
+        self._db.commit()
+
+    def load(self, dataset):
+        return dict(self._db.execute("SELECT record_id, fingerprint FROM fingerprints WHERE dataset = ?", (dataset,)))
+
+    def diff(self, dataset, current):
+        """Compares fresh fingerprints with the stored ones.
+
+        Returns:
+            A Delta of the IDs that are new, whose fingerprint changed, and that disappeared.
+        """
+
+        previous = self.load(dataset)
+        return Delta(
+            inserted=sorted(record_id for record_id in current if record_id not in previous),
+            updated=sorted(
+                record_id for record_id, fingerprint in current.items() if previous.get(record_id, fingerprint) != fingerprint
+            ),
+            deleted=sorted(record_id for record_id in previous if record_id not in current),
+        )
+
+    def replace(self, dataset, current):
+        """Makes current the baseline for the next diff of dataset."""
+
+        now = time.time()
+        with self._db:
+            self._db.execute("DELETE FROM fingerprints WHERE dataset = ?", (dataset,))
+            self._db.executemany(
+                "INSERT INTO fingerprints (dataset, record_id, fingerprint, updated_at) VALUES (?, ?, ?, ?)",
+                [(dataset, record_id, fingerprint, now) for record_id, fingerprint in current.items()],
+            )
+
+    def stage(self, dataset, current):
+        """Keeps current as the fingerprints of the latest build of dataset, until commit makes them the baseline."""
+
+        with self._db:
+            self._db.execute("DELETE FROM pending WHERE dataset = ?", (dataset,))
+            self._db.executemany(
+                "INSERT INTO pending (dataset, record_id, fingerprint) VALUES (?, ?, ?)",
+                [(dataset, record_id, fingerprint) for record_id, fingerprint in current.items()],
+            )
+
+    def commit(self, dataset):
+        """Makes the latest build of dataset the baseline, once its delta has been uploaded. Does nothing if none is pending.
+
+        Returns:
+            True if a pending build was committed.
+        """
+
+        current = dict(self._db.execute("SELECT record_id, fingerprint FROM pending WHERE dataset = ?", (dataset,)))
+        if not current:
+            return False
+        self.replace(dataset, current)
+        with self._db:
+            self._db.execute("DELETE FROM pending WHERE dataset = ?", (dataset,))
+        return True
+
+    def close(self):
+        self._db.close()
+
+
+def delta_frame(df, key, delta):
+    """Builds the delta table: the inserted and updated rows of df, then one row per deleted ID, with a change column saying which."""
+
+    ids = df[key].astype(str)
+    inserted = ids.isin(delta.inserted)
+    changed = df[inserted | ids.isin(delta.updated)].copy()
+    changed[CHANGE_COLUMN] = inserted[changed.index].map({True: INSERTED, False: UPDATED})
+
+    deleted = pd.DataFrame({key: delta.deleted, CHANGE_COLUMN: DELETED})
+    if pd.api.types.is_numeric_dtype(df[key]):
+        deleted[key] = pd.to_numeric(deleted[key])
+    return pd.concat([changed, deleted], ignore_index=True)
+
+
+def record_changes(df, key, dataset, filepath, store):
+    """Diffs a freshly built game data table against the last uploaded build and writes its delta next to filepath.
+
+    The fresh fingerprints are only staged: call store.commit(dataset) once the delta is uploaded.
+
+    Args:
+        df: The cleaned table, exactly as it is written to filepath.
+        key: Name of the ID column.
+        dataset: Name the fingerprints are stored under, e.g. "pokemon".
+        filepath: Path of the full snapshot. The delta goes to delta_path(filepath).
+        store: The FingerprintStore holding the last uploaded build.
+
+    Returns:
+        The Delta.
+    """
+
+    current = fingerprints(df, key)
+    delta = store.diff(dataset, current)
+    delta_frame(df, key, delta).to_csv(delta_path(filepath), index=False, encoding="utf-8")
+    store.stage(dataset, current)
+    print(f"{dataset}: {len(delta.inserted)} inserted, {len(delta.updated)} updated, {len(delta.deleted)} deleted")
+    return delta
+
+
+def read_delta(filepath, key):
+    """Reads the delta written for the snapshot at filepath.
+
+    Returns:
+        An (upserts, deleted_ids) tuple: a DataFrame of the inserted and updated rows without the change column,
+        and a list of the deleted IDs. Returns (None, None) when there is no delta file.
+    """
+
+    path = delta_path(filepath)
+    if not os.path.exists(path):
+        return None, None
+    df = pd.read_csv(path, encoding="utf-8")
+    deleted = df[df[CHANGE_COLUMN] == DELETED]
+    upserts = df[df[CHANGE_COLUMN] != DELETED].drop(columns=CHANGE_COLUMN).reset_index(drop=True)
+    return upserts, list(deleted[key])
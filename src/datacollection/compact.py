@@ -0,0 +1,315 @@
+"""Compact in-memory encoding of the teams and standings tables.
+
+The teams table repeats the same few hundred strings (species, forms, tera types, abilities, held items and four moves) on every row,
+along with a long icon URL and two 32 character hex IDs. As pandas object columns, each of those is a separate Python string, which
+costs around a kilobyte per team member. A CompactTable stores the same data as:
+
+    md5 IDs                 16 raw bytes each (numpy "S16") instead of a 32 character string
+    repeated strings        int16/int32 codes into a Vocabulary shared by every column of the same kind (move1 to move4 share one)
+    anything else           kept as it is
+
+Species, moves, abilities and held items are keyed to the IDs of the game data tables when their name matches, so the code of
+"Fake Out" is its move_id and a team can be joined with the moves table without decoding it. Strings with no match get codes above
+every game ID. Missing values are coded -1.
+
+Decoding is lossless: decode() gives back exactly the columns, values and dtypes that were encoded, in the same order. The dtype of
+every packed or coded column is recorded when encoding, so a column that was all missing (float64 when read from a CSV) comes back
+as float64, not as the object column its codes decode to. So is the value each coded column marked its missing values with, so
+a crawled column of None comes back as None and a CSV column of NaN as NaN. A column mixing several markers is kept as it is.
+
+Typical use case example:
+    vocabularies = compact.Vocabularies.from_game_data(moves=moves_df, pokemon=pokemon_df)
+    table = compact.encode_teams(teams_df, vocabularies)
+    table.memory_usage()                  <--- around 50 bytes per team member instead of a kilobyte
+    table.codes["move1"]                  <--- move_ids
+    table.decode()                        <--- the original DataFrame
+
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+MISSING = -1
+ID_BYTES = 16
+
+ID_COLUMNS = ["tournament_id", "player_id"]
+TEAM_VOCABULARIES = {
+    "icon": "icons",
+    "pokemon": "pokemon",
+    "form": "forms",
+    "tera_type": "types",
+    "ability": "abilities",
+    "held_item": "items",
+    "move1": "moves",
+    "move2": "moves",
+    "move3": "moves",
+    "move4": "moves",
+}
+STANDINGS_VOCABULARIES = {
+    "first_name": "names",
+    "last_name": "names",
+    "country": "countries",
+    "division": "divisions",
+    "trainer_name": "trainers",
+}
+
+# Vocabulary name -> (name column, ID column) of the game data table its codes are keyed to.
+GAME_DATA_COLUMNS = {
+    "pokemon": ("name", "pokemon_id"),
+    "moves": ("move_name", "move_id"),
+    "abilities": ("ability_name", "ability_id"),
+    "items": ("item_name", "item_id"),
+}
+
+_HEX_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def missing_markers(series):
+    """Returns the distinct values a column marks its missing values with, e.g. [None] or [nan], counting every float NaN once."""
+
+    markers = {}
+    for value in pd.unique(series[series.isna()]):
+        markers.setdefault("nan" if isinstance(value, float) else value, value)
+    return list(markers.values())
+
+
+def normalize(name):
+    """Reduces a name to lowercase letters and digits, so "U-turn" (rk9) matches "U Turn" and "u-turn" (PokeAPI)."""
+    return re.sub(r"[^0-9a-z]", "", str(name).lower())
+
+
+class Vocabulary:
+    """Integer codes for the distinct values of one kind of column.
+
+    Args:
+        name: Name of the vocabulary, e.g. "moves".
+        game_ids: Optional dictionary of normalized name to game data ID. Values matching one are coded with that ID.
+    """
+
+    def __init__(self, name, game_ids=None):
+        self.name = name
+        self.game_ids = game_ids or {}
+        self.codes = {}
+        self.values = {}
+        self._next_code = max(self.game_ids.values(), default=-1) + 1
+
+    def __len__(self):
+        return len(self.codes)
+
+    def code(self, value):
+        """Returns the code of a value, giving it one if it is new."""
+
+        code = self.codes.get(value)
+        if code is not None:
+            return code
+        code = self.game_ids.get(normalize(value))
+        if code is None or code in self.values:
+            # Unknown names, and a second spelling of a name whose game ID is taken, get a code of their own.
+            code = self._next_code
+        self.assign(value, code)
+        return code
+
+    def assign(self, value, code):
+        """Gives a value a fixed code, e.g. one that was stored along with data encoded in an earlier run."""
+
+        self._next_code = max(self._next_code, code + 1)
+        self.codes[value] = code
+        self.values[code] = value
+
+    def encode(self, series):
+        """Returns the codes of a column as the smallest integer array that fits them."""
+
+        uniques = pd.unique(series)
+        lookup = np.array([MISSING if pd.isna(value) else self.code(value) for value in uniques], dtype=np.int64)
+        # An object Index, as a str one would turn None into NaN and no longer find it in series.
+        codes = lookup[pd.Index(uniques, dtype=object).get_indexer(series)] if len(series) else np.array([], dtype=np.int64)
+        return codes.astype(np.int16 if self._next_code <= np.iinfo(np.int16).max else np.int32)
+
+    def decode(self, codes):
+        """Returns the values of an array of codes, with NaN for missing ones."""
+
+        table = np.empty(self._next_code + 1, dtype=object)
+        table[:] = np.nan
+        for code, value in self.values.items():
+            table[code] = value
+        # MISSING (-1) indexes the last slot, which no code uses.
+        return table[np.asarray(codes)]
+
+
+class Vocabularies:
+    """The vocabularies shared by every table encoded with them, created on first use."""
+
+    def __init__(self):
+        self._vocabularies = {}
+
+    @classmethod
+    def from_game_data(cls, **tables):
+        """Creates vocabularies keyed to the IDs of the game data tables.
+
+        Args:
+            **tables: DataFrames of the game data, keyed by vocabulary name: pokemon, moves, abilities or items.
+                Only the name and ID columns listed in GAME_DATA_COLUMNS are used.
+        """
+
+        vocabularies = cls()
+        for name, df in tables.items():
+            if df is None:
+                continue
+            name_column, id_column = GAME_DATA_COLUMNS[name]
+            game_ids = {}
+            for game_name, game_id in zip(df[name_column], df[id_column]):
+                if not pd.isna(game_name):
+                    game_ids.setdefault(normalize(game_name), int(game_id))
+            vocabularies._vocabularies[name] = Vocabulary(name, game_ids)
+        return vocabularies
+
+    def __getitem__(self, name):
+        if name not in self._vocabularies:
+            self._vocabularies[name] = Vocabulary(name)
+        return self._vocabularies[name]
+
+
+def encode_ids(series):
+    """Packs a column of md5 hex digests into 16 bytes each. Returns None if any value isn't one, so it can be kept as is."""
+
+    values = series.tolist()
+    if not all(isinstance(value, str) and _HEX_ID.fullmatch(value) for value in values):
+        return None
+    return np.frombuffer(bytes.fromhex("".join(values)), dtype=f"S{ID_BYTES}").copy()
+
+
+def decode_ids(packed):
+    digits = packed.tobytes().hex()
+    size = 2 * ID_BYTES
+    return [digits[start : start + size] for start in range(0, len(digits), size)]
+
+
+class CompactTable:
+    """A DataFrame stored as packed IDs, vocabulary codes and untouched columns.
+
+    Attributes:
+        columns: The column names, in their original order.
+        ids: Dictionary of column to "S16" array of packed md5 IDs.
+        codes: Dictionary of column to integer array of codes.
+        vocabulary_names: Dictionary of coded column to the name of its vocabulary.
+        plain: DataFrame of the columns stored as they were.
+        vocabularies: The Vocabularies the codes refer to.
+        dtypes: Dictionary of packed or coded column to the dtype it had before encoding.
+        missing: Dictionary of coded column to the value its missing values were, for the columns that had any.
+    """
+
+    def __init__(self, columns, ids, codes, vocabulary_names, plain, vocabularies, length, dtypes, missing):
+        self.columns = list(columns)
+        self.ids = ids
+        self.codes = codes
+        self.vocabulary_names = vocabulary_names
+        self.plain = plain.reset_index(drop=True)
+        self.vocabularies = vocabularies
+        self.length = length
+        self.dtypes = dtypes
+        self.missing = missing
+
+    def __len__(self):
+        return self.length
+
+    def memory_usage(self):
+        """Bytes taken up by the encoded columns and the plain ones (not counting the shared vocabularies)."""
+
+        arrays = sum(array.nbytes for array in self.ids.values()) + sum(array.nbytes for array in self.codes.values())
+        return int(arrays + self.plain.memory_usage(index=False, deep=True).sum())
+
+    def column(self, name):
+        """Decodes a single column."""
+
+        if name in self.ids:
+            return pd.Series(decode_ids(self.ids[name]), name=name, dtype=object).astype(self.dtypes[name])
+        if name in self.codes:
+            values = self.vocabularies[self.vocabulary_names[name]].decode(self.codes[name])
+            if name in self.missing:
+                values[self.codes[name] == MISSING] = self.missing[name]
+            return pd.Series(values, name=name, dtype=object).astype(self.dtypes[name])
+        return self.plain[name]
+
+    def decode(self):
+        """Returns the original DataFrame."""
+        return pd.DataFrame({name: self.column(name) for name in self.columns}, columns=self.columns, index=range(len(self)))
+
+
+def encode(df, vocabularies, vocabulary_names, id_columns=ID_COLUMNS):
+    """Encodes a DataFrame into a CompactTable.
+
+    Args:
+        df: The DataFrame to encode.
+        vocabularies: The Vocabularies to code repeated strings with. Share them between tables to make their codes comparable.
+        vocabulary_names: Dictionary of column to vocabulary name, for the columns to code.
+        id_columns: Columns of md5 hex digests to pack.
+    """
+
+    df = df.reset_index(drop=True)
+    ids = {}
+    codes = {}
+    missing = {}
+    for column in df.columns:
+        if column in id_columns:
+            packed = encode_ids(df[column])
+            if packed is not None:
+                ids[column] = packed
+        elif column in vocabulary_names:
+            markers = missing_markers(df[column])
+            if len(markers) > 1:
+                # Every missing value is coded -1, so a column mixing e.g. None and NaN could not be told apart again.
+                continue
+            if markers:
+                missing[column] = markers[0]
+            codes[column] = vocabularies[vocabulary_names[column]].encode(df[column])
+
+    used = {column: vocabulary_names[column] for column in codes}
+    plain = df.drop(columns=list(ids) + list(codes))
+    dtypes = {column: df[column].dtype for column in [*ids, *codes]}
+    return CompactTable(df.columns, ids, codes, used, plain, vocabularies, len(df), dtypes, missing)
+
+
+def encode_teams(df, vocabularies=None):
+    """Encodes a teams DataFrame. Pass vocabularies from Vocabularies.from_game_data to key the codes to game data IDs."""
+    return encode(df, vocabularies or Vocabularies(), TEAM_VOCABULARIES)
+
+
+def encode_standings(df, vocabularies=None):
+    """Encodes a standings DataFrame."""
+    return encode(df, vocabularies or Vocabularies(), STANDINGS_VOCABULARIES)
+
+
+def concat(tables):
+    """Concatenates CompactTables encoded with the same Vocabularies, e.g. the chunks of a dataset, without decoding them."""
+
+    first = tables[0]
+    if any(table.vocabularies is not first.vocabularies or table.columns != first.columns for table in tables):
+        raise ValueError("Only tables with the same columns and the same Vocabularies can be concatenated")
+
+    ids = {}
+    codes = {}
+    missing = {}
+    plain = {}
+    for name in first.columns:
+        markers = missing_markers(pd.Series([table.missing[name] for table in tables if name in table.missing], dtype=object))
+        if all(name in table.ids for table in tables):
+            ids[name] = np.concatenate([table.ids[name] for table in tables])
+        elif all(name in table.codes for table in tables) and len(markers) <= 1:
+            codes[name] = np.concatenate([table.codes[name] for table in tables])
+            if markers:
+                missing[name] = markers[0]
+        else:
+            # A column packed or coded in some tables only (an ID that wasn't an md5 digest somewhere, or missing values marked
+            # differently in another chunk) is kept as is.
+            plain[name] = pd.concat([table.column(name) for table in tables], ignore_index=True)
+    length = sum(len(table) for table in tables)
+    plain = pd.DataFrame(plain, columns=[name for name in first.columns if name in plain], index=range(length))
+    used = {name: first.vocabulary_names[name] for name in codes}
+    # Chunks whose dtypes differ (e.g. a column all missing in one of them) decode to object, as pd.concat would give.
+    dtypes = {
+        name: first.dtypes[name] if all(table.dtypes[name] == first.dtypes[name] for table in tables) else np.dtype(object)
+        for name in [*ids, *codes]
+    }
+    return CompactTable(first.columns, ids, codes, used, plain, first.vocabularies, length, dtypes, missing)
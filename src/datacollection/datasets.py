@@ -0,0 +1,362 @@
+"""Pluggable storage for the tournaments, standings, teams and game data tables.
+
+Every stage used to hand its output to the next one as CSV, which throws away the dtypes (tournament dates come back as strings) and
+forces a full reparse of the text every time a table is loaded, even when only two columns are needed. The storage format of a dataset
+is now picked by its file extension:
+
+    .csv                   plain CSV, as before. Reading parses the known date columns back into datetimes.
+    .parquet               typed, zstd-compressed columnar files. Reading only decodes the requested columns.
+    .arrow / .feather      Arrow IPC files, the fastest to load, also with column projection.
+
+Parquet and Arrow files can't be appended to, so those datasets are directories of part files (teams.parquet/part-00000.parquet,
+...) read back together with pyarrow.dataset. An append writes a new part holding only the new rows, and rewriting a dataset (e.g.
+write_chunks) replaces it with a single part. Parquet and Arrow need pyarrow, which is optional; without it only CSV is available.
+Any dataset can always be exported back to CSV.
+
+Datasets that grow with every season (standings, teams) can also be processed in chunks. iter_chunks yields a dataset as a series of
+DataFrames sized to fit a memory budget, and write_chunks writes such a series back without ever holding all of it, so peak memory is
+set by the budget instead of by the size of the dataset.
+
+Typical use case example:
+    datasets.write(teams, "src/data/teams.parquet")
+    datasets.read("src/data/teams.parquet", columns=["tournament_id", "pokemon"])     <--- only these two columns are decoded
+    datasets.export_csv("src/data/teams.parquet")                                   <--- writes src/data/teams.csv
+
+    chunks = datasets.iter_chunks("src/data/teams.csv", memory_budget=64 * 1024 * 1024)
+    datasets.write_chunks((clean(chunk) for chunk in chunks), "src/data/teams.csv")
+
+"""
+
+import os
+import shutil
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.dataset
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+COMPRESSION = "zstd"
+
+# Columns stored as datetimes, parsed back when a dataset is read from CSV.
+DATE_COLUMNS = ["start_date", "end_date"]
+
+# Default peak memory of chunked processing. A chunk is held a few times over while it is parsed, transformed and written,
+# so it only gets a share of the budget.
+MEMORY_BUDGET = 256 * 1024 * 1024
+CHUNK_SHARE = 4
+SAMPLE_ROWS = 1000
+
+
+class CsvBackend:
+    extension = ".csv"
+
+    def write(self, df, path):
+        df.to_csv(path, index=False, encoding="utf-8", header=True)
+
+    def read(self, path, columns=None, chunksize=None):
+        header = pd.read_csv(path, nrows=0, encoding="utf-8").columns
+        wanted = header if columns is None else columns
+        return pd.read_csv(
+            path,
+            usecols=columns,
+            encoding="utf-8",
+            parse_dates=[column for column in DATE_COLUMNS if column in wanted],
+            chunksize=chunksize,
+        )
+
+    def iter_chunks(self, path, columns, chunksize):
+        with self.read(path, columns, chunksize) as reader:
+            yield from reader
+
+    def write_chunks(self, chunks, path):
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            header = True
+            for chunk in chunks:
+                chunk.to_csv(file, index=False, header=header)
+                header = False
+
+
+class ArrowBackend:
+    """Parquet and Arrow IPC datasets: directories of part files, which pyarrow reads and writes a record batch at a time.
+
+    A single file, as written before datasets were directories, is read as a dataset of one part and turned into a directory
+    on its first append.
+    """
+
+    format = None
+    extension = None
+
+    def part_path(self, path, number):
+        return os.path.join(path, f"part-{number:05d}{self.extension}")
+
+    def parts(self, path):
+        """Returns the part files of a dataset, in the order their rows were written."""
+
+        if not os.path.isdir(path):
+            return [path]
+        parts = sorted(os.path.join(path, name) for name in os.listdir(path) if name.startswith("part-") and name.endswith(self.extension))
+        if not parts:
+            raise FileNotFoundError(f"No {self.extension} part files in {path}")
+        return parts
+
+    def dataset(self, path):
+        # Every part is written with the schema of the first one, which also carries the pandas metadata.
+        parts = self.parts(path)
+        schema = pyarrow.dataset.dataset(parts[0], format=self.format).schema
+        return pyarrow.dataset.dataset(parts, format=self.format, schema=schema)
+
+    def read(self, path, columns=None):
+        return self.dataset(path).to_table(columns=columns).to_pandas()
+
+    def iter_chunks(self, path, columns, chunksize):
+        for batch in self.dataset(path).to_batches(columns=columns, batch_size=chunksize):
+            yield batch.to_pandas()
+
+    def write_chunks(self, chunks, path):
+        """Writes chunks as a new dataset directory of a single part. Nothing is created if there are no chunks."""
+        return self.write_part(chunks, self.part_path(path, 0))
+
+    def append_chunks(self, chunks, path):
+        """Writes chunks as a new part of an existing dataset, with its schema. Returns the number of rows written."""
+
+        if not os.path.isdir(path):
+            single = f"{path}.single"
+            os.replace(path, single)
+            os.makedirs(path)
+            os.replace(single, self.part_path(path, 0))
+        parts = self.parts(path)
+        number = int(os.path.basename(parts[-1])[len("part-") : -len(self.extension)]) + 1
+        return self.write_part(chunks, self.part_path(path, number), self.dataset(path).schema)
+
+    def write_part(self, chunks, part, schema=None):
+        writer = None
+        written = 0
+        try:
+            for chunk in chunks:
+                # Later chunks are cast to the schema of the first one, all the batches of a file must share it.
+                table = pyarrow.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                if writer is None:
+                    schema = self.file_schema(table.schema)
+                    table = table.cast(schema)
+                    os.makedirs(os.path.dirname(part), exist_ok=True)
+                    writer = self.open_writer(part, schema)
+                writer.write_table(table)
+                written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+    @staticmethod
+    def file_schema(schema):
+        """Types the all-missing columns of the first chunk (null in Arrow) as strings, so later chunks with values still fit.
+
+        Such columns are object columns of None, e.g. tera_type in a chunk of 2022 teams, and strings are the only values they hold.
+        """
+
+        fields = [field.with_type(pyarrow.large_string()) if pyarrow.types.is_null(field.type) else field for field in schema]
+        return pyarrow.schema(fields, metadata=schema.metadata)
+
+
+class ParquetBackend(ArrowBackend):
+    extension = ".parquet"
+    format = "parquet"
+
+    def open_writer(self, path, schema):
+        return pyarrow.parquet.ParquetWriter(path, schema, compression=COMPRESSION)
+
+
+class FeatherBackend(ArrowBackend):
+    extension = ".arrow"
+    format = "ipc"
+
+    def open_writer(self, path, schema):
+        return pyarrow.ipc.new_file(path, schema, options=pyarrow.ipc.IpcWriteOptions(compression=COMPRESSION))
+
+
+BACKENDS = {
+    ".csv": CsvBackend(),
+    ".parquet": ParquetBackend(),
+    ".arrow": FeatherBackend(),
+    ".feather": FeatherBackend(),
+}
+
+ARROW_FORMATS = {".parquet", ".arrow", ".feather"}
+
+
+def backend_for(path):
+    """Returns the backend handling the extension of path.
+
+    Raises:
+        ValueError: If the extension is unknown.
+        ImportError: If the format needs pyarrow and it is not installed.
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        backend = BACKENDS[extension]
+    except KeyError:
+        raise ValueError(f"Unknown dataset format {extension!r}, expected one of {sorted(BACKENDS)}")
+    if extension in ARROW_FORMATS and pyarrow is None:
+        raise ImportError(f"Reading or writing {extension} datasets requires pyarrow (pip install pyarrow)")
+    return backend
+
+
+def with_format(path, extension):
+    """Swaps the extension of a dataset path, e.g. ("src/data/teams.csv", ".parquet") -> "src/data/teams.parquet"."""
+    return os.path.splitext(path)[0] + extension
+
+
+def write(df, path):
+    """Writes a DataFrame in the format given by the extension of path, creating the directory if needed."""
+
+    backend = backend_for(path)
+    if isinstance(backend, ArrowBackend):
+        write_chunks([df], path)
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    backend.write(df, path)
+
+
+def read(path, columns=None):
+    """Reads a dataset written by write.
+
+    Args:
+        path: The dataset file. Its extension picks the format.
+        columns: Optional list of columns to load. Parquet and Arrow files skip the other columns entirely.
+    """
+
+    return backend_for(path).read(path, columns)
+
+
+def append(df, path):
+    """Appends rows to a dataset, creating it if it doesn't exist yet.
+
+    CSV files are appended to in place. Parquet and Arrow datasets get a new part file, so the stored rows are never rewritten.
+    """
+
+    if not os.path.exists(path):
+        write(df, path)
+    elif isinstance(backend_for(path), CsvBackend):
+        df.to_csv(path, mode="a", index=False, header=False, encoding="utf-8")
+    else:
+        backend_for(path).append_chunks([df], path)
+
+
+def export_csv(path, csv_path=None):
+    """Exports any dataset to CSV, next to it by default. Returns the CSV path."""
+
+    csv_path = csv_path or with_format(path, ".csv")
+    write(read(path), csv_path)
+    return csv_path
+
+
+def chunk_rows(path, memory_budget=MEMORY_BUDGET, columns=None):
+    """Estimates how many rows of a dataset fit in a chunk, from the in-memory size of its first rows."""
+
+    sample = next(backend_for(path).iter_chunks(path, columns, SAMPLE_ROWS), None)
+    if sample is None or sample.empty:
+        return SAMPLE_ROWS
+    row_bytes = sample.memory_usage(index=False, deep=True).sum() / len(sample)
+    return max(1, int(memory_budget / CHUNK_SHARE / max(row_bytes, 1)))
+
+
+def iter_chunks(path, columns=None, memory_budget=MEMORY_BUDGET, chunksize=None):
+    """Yields a dataset as DataFrame chunks instead of loading it whole.
+
+    At least one chunk is yielded, empty if the dataset has no rows, so the columns are always known.
+
+    Args:
+        path: The dataset file. Its extension picks the format.
+        columns: Optional list of columns to load.
+        memory_budget: Roughly how many bytes the chunks may take up while they are processed. Ignored if chunksize is given.
+        chunksize: Optional fixed number of rows per chunk.
+    """
+
+    backend = backend_for(path)
+    if chunksize is None:
+        chunksize = chunk_rows(path, memory_budget, columns)
+
+    empty = True
+    for chunk in backend.iter_chunks(path, columns, chunksize):
+        empty = False
+        yield chunk
+    if empty:
+        yield read(path, columns).iloc[0:0]
+
+
+def write_chunks(chunks, path):
+    """Writes an iterable of DataFrame chunks as one dataset and returns the number of rows written.
+
+    The chunks are written to a temporary file (or dataset directory) that replaces path at the end, so chunks may be read from
+    path itself, e.g. to transform a dataset in place. If there are no chunks at all, an existing dataset is emptied, keeping its columns.
+    """
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    root, extension = os.path.splitext(path)
+    temporary = f"{root}.partial{extension}"
+    written = 0
+
+    def counted():
+        nonlocal written
+        empty = True
+        for chunk in chunks:
+            empty = False
+            written += len(chunk)
+            yield chunk
+        if empty and os.path.exists(path):
+            yield next(iter_chunks(path, chunksize=SAMPLE_ROWS)).iloc[0:0]
+
+    try:
+        backend_for(path).write_chunks(counted(), temporary)
+    except BaseException:
+        remove(temporary)
+        raise
+    if os.path.exists(temporary):
+        if os.path.exists(path):
+            # A dataset directory can't be renamed over, so the old dataset is moved aside first.
+            previous = f"{root}.previous{extension}"
+            remove(previous)
+            os.replace(path, previous)
+            os.replace(temporary, path)
+            remove(previous)
+        else:
+            os.replace(temporary, path)
+    return written
+
+
+def remove(path):
+    """Deletes a dataset file or directory, if it exists."""
+
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def append_chunks(chunks, path):
+    """Appends an iterable of DataFrame chunks to a dataset, creating it if it doesn't exist yet.
+
+    CSV files are appended to chunk by chunk. For Parquet and Arrow datasets, the chunks are streamed into a new part file.
+    """
+
+    if not os.path.exists(path):
+        return write_chunks(chunks, path)
+    if isinstance(backend_for(path), CsvBackend):
+        written = 0
+        with open(path, "a", encoding="utf-8", newline="") as file:
+            for chunk in chunks:
+                chunk.to_csv(file, index=False, header=False)
+                written += len(chunk)
+        return written
+    return backend_for(path).append_chunks(chunks, path)
@@ -0,0 +1,47 @@
+"""Incremental tournament discovery.
+
+The rk9 events page lists every tournament ever held, but between two refreshes only a handful of rows actually change: new events get
+added, and events that were announced without a VG roster get their rk9_id once registration opens. Instead of re-crawling the standings
+and teams of every tournament in history, we compare the live listing with the tournaments we already have stored, keyed on the
+tournament_id md5 generated by scraper.fetch_all_tournament_data, and only queue the tournaments that are new or were just linked.
+
+"""
+
+import pandas as pd
+
+from .scraper import has_rk9_id
+
+
+def diff_tournaments(live, stored):
+    """Compares the live events listing with the stored tournaments.
+
+    Args:
+        live: A DataFrame of tournaments freshly scraped from the events page.
+        stored: A DataFrame of tournaments previously saved to the tournaments csv.
+
+    Returns:
+        A (merged, queue) tuple. merged is the stored table with new tournaments appended and newly linked tournaments updated,
+        in the stored order. queue holds the tournaments whose standings and teams need to be crawled: tournaments we have never
+        seen before, and tournaments whose rk9_id has just appeared. Tournaments without an rk9_id are stored but never queued.
+    """
+
+    live = live.drop_duplicates(subset="tournament_id", keep="first")
+    stored_ids = set(stored["tournament_id"])
+    stored_linked = {
+        tournament_id
+        for tournament_id, rk9_id in zip(stored["tournament_id"], stored["rk9_id"])
+        if has_rk9_id(rk9_id)
+    }
+
+    live_linked = live["rk9_id"].map(has_rk9_id).astype(bool)
+    is_new = ~live["tournament_id"].isin(stored_ids)
+    newly_linked = ~is_new & live_linked & ~live["tournament_id"].isin(stored_linked)
+
+    updated = live[newly_linked].set_index("tournament_id")
+    merged = stored.set_index("tournament_id")
+    merged.update(updated)
+    merged = pd.concat([merged.reset_index(), live[is_new]], ignore_index=True)
+
+    queue = live[(is_new | newly_linked) & live_linked].reset_index(drop=True)
+
+    return merged, queue
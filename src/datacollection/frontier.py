@@ -0,0 +1,139 @@
+"""Persistent crawl frontier for teamlist pages.
+
+A Worlds roster has well over a thousand players, and each of them has a teamlist page to download and parse. If the process dies
+halfway through, everything gathered in memory is lost. The frontier keeps the state of every teamlist URL in a small SQLite database
+(pending, done or failed along with the error), and stores the parsed team members of completed pages next to it. Each page is
+committed as soon as it is done, so a crash or a Ctrl-C resumes where it stopped instead of re-downloading everything.
+Placeholder entries (players who did not publish a teamlist) and duplicate teamlist ids are never queued.
+
+"""
+
+import json
+import sqlite3
+import time
+
+import pandas as pd
+
+FRONTIER_PATH = "src/data/teams_frontier.sqlite"
+PLACEHOLDERS = {"", "Submitted"}
+MAX_ATTEMPTS = 3
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def is_placeholder(team_list):
+    """rk9 shows 'Submitted' instead of a link when a teamlist isn't public, which ends up in the csv as-is or as NaN."""
+    return pd.isna(team_list) or str(team_list).strip() in PLACEHOLDERS
+
+
+class CrawlFrontier:
+    """Tracks the crawl state of teamlist pages in an SQLite database.
+
+    Args:
+        path: Location of the SQLite database. Use ":memory:" for a frontier that doesn't survive the process.
+        max_attempts: How many times a failing teamlist is retried across runs before it is left alone.
+    """
+
+    def __init__(self, path=FRONTIER_PATH, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS frontier (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                team_list TEXT UNIQUE,
+                tournament_id TEXT,
+                player_id TEXT,
+                state TEXT,
+                attempts INTEGER DEFAULT 0,
+                error TEXT,
+                members TEXT,
+                updated_at REAL
+            )
+            """
+        )
+        self._db.commit()
+
+    def add(self, rows):
+        """Queues teamlists, skipping placeholders and ids that are already known.
+
+        Args:
+            rows: An iterable of (team_list, tournament_id, player_id) tuples.
+
+        Returns:
+            A dictionary counting the rows that were queued, skipped as placeholders and skipped as duplicates.
+        """
+
+        counts = {"queued": 0, "placeholders": 0, "duplicates": 0}
+        now = time.time()
+        for team_list, tournament_id, player_id in rows:
+            if is_placeholder(team_list):
+                counts["placeholders"] += 1
+                continue
+            cursor = self._db.execute(
+                """
+                INSERT OR IGNORE INTO frontier (team_list, tournament_id, player_id, state, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (team_list, tournament_id, player_id, PENDING, now),
+            )
+            counts["queued" if cursor.rowcount else "duplicates"] += 1
+        self._db.commit()
+        return counts
+
+    def pending(self):
+        """Returns the (team_list, tournament_id, player_id) tuples still to crawl, including failures with attempts left."""
+
+        return self._db.execute(
+            """
+            SELECT team_list, tournament_id, player_id FROM frontier
+            WHERE state = ? OR (state = ? AND attempts < ?)
+            ORDER BY seq
+            """,
+            (PENDING, FAILED, self.max_attempts),
+        ).fetchall()
+
+    def mark_done(self, team_list, members):
+        self._db.execute(
+            "UPDATE frontier SET state = ?, attempts = attempts + 1, error = NULL, members = ?, updated_at = ? WHERE team_list = ?",
+            (DONE, json.dumps(members), time.time(), team_list),
+        )
+        self._db.commit()
+
+    def mark_failed(self, team_list, error):
+        self._db.execute(
+            "UPDATE frontier SET state = ?, attempts = attempts + 1, error = ?, updated_at = ? WHERE team_list = ?",
+            (FAILED, str(error), time.time(), team_list),
+        )
+        self._db.commit()
+
+    def results(self, team_lists=None):
+        """Yields (tournament_id, player_id, members) for completed teamlists in the order they were queued.
+
+        Args:
+            team_lists: Optional collection of teamlist ids to restrict the results to.
+        """
+
+        wanted = None if team_lists is None else set(team_lists)
+        for team_list, tournament_id, player_id, members in self._db.execute(
+            "SELECT team_list, tournament_id, player_id, members FROM frontier WHERE state = ? ORDER BY seq",
+            (DONE,),
+        ):
+            if wanted is None or team_list in wanted:
+                yield tournament_id, player_id, json.loads(members)
+
+    def failures(self):
+        """Returns (team_list, attempts, error) for every teamlist currently marked as failed."""
+
+        return self._db.execute(
+            "SELECT team_list, attempts, error FROM frontier WHERE state = ? ORDER BY seq", (FAILED,)
+        ).fetchall()
+
+    def counts(self):
+        return dict(self._db.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall())
+
+    def close(self):
+        self._db.close()
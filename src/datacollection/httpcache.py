@@ -0,0 +1,241 @@
+"""On-disk HTTP response cache used by the shared HTTP client.
+
+Almost nothing we crawl changes between two weekly refreshes: published teamlists are frozen once a tournament is over, PokeAPI
+resources move very slowly, and only the rk9 events listing and recent rosters get updated regularly. This cache stores every
+successful response body on disk together with its ETag and Last-Modified headers. Each URL gets a time-to-live from TTL_RULES;
+while an entry is fresh it is served straight from disk, and once it goes stale it is revalidated with a conditional GET, so an
+unchanged page only costs a 304 instead of a full download. The cache is capped in size and evicts the least recently used entries.
+
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CACHE_DIR = "src/data/cache"
+MAX_CACHE_SIZE = 2 * 1024**3
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# Checked in order, first match wins. A TTL of None means the entry never goes stale.
+TTL_RULES = [
+    (r"rk9\.gg/teamlist/public/", None),
+    (r"rk9\.gg/events/pokemon", HOUR),
+    (r"rk9\.gg/roster/", 6 * HOUR),
+    (r"pokeapi\.co/", 7 * DAY),
+    # Revision lookups have to see edits, bulbapedia.EffectFallback caches the extracted effects by revision itself.
+    (r"bulbapedia\.bulbagarden\.net/w/api\.php", 0),
+    (r"bulbapedia\.bulbagarden\.net/", 30 * DAY),
+    (r"pokemondb\.net/", 7 * DAY),
+]
+DEFAULT_TTL = DAY
+
+# Bodies are stored already decoded, so transport headers no longer describe them.
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class CacheEntry:
+    """A cached response as stored in the index."""
+
+    def __init__(self, url, path, etag, last_modified, encoding, headers, stored_at, size):
+        self.url = url
+        self.path = path
+        self.etag = etag
+        self.last_modified = last_modified
+        self.encoding = encoding
+        self.headers = headers
+        self.stored_at = stored_at
+        self.size = size
+
+
+class ResponseCache:
+    """Stores response bodies on disk with an SQLite index of validators and access times.
+
+    Args:
+        cache_dir: Directory holding the index database and the body files.
+        max_size: Total size in bytes of stored bodies before least recently used entries are evicted.
+        ttl_rules: List of (regex, seconds) pairs matched against the URL. None as seconds means never stale.
+        default_ttl: TTL used when no rule matches.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_size=MAX_CACHE_SIZE, ttl_rules=None, default_ttl=DEFAULT_TTL):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.ttl_rules = [
+            (re.compile(pattern), ttl) for pattern, ttl in (TTL_RULES if ttl_rules is None else ttl_rules)
+        ]
+        self.default_ttl = default_ttl
+
+        os.makedirs(os.path.join(cache_dir, "bodies"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                path TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                encoding TEXT,
+                headers TEXT,
+                stored_at REAL,
+                last_access REAL,
+                size INTEGER
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+        self._db.commit()
+
+    def ttl_for(self, url):
+        """Returns the time-to-live in seconds for a URL, or None if it never expires."""
+
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def is_fresh(self, entry, now=None):
+        ttl = self.ttl_for(entry.url)
+        if ttl is None:
+            return True
+        return (now or time.time()) - entry.stored_at < ttl
+
+    def lookup(self, url):
+        """Returns the CacheEntry for a URL, or None if it is not cached."""
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, path, etag, last_modified, encoding, headers, stored_at, size FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        entry = CacheEntry(*row)
+        entry.headers = json.loads(entry.headers)
+        if not os.path.exists(entry.path):
+            self.delete(url)
+            return None
+        return entry
+
+    def conditional_headers(self, entry):
+        """Builds the If-None-Match / If-Modified-Since headers used to revalidate an entry."""
+
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def to_response(self, entry):
+        """Rebuilds a requests.Response from a cached entry."""
+
+        with open(entry.path, "rb") as file:
+            content = file.read()
+
+        response = requests.Response()
+        response._content = content
+        response.status_code = 200
+        response.url = entry.url
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response.encoding = entry.encoding
+        response.from_cache = True
+
+        with self._lock:
+            self._db.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), entry.url))
+            self._db.commit()
+        return response
+
+    def store(self, url, response):
+        """Saves a successful response body and its validators, then evicts old entries if needed."""
+
+        content = response.content
+        path = os.path.join(self.cache_dir, "bodies", hashlib.sha1(url.encode()).hexdigest())
+        with open(path, "wb") as file:
+            file.write(content)
+
+        headers = {
+            key: value for key, value in response.headers.items() if key.lower() not in DROPPED_HEADERS
+        }
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    path,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    response.encoding,
+                    json.dumps(headers),
+                    now,
+                    now,
+                    len(content),
+                ),
+            )
+            self._db.commit()
+        self.evict()
+
+    def revalidated(self, url, response):
+        """Marks an entry as fresh again after the server answered a conditional GET with 304."""
+
+        with self._lock:
+            now = time.time()
+            self._db.execute(
+                """
+                UPDATE responses
+                SET stored_at = ?, last_access = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                WHERE url = ?
+                """,
+                (now, now, response.headers.get("ETag"), response.headers.get("Last-Modified"), url),
+            )
+            self._db.commit()
+
+    def delete(self, url):
+        with self._lock:
+            row = self._db.execute("SELECT path FROM responses WHERE url = ?", (url,)).fetchone()
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self._db.commit()
+        if row and os.path.exists(row[0]):
+            os.remove(row[0])
+
+    def size(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in max_size."""
+
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_size:
+                return
+
+            removed = []
+            for url, path, size in self._db.execute(
+                "SELECT url, path, size FROM responses ORDER BY last_access ASC"
+            ).fetchall():
+                if total <= self.max_size:
+                    break
+                removed.append((url, path))
+                total -= size
+
+            self._db.executemany("DELETE FROM responses WHERE url = ?", [(url,) for url, _ in removed])
+            self._db.commit()
+
+        for _, path in removed:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        self._db.close()
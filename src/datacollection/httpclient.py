@@ -0,0 +1,328 @@
+"""Shared HTTP client used by the scraper and pokeapi modules.
+
+Every page we crawl (rk9 rosters and teamlists, PokeAPI resources, Bulbapedia fallbacks) used to be fetched with a bare requests.get,
+which opens a brand new TCP + TLS connection for every single request. This module keeps one requests.Session around with a pooled
+adapter per host, so connections are kept alive and reused across the whole run. It also takes care of compression negotiation,
+timeouts and retrying with exponential backoff, and keeps a small set of counters so we can see how often connections are reused.
+When given a ResponseCache (see httpcache.py), responses are served from disk and revalidated with conditional GETs, and when given
+a RateLimiter (see ratelimit.py), every request that goes to the network first waits for its host's limiter. The record and replay
+hooks used for offline runs are described in replay.py.
+
+"""
+
+import email.utils
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from . import httpcache, ratelimit
+
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_POOL_SIZE = 10
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+HOST_POOL_SIZES = {
+    "rk9.gg": 32,
+    "pokeapi.co": 16,
+    "bulbapedia.bulbagarden.net": 4,
+    "pokemondb.net": 4,
+}
+
+
+class HttpClient:
+    """A keep-alive HTTP client with a connection pool per host.
+
+    Args:
+        pool_sizes: Mapping of hostname to the maximum number of connections kept open for that host.
+        default_pool_size: Pool size used for hosts that are not listed in pool_sizes.
+        timeout: Timeout passed to requests, either a single number or a (connect, read) tuple.
+        max_retries: How many times a failed request is retried before giving up.
+        backoff_factor: Base delay in seconds for the exponential backoff between retries.
+        cache: An optional httpcache.ResponseCache. When set, GET responses are cached on disk and revalidated once stale.
+        rate_limiter: An optional ratelimit.RateLimiter throttling requests per host and adapting their concurrency.
+        recorder: An optional replay.Recorder that is handed every response returned by get.
+        replay_base: Base URL of a replay.ReplayServer. When set, every request is sent there instead of to the real host.
+    """
+
+    def __init__(
+        self,
+        pool_sizes=None,
+        default_pool_size=DEFAULT_POOL_SIZE,
+        timeout=DEFAULT_TIMEOUT,
+        max_retries=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        cache=None,
+        rate_limiter=None,
+        recorder=None,
+        replay_base=None,
+    ):
+        self.pool_sizes = dict(HOST_POOL_SIZES if pool_sizes is None else pool_sizes)
+        self.default_pool_size = default_pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.recorder = recorder
+        self.replay_base = replay_base
+
+        self.session = requests.Session()
+        self.session.headers.update(make_headers(accept_encoding=True, keep_alive=True))
+
+        self._adapters = {}
+        self._lock = threading.Lock()
+        self._retries = {}
+        self._cache_stats = {"hits": 0, "revalidated": 0, "misses": 0}
+
+        self.session.mount("http://", self._make_adapter(default_pool_size))
+        self.session.mount("https://", self._make_adapter(default_pool_size))
+        for host, size in self.pool_sizes.items():
+            self.set_pool_size(host, size)
+
+    def _make_adapter(self, size):
+        return HTTPAdapter(pool_connections=size, pool_maxsize=size, max_retries=0)
+
+    def set_pool_size(self, host, size):
+        """Mounts a dedicated adapter for the given host with its own pool size."""
+
+        adapter = self._make_adapter(size)
+        self.pool_sizes[host] = size
+        self._adapters[host] = adapter
+        for scheme in ("http://", "https://"):
+            self.session.mount(f"{scheme}{host}/", adapter)
+
+    def _backoff(self, attempt):
+        """Exponential backoff with a bit of jitter so parallel workers don't retry in lockstep."""
+        delay = self.backoff_factor * (2**attempt)
+        return delay + random.uniform(0, delay / 2)
+
+    def get(self, url, **kwargs):
+        """Sends a GET request, going through the response cache when one is configured.
+
+        Fresh cache entries are returned without touching the network. Stale entries are revalidated with a conditional GET
+        and reused when the server answers 304 Not Modified. Cached responses have a from_cache attribute set to True.
+
+        Args:
+            url: The URL to fetch.
+            **kwargs: Extra arguments forwarded to requests.Session.get.
+
+        Returns:
+            A requests.Response.
+        """
+
+        if kwargs.get("params"):
+            url = requests.Request("GET", url, params=kwargs.pop("params")).prepare().url
+
+        response = self._get(url, **kwargs)
+        if self.recorder is not None:
+            self.recorder.record(url, response)
+        return response
+
+    def _get(self, url, **kwargs):
+        if self.cache is None:
+            return self._send(url, **kwargs)
+
+        entry = self.cache.lookup(url)
+        if entry is not None and self.cache.is_fresh(entry):
+            self._count_cache("hits")
+            return self.cache.to_response(entry)
+
+        if entry is not None:
+            headers = dict(kwargs.pop("headers", None) or {})
+            headers.update(self.cache.conditional_headers(entry))
+            kwargs["headers"] = headers
+
+        response = self._send(url, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self._count_cache("revalidated")
+            self.cache.revalidated(url, response)
+            return self.cache.to_response(entry)
+
+        self._count_cache("misses")
+        if response.status_code == 200:
+            self.cache.store(url, response)
+        return response
+
+    def _count_cache(self, outcome):
+        with self._lock:
+            self._cache_stats[outcome] += 1
+
+    def _send(self, url, **kwargs):
+        """Sends a GET request, retrying on connection errors and retryable status codes.
+
+        Args:
+            url: The URL to fetch.
+            **kwargs: Extra arguments forwarded to requests.Session.get.
+
+        Returns:
+            The final requests.Response. A response with a retryable status is returned as-is once retries are exhausted.
+
+        Raises:
+            requests.RequestException: If the request still fails after all retries.
+        """
+
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).hostname
+
+        limiter = self.rate_limiter.for_host(host) if self.rate_limiter is not None else None
+        if self.replay_base is not None:
+            url = rebase_url(self.replay_base, url)
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            if limiter is not None:
+                limiter.acquire()
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, **kwargs)
+            except BaseException as error:
+                # Every failure frees the slot, not just the retryable ones, or the host would stay blocked in acquire.
+                if limiter is not None:
+                    limiter.release(None, time.monotonic() - start)
+                if not isinstance(error, (requests.ConnectionError, requests.Timeout)) or attempt == self.max_retries:
+                    raise
+            else:
+                if response.status_code in (429, 503):
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if limiter is not None:
+                    limiter.release(response.status_code, time.monotonic() - start, retry_after)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                response.close()
+
+            with self._lock:
+                self._retries[host] = self._retries.get(host, 0) + 1
+            time.sleep(max(self._backoff(attempt), retry_after or 0))
+
+    def get_json(self, url, **kwargs):
+        """Fetches a URL and decodes the body as JSON, raising on HTTP errors."""
+
+        response = self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def stats(self):
+        """Reports connection reuse per host.
+
+        Returns:
+            A dictionary keyed by host, each value containing the number of requests sent, connections opened,
+            requests that reused an existing connection, and retries.
+        """
+
+        adapters = {id(adapter): adapter for adapter in self.session.adapters.values()}
+        report = {}
+        for adapter in adapters.values():
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                host = pool.host
+                entry = report.setdefault(
+                    host, {"requests": 0, "connections": 0, "reused": 0, "retries": 0}
+                )
+                entry["requests"] += pool.num_requests
+                entry["connections"] += pool.num_connections
+
+        for host, entry in report.items():
+            entry["reused"] = max(entry["requests"] - entry["connections"], 0)
+            entry["retries"] = self._retries.get(host, 0)
+
+        return report
+
+    def cache_stats(self):
+        """Returns how many responses were served fresh from the cache, revalidated with a 304, or downloaded."""
+
+        with self._lock:
+            return dict(self._cache_stats)
+
+    def print_stats(self):
+        """Prints a short connection reuse summary for every host contacted."""
+
+        for host, entry in sorted(self.stats().items()):
+            print(
+                f"{host}: {entry['requests']} requests over {entry['connections']} connections "
+                f"({entry['reused']} reused, {entry['retries']} retries)"
+            )
+        if self.rate_limiter is not None:
+            for host, entry in sorted(self.rate_limiter.stats().items()):
+                print(
+                    f"{host}: concurrency settled at {entry['concurrency']}, {entry['throttled']} throttled responses, "
+                    f"{entry['decreases']} backoffs, {entry['waited']:.1f}s spent waiting on the limiter"
+                )
+        if self.cache is not None:
+            cache = self.cache_stats()
+            print(
+                f"cache: {cache['hits']} fresh hits, {cache['revalidated']} revalidated, {cache['misses']} downloaded"
+            )
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+def rebase_url(base, url):
+    """Maps https://rk9.gg/roster/ABC to {base}/rk9.gg/roster/ABC, the layout served by replay.ReplayServer."""
+
+    parts = urlsplit(url)
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{base}/{parts.netloc}{parts.path}{query}"
+
+
+def parse_retry_after(value):
+    """Converts a Retry-After header, given either in seconds or as an HTTP date, into seconds to wait."""
+
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the process-wide client shared by every fetcher, creating it on first use."""
+
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(cache=httpcache.ResponseCache(), rate_limiter=ratelimit.RateLimiter())
+        return _client
+
+
+def set_client(client):
+    """Replaces the shared client, e.g. to change pool sizes or timeouts for a run.
+
+    Returns:
+        The previous shared client, or None if none had been created yet.
+    """
+
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+        return previous
+
+
+def get(url, **kwargs):
+    return get_client().get(url, **kwargs)
+
+
+def get_json(url, **kwargs):
+    return get_client().get_json(url, **kwargs)
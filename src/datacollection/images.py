@@ -0,0 +1,195 @@
+"""Content-addressed local store for sprites and item icons.
+
+Every team member row carries a remote sprite URL from rk9, the Pokémon CSV has a PokeAPI sprite per species and the icons CSV links to
+pokemondb item icons. The same few hundred images are repeated across tens of thousands of rows, and anything rendering a team (like
+the Discord bot) used to fetch each of them remotely every time. ImageStore downloads every unique URL once, concurrently, and saves
+it under the SHA-256 of its content, so identical images published under different URLs are only stored once. A small SQLite index
+maps each URL to its key, which makes the sync incremental: URLs that are already in the store are never requested again.
+Once synced, the image columns of our CSVs are rewritten from remote URLs to local keys, and ImageStore.path turns a key into a file.
+
+Typical use case example:
+    store = images.ImageStore()
+    store.sync(df["icon"])                   <--- downloads what isn't stored yet
+    df = store.rewrite(df, ["icon"])         <--- https://storage.googleapis.com/.../025_000.png -> 3f2a...9c.png
+
+"""
+
+import concurrent.futures
+import hashlib
+import os
+import posixpath
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from . import httpclient
+
+IMAGES_DIR = "src/data/images"
+INDEX_FILE = "index.sqlite"
+OBJECTS_DIR = "objects"
+SYNC_WORKERS = 16
+
+EXTENSIONS = {
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+    "image/svg+xml": ".svg",
+}
+DEFAULT_EXTENSION = ".png"
+
+
+def is_remote(value):
+    return isinstance(value, str) and value.startswith(("http://", "https://"))
+
+
+def extension(url, content_type=None):
+    """Picks a file extension from the URL path, falling back to the Content-Type of the response."""
+
+    suffix = posixpath.splitext(urlsplit(url).path)[1].lower()
+    if suffix in EXTENSIONS.values() or suffix == ".jpeg":
+        return ".jpg" if suffix == ".jpeg" else suffix
+    if content_type:
+        return EXTENSIONS.get(content_type.split(";")[0].strip().lower(), DEFAULT_EXTENSION)
+    return DEFAULT_EXTENSION
+
+
+def download(url):
+    """Runs in a worker thread: fetches one image and returns (url, content, extension)."""
+
+    response = httpclient.get(url)
+    response.raise_for_status()
+    return url, response.content, extension(url, response.headers.get("Content-Type"))
+
+
+class ImageStore:
+    """Stores images on disk under the hash of their content, with an index from source URL to key.
+
+    Args:
+        root: Directory holding the index and the image files.
+    """
+
+    def __init__(self, root=IMAGES_DIR):
+        self.root = root
+        os.makedirs(os.path.join(root, OBJECTS_DIR), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, INDEX_FILE))
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY,
+                key TEXT,
+                size INTEGER,
+                fetched_at REAL
+            )
+            """
+        )
+        self._db.commit()
+
+    def path(self, key):
+        """Returns the file holding the image with the given key. Keys are sharded by their first two characters."""
+        return os.path.join(self.root, OBJECTS_DIR, key[:2], key)
+
+    def key_for(self, url):
+        row = self._db.execute("SELECT key FROM images WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def mapping(self):
+        """Returns a dictionary of every known source URL to its local key."""
+        return dict(self._db.execute("SELECT url, key FROM images"))
+
+    def put(self, url, content, ext=DEFAULT_EXTENSION):
+        """Saves an image and records which URL it came from.
+
+        Returns:
+            The key of the image: the hex SHA-256 of its content followed by the extension.
+        """
+
+        key = hashlib.sha256(content).hexdigest() + ext
+        path = self.path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as file:
+                file.write(content)
+            os.replace(temp_path, path)
+
+        self._db.execute(
+            "INSERT OR REPLACE INTO images (url, key, size, fetched_at) VALUES (?, ?, ?, ?)",
+            (url, key, len(content), time.time()),
+        )
+        self._db.commit()
+        return key
+
+    def missing(self, urls):
+        """Returns the unique remote URLs, in first-seen order, that are not in the store yet or whose file has gone missing."""
+
+        known = self.mapping()
+        wanted = []
+        seen = set()
+        for url in urls:
+            if not is_remote(url) or url in seen:
+                continue
+            seen.add(url)
+            key = known.get(url)
+            if key is None or not os.path.exists(self.path(key)):
+                wanted.append(url)
+        return wanted
+
+    def sync(self, urls, max_workers=SYNC_WORKERS):
+        """Downloads every image that isn't stored yet, max_workers at a time.
+
+        Args:
+            urls: An iterable of image URLs, typically a whole column with lots of repetitions. Non-URL values are ignored.
+            max_workers: Number of concurrent downloads.
+
+        Returns:
+            A dictionary counting the images that were downloaded, already stored, or failed, plus a list of (url, error) failures.
+        """
+
+        urls = list(urls)
+        wanted = self.missing(urls)
+        unique = len({url for url in urls if is_remote(url)})
+        counts = {"downloaded": 0, "stored": unique - len(wanted), "failed": 0, "errors": []}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(download, url): url for url in wanted}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    url, content, ext = future.result()
+                except Exception as e:
+                    counts["failed"] += 1
+                    counts["errors"].append((futures[future], str(e)))
+                    continue
+                self.put(url, content, ext)
+                counts["downloaded"] += 1
+
+        return counts
+
+    def rewrite(self, df, columns):
+        """Replaces image URLs in the given columns with their local keys.
+
+        Values that are already keys, empty, or whose image could not be downloaded are left untouched, so rewriting is idempotent.
+
+        Returns:
+            A copy of df with the columns rewritten.
+        """
+
+        mapping = self.mapping()
+        df = df.copy()
+        for column in columns:
+            if column in df.columns:
+                df[column] = df[column].map(lambda value: mapping.get(value, value) if is_remote(value) else value)
+        return df
+
+    def close(self):
+        self._db.close()
+
+
+def sync_columns(df, columns, store, max_workers=SYNC_WORKERS):
+    """Syncs every image referenced in the given columns of df, then returns (rewritten df, counts)."""
+
+    urls = pd.concat([df[column] for column in columns if column in df.columns], ignore_index=True)
+    counts = store.sync(urls, max_workers=max_workers)
+    return store.rewrite(df, columns), counts
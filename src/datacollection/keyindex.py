@@ -0,0 +1,455 @@
+"""Primary-key index kept next to the standings and teams datasets, so appending to them is idempotent.
+
+Incremental crawls used to append their rows blindly, so crawling a tournament twice stored its standings twice, and the only
+dedupe was a drop_duplicates over the whole table in memory. Every dataset that is appended to now gets a small SQLite sidecar
+(standings.csv gets standings.keys.sqlite) holding the primary key of every stored row, e.g. (tournament_id, player_id) for the
+standings, along with a fingerprint of the row. Before rows are appended, their keys are looked up in the index:
+
+    new key                       appended
+    known key, same row           skipped
+    known key, different row      skipped, or with replace=True appended, the older row becoming stale
+
+Only the new rows are hashed and looked up, so the cost of an append no longer grows with the history, even when rows are replaced:
+the index records the position of the row each key currently points to, and the positions of the rows replaced since. Readers drop
+those stale rows as they go (iter_latest, read_latest), so the last row stored for a key wins. Once stale rows make up more than
+COMPACT_RATIO of the dataset, it is compacted, streaming it through datasets.write_chunks a chunk at a time.
+
+The index remembers the size and modification time of the dataset it describes. If the dataset was rewritten behind its back
+(or the index is new), it is rebuilt from the dataset once, reading it in chunks.
+
+Typical use case example:
+    keyindex.append_unique(standings, "src/data/standings.csv", ["tournament_id", "player_id"])
+    keyindex.append_unique(standings, "src/data/standings.csv", ["tournament_id", "player_id"])     <--- appends nothing
+
+"""
+
+import hashlib
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from . import datasets
+
+# Joins the values of a composite key. It can't appear in the ids, names and species the keys are made of.
+SEPARATOR = "\x1f"
+LOOKUP_CHUNK_SIZE = 500
+# Bumped whenever keys or fingerprints are computed differently, so indexes written before are rebuilt instead of mismatching.
+INDEX_VERSION = 2
+# Values read_csv turns into NaN, and the text every missing value is keyed and hashed as.
+CSV_MISSING_VALUES = frozenset(
+    ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN",
+     "None", "n/a", "nan", "null"]
+)
+MISSING_TEXT = "\x00"
+# Share of stale rows above which an append compacts the dataset.
+COMPACT_RATIO = 0.25
+
+
+def index_path(path):
+    """src/data/standings.csv -> src/data/standings.keys.sqlite"""
+    return os.path.splitext(path)[0] + ".keys.sqlite"
+
+
+def format_number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def csv_text(series):
+    """Returns the values of a column as the text they compare as, whether they were just crawled or read back from a dataset.
+
+    A CSV doesn't keep None, "N/A" or the int/float distinction of a column with missing values, so every missing value becomes
+    MISSING_TEXT and every number its shortest form ("3", not "3.0").
+    """
+
+    values = series.astype(object)
+    missing = series.isna().to_numpy().copy()
+    if not pd.api.types.is_numeric_dtype(series):
+        missing |= values.map(lambda value: isinstance(value, str) and value in CSV_MISSING_VALUES).to_numpy(dtype=bool)
+    numbers = pd.to_numeric(values.where(~missing), errors="coerce").to_numpy(dtype=float)
+    is_number = ~np.isnan(numbers)
+    text = np.array(values.map(str), dtype=object)
+    text[is_number] = [format_number(value) for value in numbers[is_number]]
+    text[missing] = MISSING_TEXT
+    return pd.Series(text, index=series.index, dtype=object)
+
+
+def row_keys(df, key_columns):
+    """Returns the key of every row of df as a single string."""
+
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    keys = csv_text(df[key_columns[0]])
+    for column in key_columns[1:]:
+        keys = keys + SEPARATOR + csv_text(df[column])
+    return keys
+
+
+def row_fingerprints(df):
+    """Hashes every row of df. Values are compared as csv_text, so a row hashes the same before and after a round trip to disk."""
+
+    text = pd.DataFrame({position: csv_text(df.iloc[:, position]) for position in range(df.shape[1])}, index=df.index)
+    hashes = pd.util.hash_pandas_object(text, index=False)
+    return pd.Series([f"{value:016x}" for value in hashes], index=df.index, dtype=object)
+
+
+class KeyIndex:
+    """The keys and row fingerprints of a dataset, stored in an SQLite database.
+
+    Args:
+        path: Location of the SQLite database, usually index_path(dataset). Use ":memory:" for an index that doesn't survive the process.
+        key_columns: The columns that identify a row.
+    """
+
+    def __init__(self, path, key_columns):
+        self.path = path
+        self.key_columns = list(key_columns)
+        self._db = sqlite3.connect(path)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(keys)")]
+        if columns and "row" not in columns:
+            # Indexes written before rows had positions are dropped, sync rebuilds them from the dataset.
+            self._db.executescript("DROP TABLE keys; DROP TABLE IF EXISTS dataset;")
+        if "version" not in [row[1] for row in self._db.execute("PRAGMA table_info(dataset)")]:
+            # Without a version, the dataset stamp never matches and sync rebuilds the index.
+            self._db.execute("DROP TABLE IF EXISTS dataset")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS keys (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT,
+                row INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS stale (
+                row INTEGER PRIMARY KEY
+            );
+            CREATE TABLE IF NOT EXISTS dataset (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                key_columns TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                rows INTEGER,
+                version INTEGER
+            );
+            """
+        )
+        self._db.commit()
+        stored = self._db.execute("SELECT rows FROM dataset").fetchone()
+        self.rows = stored[0] if stored else 0
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    def lookup(self, keys):
+        """Returns a dictionary of key to fingerprint for the given keys that are in the index."""
+
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[start : start + LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            found.update(self._db.execute(f"SELECT key, fingerprint FROM keys WHERE key IN ({placeholders})", chunk))
+        return found
+
+    def select(self, df, replace=False):
+        """Picks the rows of df that should be appended to the dataset.
+
+        Rows repeating a key within df are dropped first, keeping the first one, or the last one with replace=True.
+
+        Args:
+            df: The rows about to be appended.
+            replace: If True, rows whose key is stored but whose values changed are kept too.
+
+        Returns:
+            A (rows, counts) tuple: the rows to append and a dictionary counting the new, skipped and replaced rows.
+        """
+
+        df = df.drop_duplicates(subset=self.key_columns, keep="last" if replace else "first")
+        keys = row_keys(df, self.key_columns)
+        known = self.lookup(keys)
+        is_new = ~keys.isin(list(known))
+
+        replaced = pd.Series(False, index=df.index)
+        if replace and known:
+            stored = keys.map(known)
+            replaced = ~is_new & (row_fingerprints(df) != stored)
+
+        rows = df[is_new | replaced]
+        counts = {"new": int(is_new.sum()), "skipped": len(df) - len(rows), "replaced": int(replaced.sum())}
+        return rows, counts
+
+    def add(self, df):
+        """Records the rows of df as appended to the end of the dataset, in order.
+
+        A key that was already stored, or that df repeats, now points to its last row, and its earlier rows become stale.
+        """
+
+        if df.empty:
+            return
+        keys = row_keys(df, self.key_columns)
+        positions = pd.Series(np.arange(self.rows, self.rows + len(df)), index=df.index)
+        repeated = keys.duplicated(keep="last")
+        latest = ~repeated
+        earlier = self._db_rows(keys[latest])
+        with self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO stale (row) VALUES (?)",
+                [(int(row),) for row in [*positions[repeated], *earlier]],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO keys (key, fingerprint, row) VALUES (?, ?, ?)",
+                zip(keys[latest], row_fingerprints(df[latest]), (int(row) for row in positions[latest])),
+            )
+        self.rows += len(df)
+
+    def _db_rows(self, keys):
+        keys = list(keys)
+        rows = []
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[start : start + LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            rows.extend(row for (row,) in self._db.execute(f"SELECT row FROM keys WHERE key IN ({placeholders})", chunk))
+        return rows
+
+    def stale_rows(self):
+        """Returns the sorted positions of the rows that a later row with the same key replaced."""
+        return np.array([row for (row,) in self._db.execute("SELECT row FROM stale ORDER BY row")], dtype=np.int64)
+
+    def stale_count(self):
+        return self._db.execute("SELECT COUNT(*) FROM stale").fetchone()[0]
+
+    def group_digests(self):
+        """Returns a digest of the keys and fingerprints of every value of the first key column, e.g. of every tournament."""
+
+        digests = {}
+        group, digest = None, None
+        # Keys are sorted as text and the separator sorts below every printable character, so each group is one run of keys.
+        for key, fingerprint in self._db.execute("SELECT key, fingerprint FROM keys ORDER BY key"):
+            prefix = key.split(SEPARATOR, 1)[0]
+            if prefix != group:
+                if digest is not None:
+                    digests[group] = digest.hexdigest()
+                group, digest = prefix, hashlib.sha256()
+            digest.update(f"{key}{SEPARATOR}{fingerprint}\n".encode())
+        if digest is not None:
+            digests[group] = digest.hexdigest()
+        return digests
+
+    def clear(self):
+        with self._db:
+            self._db.execute("DELETE FROM keys")
+            self._db.execute("DELETE FROM stale")
+            self._db.execute("DELETE FROM dataset")
+        self.rows = 0
+
+    def stamp(self, dataset_path):
+        """Marks the index as describing the dataset file as it is right now."""
+
+        stat = os.stat(dataset_path)
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO dataset (id, key_columns, size, mtime_ns, rows, version) VALUES (0, ?, ?, ?, ?, ?)",
+                (SEPARATOR.join(self.key_columns), stat.st_size, stat.st_mtime_ns, self.rows, INDEX_VERSION),
+            )
+
+    def is_current(self, dataset_path):
+        """True if the index was stamped for this exact version of the dataset file, with the same key columns and INDEX_VERSION."""
+
+        stored = self._db.execute("SELECT key_columns, size, mtime_ns, version FROM dataset").fetchone()
+        if stored is None or not os.path.exists(dataset_path):
+            return False
+        stat = os.stat(dataset_path)
+        return stored == (SEPARATOR.join(self.key_columns), stat.st_size, stat.st_mtime_ns, INDEX_VERSION)
+
+    def rebuild(self, df, dataset_path):
+        """Replaces the whole index with the keys of df, which is the full content of the dataset at dataset_path."""
+
+        self.clear()
+        self.add(df)
+        self.stamp(dataset_path)
+
+    def sync(self, dataset_path):
+        """Makes sure the index describes the dataset before it is appended to, reading the full dataset only if it doesn't."""
+
+        if not os.path.exists(dataset_path):
+            self.clear()
+        elif not self.is_current(dataset_path):
+            print(f"Rebuilding the key index of {dataset_path}")
+            self.clear()
+            for chunk in datasets.iter_chunks(dataset_path):
+                self.add(chunk)
+            self.stamp(dataset_path)
+
+    def close(self):
+        self._db.close()
+
+
+def drop_stale(chunks, stale):
+    """Drops the rows at the stale positions from a series of chunks that together make up a dataset, keeping their order."""
+
+    offset = 0
+    for chunk in chunks:
+        positions = np.arange(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk[~np.isin(positions, stale)] if len(stale) else chunk
+
+
+def stale_rows(path, key_columns):
+    """Returns the positions of the stale rows of a dataset, or an empty array if it has no key index."""
+
+    if not os.path.exists(index_path(path)) or not os.path.exists(path):
+        return np.array([], dtype=np.int64)
+    index = KeyIndex(index_path(path), key_columns)
+    try:
+        index.sync(path)
+        return index.stale_rows()
+    finally:
+        index.close()
+
+
+def group_digests(path, key_columns):
+    """Returns a digest of the current rows of every value of the first key column of a dataset, e.g. of every tournament.
+
+    It is read from the key index, not from the dataset, and changes whenever a row of the group is appended or replaced, so
+    whatever was derived from a group can be recomputed only when its rows changed.
+    """
+
+    if not os.path.exists(path):
+        return {}
+    index = KeyIndex(index_path(path), key_columns)
+    try:
+        index.sync(path)
+        return index.group_digests()
+    finally:
+        index.close()
+
+
+def iter_latest(path, key_columns, columns=None, memory_budget=datasets.MEMORY_BUDGET):
+    """Yields a dataset in chunks like datasets.iter_chunks, keeping only the last row stored for each key."""
+    return drop_stale(datasets.iter_chunks(path, columns, memory_budget), stale_rows(path, key_columns))
+
+
+def read_latest(path, key_columns, columns=None):
+    """Reads a dataset like datasets.read, keeping only the last row stored for each key."""
+
+    df = datasets.read(path, columns)
+    stale = stale_rows(path, key_columns)
+    return df.drop(index=df.index[stale]).reset_index(drop=True) if len(stale) else df
+
+
+def compact(path, key_columns, memory_budget=datasets.MEMORY_BUDGET):
+    """Rewrites a dataset one chunk at a time, keeping only the last row stored for each key. Returns the number of rows dropped.
+
+    The index is rebuilt from the chunks as they are written, so the rewritten dataset is never read back.
+    """
+
+    stale = stale_rows(path, key_columns)
+    if not len(stale):
+        return 0
+    write_indexed(drop_stale(datasets.iter_chunks(path, memory_budget=memory_budget), stale), path, key_columns)
+    return len(stale)
+
+
+def append_unique(df, path, key_columns, replace=False):
+    """Appends the rows of df to a dataset, skipping the keys it already holds.
+
+    Args:
+        df: The rows to append.
+        path: The dataset file, created if it doesn't exist. Its key index lives at index_path(path).
+        key_columns: The columns that identify a row.
+        replace: If True, rows whose values changed replace the stored ones instead of being skipped.
+
+    Returns:
+        A dictionary counting the rows that were appended, skipped and replaced.
+    """
+
+    index = KeyIndex(index_path(path), key_columns)
+    try:
+        index.sync(path)
+        rows, counts = index.select(df, replace)
+        if not rows.empty:
+            datasets.append(rows, path)
+        index.add(rows)
+        if os.path.exists(path):
+            index.stamp(path)
+        worth_compacting = index.stale_count() > COMPACT_RATIO * index.rows
+    finally:
+        index.close()
+
+    if worth_compacting:
+        compact(path, key_columns)
+
+    return report(path, {"appended": counts["new"], "skipped": counts["skipped"], "replaced": counts["replaced"]})
+
+
+def append_unique_chunks(chunks, path, key_columns):
+    """Appends an iterable of DataFrame chunks to a dataset like append_unique, holding a single chunk at a time.
+
+    Rows whose key is already stored, or was in an earlier chunk, are always skipped.
+
+    Returns:
+        A dictionary counting the rows that were appended, skipped and replaced.
+    """
+
+    index = KeyIndex(index_path(path), key_columns)
+    counts = {"appended": 0, "skipped": 0, "replaced": 0}
+
+    def unique_rows():
+        for chunk in chunks:
+            rows, chunk_counts = index.select(chunk)
+            counts["appended"] += chunk_counts["new"]
+            counts["skipped"] += chunk_counts["skipped"]
+            index.add(rows)
+            yield rows
+
+    try:
+        index.sync(path)
+        datasets.append_chunks(unique_rows(), path)
+        if os.path.exists(path):
+            index.stamp(path)
+    finally:
+        index.close()
+
+    return report(path, counts)
+
+
+def report(path, counts):
+    print(f"{os.path.basename(path)}: {counts['appended']} appended, {counts['skipped']} already stored, {counts['replaced']} replaced")
+    return counts
+
+
+def index_dataset(df, path, key_columns):
+    """Indexes a dataset that was just written in full, so the next append doesn't have to read it back."""
+
+    index = KeyIndex(index_path(path), key_columns)
+    try:
+        index.rebuild(df, path)
+    finally:
+        index.close()
+
+
+def write_indexed(chunks, path, key_columns):
+    """Writes chunks as the whole dataset like datasets.write_chunks, indexing the rows as they are written.
+
+    The chunks may be read from the dataset itself, e.g. from iter_latest to rewrite it in place, but then their stale rows
+    must already be dropped: the index is rebuilt from the chunks alone, so the rewritten dataset is never read back.
+
+    Returns:
+        The number of rows written.
+    """
+
+    index = KeyIndex(index_path(path), key_columns)
+    try:
+        # Left cleared and unstamped if the rewrite fails, so the next sync rebuilds it from whatever the dataset holds.
+        index.clear()
+
+        def indexed():
+            for chunk in chunks:
+                index.add(chunk)
+                yield chunk
+
+        written = datasets.write_chunks(indexed(), path)
+        index.stamp(path)
+    finally:
+        index.close()
+    return written
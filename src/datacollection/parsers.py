@@ -0,0 +1,338 @@
+"""Table parsing backends for rk9 roster and events pages.
+
+Both the events listing and the roster pages are one big HTML table. Building a full BeautifulSoup tree and calling find_all("td")
+on every row is by far the slowest way to read them, which shows on big events where a roster has thousands of rows. This module
+turns a page into a list of rows of Cell tuples (the cell text plus its links and images) using one of several engines:
+
+    soup:      BeautifulSoup over the whole document, the way the scraper originally parsed pages.
+    strainer:  BeautifulSoup restricted to <tr> elements with a SoupStrainer.
+    lxml:      lxml.html with XPath, the fastest option and the default.
+    parsel:    parsel selectors (lxml underneath, with a friendlier API).
+
+Every backend produces the same rows, so the standings column logic only lives in one place (parse_roster).
+See benchmarks/parser_benchmark.py for a comparison of the backends on saved roster pages.
+
+Teamlist pages are not tables, so they have their own extractor (parse_teamlist). The lxml version walks each Pokémon block exactly
+once and picks up the icon, name, form, Tera Type, ability, held item and moves along the way, instead of running a separate search for
+every field. The original BeautifulSoup extraction is kept as the "soup" backend for reference; see benchmarks/teamlist_benchmark.py.
+
+"""
+
+import hashlib
+from typing import NamedTuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree
+import lxml.html
+
+DEFAULT_BACKEND = "lxml"
+TEAM_SIZE = 6
+
+
+class Cell(NamedTuple):
+    """The parts of a <td> the scraper cares about."""
+
+    text: str
+    links: list  # (link text, href) pairs in document order
+    images: list  # src attributes in document order
+
+    def href(self):
+        """The href of the first link in the cell, like td.find("a")["href"]."""
+        return self.links[0][1] if self.links else None
+
+
+def _soup_rows(soup):
+    rows = []
+    for row in soup.find_all("tr"):
+        rows.append(
+            [
+                Cell(
+                    td.text,
+                    [(a.get_text(), a.get("href")) for a in td.find_all("a")],
+                    [img.get("src") for img in td.find_all("img")],
+                )
+                for td in row.find_all("td")
+            ]
+        )
+    return rows
+
+
+def _rows_soup(html):
+    return _soup_rows(BeautifulSoup(html, "lxml"))
+
+
+def _rows_strainer(html):
+    return _soup_rows(BeautifulSoup(html, "lxml", parse_only=SoupStrainer("tr")))
+
+
+def _rows_lxml(html):
+    if not html or not html.strip():
+        return []
+
+    document = lxml.html.document_fromstring(html)
+    rows = []
+    for row in document.iter("tr"):
+        rows.append(
+            [
+                Cell(
+                    td.text_content(),
+                    [(a.text_content(), a.get("href")) for a in td.iter("a")],
+                    [img.get("src") for img in td.iter("img")],
+                )
+                for td in row.iter("td")
+            ]
+        )
+    return rows
+
+
+def _rows_parsel(html):
+    from parsel import Selector
+
+    rows = []
+    for row in Selector(text=html or "<html></html>").xpath("//tr"):
+        rows.append(
+            [
+                Cell(
+                    td.xpath("string()").get(),
+                    [(a.xpath("string()").get(), a.attrib.get("href")) for a in td.xpath(".//a")],
+                    td.xpath(".//img/@src").getall(),
+                )
+                for td in row.xpath(".//td")
+            ]
+        )
+    return rows
+
+
+BACKENDS = {
+    "soup": _rows_soup,
+    "strainer": _rows_strainer,
+    "lxml": _rows_lxml,
+    "parsel": _rows_parsel,
+}
+
+
+def table_rows(html, backend=DEFAULT_BACKEND):
+    """Parses every <tr> of a page into a list of Cell rows.
+
+    Args:
+        html: The page source.
+        backend: One of the names in BACKENDS.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+
+    try:
+        parse = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend {backend!r}, expected one of {sorted(BACKENDS)}")
+    return parse(html)
+
+
+def generate_player_id(player_id, first_name, last_name):
+    """rk9 does not provide player_id in its entirety, so we'll generate our own."""
+    return hashlib.md5(f"{player_id}{first_name}{last_name}".encode()).hexdigest()
+
+
+def parse_roster(html, tournament_id, backend=DEFAULT_BACKEND):
+    """Parses a roster page into standings rows.
+
+    Args:
+        html: The source of https://rk9.gg/roster/{rk9_id}.
+        tournament_id: Our generated id for the tournament, prepended to every row.
+        backend: The parsing engine to use, see BACKENDS.
+
+    Returns:
+        A list of standings rows, in the order they appear on the roster page.
+    """
+
+    standings_data = []
+
+    for columns in table_rows(html, backend):
+        try:
+            if (
+                columns
+            ):  # Certain tournaments don't have standing links or lack country data.
+                first_name = columns[1].text.strip()
+                last_name = columns[2].text.strip()
+                country = columns[3].text.strip() if len(columns) >= 8 else None
+                division = columns[3 if country is None else 4].text.strip()
+                trainer_name = columns[4 if country is None else 5].text.strip()
+                team_list_href = columns[5 if country is None else 6].href()
+                team_list = (
+                    team_list_href.replace("/teamlist/public/", "")
+                    if team_list_href
+                    else "Submitted"
+                )
+                standing = columns[6 if country is None else 7].text.strip()
+                player_id = generate_player_id(
+                    columns[0].text.strip(), first_name, last_name
+                )
+
+                standings_data.append(
+                    [
+                        tournament_id,
+                        player_id,
+                        first_name,
+                        last_name,
+                        country,
+                        division,
+                        trainer_name,
+                        team_list,
+                        standing,
+                    ]
+                )
+        except IndexError:
+            print(IndexError)
+            print(columns)
+
+    return standings_data
+
+
+class TeamMember(NamedTuple):
+    """One Pokémon of a teamlist. Fields missing from the page are None, as are moves past the last one listed."""
+
+    icon: str
+    pokemon: str
+    form: str
+    tera_type: str
+    ability: str
+    held_item: str
+    move1: str
+    move2: str
+    move3: str
+    move4: str
+
+
+def _name_and_form(raw_text):
+    if "[" in raw_text and "]" in raw_text:
+        return raw_text.split("[")[0].strip(), raw_text.split("[")[1].split("]")[0].strip()
+    return raw_text.split(" ")[0], "N/A"
+
+
+def _label_value(text):
+    return text.strip().strip('"') if text else None
+
+
+def _teamlist_soup(html):
+    """The original extraction: one find per field over each block. Raises on sets with fewer than four moves."""
+
+    soup = BeautifulSoup(html, "lxml")
+
+    team_members = []
+
+    team = soup.find_all("div", {"class": "pokemon bg-light-green-50 p-3"})
+
+    for team_member in team[:TEAM_SIZE]:
+        poke_icon = team_member.find("img")["src"]
+
+        raw_text = team_member.get_text(separator=" ", strip=True)
+        name, form = _name_and_form(raw_text)
+
+        tera_type_tag = team_member.find("b", string="Tera Type:").next_sibling
+        tera_type = tera_type_tag.strip().strip('"') if tera_type_tag else None
+
+        ability_tag = team_member.find("b", string="Ability:").next_sibling
+        ability = (
+            ability_tag.strip().strip('"').replace("&nbsp;", "").strip()
+            if ability_tag
+            else None
+        )
+
+        held_item_tag = team_member.find("b", string="Held Item:").next_sibling
+        held_item = held_item_tag.strip().strip('"') if held_item_tag else None
+
+        moves = team_member.find_all("span", {"class": "badge"})
+        move1, move2, move3, move4 = moves
+
+        team_members.append(
+            TeamMember(
+                poke_icon,
+                name,
+                form,
+                tera_type,
+                ability,
+                held_item,
+                move1.text,
+                move2.text,
+                move3.text,
+                move4.text,
+            )
+        )
+    return team_members
+
+
+_TEAM_BLOCKS = etree.XPath('//div[@class="pokemon bg-light-green-50 p-3"]')
+_LABELS = {"Tera Type:": "tera_type", "Ability:": "ability", "Held Item:": "held_item"}
+
+
+def _teamlist_lxml(html):
+    """Single-pass extraction: every element of a Pokémon block is visited once, in document order."""
+
+    if not html or not html.strip():
+        return []
+
+    team_members = []
+
+    for block in _TEAM_BLOCKS(lxml.html.document_fromstring(html))[:TEAM_SIZE]:
+        icon = None
+        fields = {"tera_type": None, "ability": None, "held_item": None}
+        moves = []
+        texts = []
+
+        # iterwalk reports comments with their own event and no "end", so their tails are picked up there.
+        for event, element in etree.iterwalk(block, events=("start", "end", "comment")):
+            tag = element.tag
+            if event == "comment":
+                if element.tail and element.tail.strip():
+                    texts.append(element.tail.strip())
+            elif event == "start":
+                if element.text and element.text.strip():
+                    texts.append(element.text.strip())
+                if tag == "img" and icon is None:
+                    icon = element.get("src")
+                elif tag == "b":
+                    label = _LABELS.get((element.text or "").strip())
+                    if label and len(element) == 0:
+                        fields[label] = _label_value(element.tail)
+                elif tag == "span" and "badge" in (element.get("class") or "").split():
+                    moves.append(element.text_content())
+            elif element is not block and element.tail and element.tail.strip():
+                texts.append(element.tail.strip())
+
+        name, form = _name_and_form(" ".join(texts))
+        if fields["ability"]:
+            fields["ability"] = fields["ability"].replace("&nbsp;", "").strip()
+        moves = (moves + [None] * 4)[:4]
+
+        team_members.append(
+            TeamMember(icon, name, form, fields["tera_type"], fields["ability"], fields["held_item"], *moves)
+        )
+    return team_members
+
+
+TEAMLIST_BACKENDS = {
+    "soup": _teamlist_soup,
+    "lxml": _teamlist_lxml,
+}
+
+
+def parse_teamlist(html, backend=DEFAULT_BACKEND):
+    """Parses the Pokémon blocks of a teamlist page.
+
+    Args:
+        html: The source of https://rk9.gg/teamlist/public/{team_list}.
+        backend: One of the names in TEAMLIST_BACKENDS.
+
+    Returns:
+        A list of up to six TeamMember records, in page order.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+
+    try:
+        parse = TEAMLIST_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown teamlist backend {backend!r}, expected one of {sorted(TEAMLIST_BACKENDS)}")
+    return parse(html)
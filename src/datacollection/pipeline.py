@@ -0,0 +1,248 @@
+"""Staged fetch, parse and write pipeline.
+
+Downloading a teamlist is I/O-bound, but parsing it with BeautifulSoup is CPU-bound and holds the GIL, so once a handful of threads do
+both, adding threads stops helping. StagedPipeline splits the work into three stages connected by bounded queues:
+
+    fetch:  a pool of I/O threads downloads raw pages into a bounded queue;
+    parse:  pages are grouped into batches and parsed in a process pool, so parsing scales across every core;
+    write:  a single writer (the calling thread) consumes parsed results in order of completion of their batch.
+
+Every queue is bounded, so a slow stage pushes back on the stages before it instead of letting memory grow. Each stage keeps counters
+(items, errors, busy time) and the final report shows which stage was the bottleneck.
+
+"""
+
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+FETCH_WORKERS = 16
+BATCH_SIZE = 8
+QUEUE_SIZE = 64
+# Forking a process that already runs fetch threads can copy a lock one of them holds, so parsers start from a clean process instead.
+# Windows only has spawn.
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_DONE = object()
+
+
+class StageStats:
+    """Thread-safe counters for one pipeline stage."""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items=0, errors=0, busy=0.0):
+        with self._lock:
+            self.items += items
+            self.errors += errors
+            self.busy += busy
+
+    def utilization(self, wall):
+        """Fraction of the stage's worker capacity spent doing work."""
+        return self.busy / (self.workers * wall) if wall else 0.0
+
+
+def parse_batch(parse, batch):
+    """Runs in a worker process: parses every (item, page) pair, keeping errors per item.
+
+    Returns:
+        A (results, seconds) tuple where results is a list of (item, parsed, error) triples.
+    """
+
+    start = time.perf_counter()
+    results = []
+    for item, page in batch:
+        try:
+            results.append((item, parse(page), None))
+        except Exception as e:
+            results.append((item, None, e))
+    return results, time.perf_counter() - start
+
+
+class StagedPipeline:
+    """Runs items through fetch (threads), parse (processes) and write (calling thread) stages.
+
+    Args:
+        fetch: Function taking an item and returning the raw page. Runs in a thread.
+        parse: Module-level (picklable) function taking a raw page and returning the parsed result. Runs in a worker process.
+        write: Function taking (item, parsed, error). Runs in the calling thread, one result at a time.
+        fetch_workers: Number of I/O threads.
+        parse_workers: Number of parser processes. None uses one per core.
+        batch_size: Number of pages sent to a parser process at once.
+        queue_size: Capacity of the queue between the fetch and parse stages.
+        executor: Optional executor to run the parse stage in, e.g. a ThreadPoolExecutor for debugging. It is left running for
+            the caller to shut down.
+    """
+
+    def __init__(
+        self,
+        fetch,
+        parse,
+        write,
+        fetch_workers=FETCH_WORKERS,
+        parse_workers=None,
+        batch_size=BATCH_SIZE,
+        queue_size=QUEUE_SIZE,
+        executor=None,
+    ):
+        self.fetch = fetch
+        self.parse = parse
+        self.write = write
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self._owns_executor = executor is None
+        self.executor = executor or concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.parse_workers, mp_context=multiprocessing.get_context(START_METHOD)
+        )
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+
+        self.stats = {
+            "fetch": StageStats("fetch", fetch_workers),
+            "parse": StageStats("parse", self.parse_workers),
+            "write": StageStats("write", 1),
+        }
+        self.wall = 0.0
+        self._stop = threading.Event()
+
+    def _put(self, target, entry):
+        """Blocking put that gives up once the pipeline is stopping, so no thread hangs on a full queue."""
+
+        while not self._stop.is_set():
+            try:
+                target.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fetcher(self, items, pages):
+        stats = self.stats["fetch"]
+        while not self._stop.is_set():
+            try:
+                item = items.get_nowait()
+            except queue.Empty:
+                return
+            start = time.perf_counter()
+            try:
+                page = self.fetch(item)
+            except Exception as e:
+                stats.add(errors=1, busy=time.perf_counter() - start)
+                self._put(pages, (item, None, e))
+                continue
+            stats.add(items=1, busy=time.perf_counter() - start)
+            self._put(pages, (item, page, None))
+
+    def _dispatcher(self, pages, batches, fetchers):
+        """Groups fetched pages into batches for the process pool. Fetch failures skip the parse stage.
+
+        If the pool can't take a batch (e.g. BrokenProcessPool), the error is handed to run() as a failed batch, so the pipeline
+        stops and raises it instead of finishing with the items that were never parsed missing.
+        """
+
+        batch = []
+        done = 0
+        try:
+            while done < fetchers and not self._stop.is_set():
+                try:
+                    entry = pages.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if entry is _DONE:
+                    done += 1
+                    continue
+                item, page, error = entry
+                if error is not None:
+                    self._put(batches, ([(item, None, error)], None))
+                    continue
+                batch.append((item, page))
+                if len(batch) >= self.batch_size:
+                    self._put(batches, (None, self.executor.submit(parse_batch, self.parse, batch)))
+                    batch = []
+            if batch and not self._stop.is_set():
+                self._put(batches, (None, self.executor.submit(parse_batch, self.parse, batch)))
+        except Exception as e:
+            failed = concurrent.futures.Future()
+            failed.set_exception(e)
+            self._put(batches, (None, failed))
+        finally:
+            self._put(batches, _DONE)
+
+    def run(self, items):
+        """Pushes every item through the pipeline and returns the per-stage stats."""
+
+        start = time.perf_counter()
+        work = queue.Queue()
+        for item in items:
+            work.put(item)
+
+        pages = queue.Queue(maxsize=self.queue_size)
+        batches = queue.Queue(maxsize=max(2, self.parse_workers * 2))
+
+        def fetch_worker():
+            try:
+                self._fetcher(work, pages)
+            finally:
+                self._put(pages, _DONE)
+
+        threads = [threading.Thread(target=fetch_worker, daemon=True) for _ in range(self.fetch_workers)]
+        threads.append(
+            threading.Thread(target=self._dispatcher, args=(pages, batches, self.fetch_workers), daemon=True)
+        )
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                entry = batches.get()
+                if entry is _DONE:
+                    break
+                failed, future = entry
+                if future is None:
+                    results = failed
+                else:
+                    results, seconds = future.result()
+                    self.stats["parse"].add(
+                        items=sum(error is None for _, _, error in results),
+                        errors=sum(error is not None for _, _, error in results),
+                        busy=seconds,
+                    )
+
+                write_start = time.perf_counter()
+                for item, parsed, error in results:
+                    self.write(item, parsed, error)
+                self.stats["write"].add(items=len(results), busy=time.perf_counter() - write_start)
+        except BaseException:
+            self._stop.set()
+            if self._owns_executor:
+                self.executor.shutdown(cancel_futures=True)
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+            if self._owns_executor:
+                self.executor.shutdown()
+            self.wall = time.perf_counter() - start
+
+        return self.stats
+
+    def report(self):
+        """Prints throughput and utilization for each stage, flagging the busiest one as the bottleneck."""
+
+        bottleneck = max(self.stats.values(), key=lambda stats: stats.utilization(self.wall))
+        for stats in self.stats.values():
+            rate = stats.items / self.wall if self.wall else 0.0
+            marker = "  <- bottleneck" if stats is bottleneck else ""
+            print(
+                f"{stats.name:<6} {stats.workers:>3} workers  {stats.items:>6} items  {stats.errors:>4} errors  "
+                f"{rate:8.1f} items/s  {stats.utilization(self.wall):6.1%} busy{marker}"
+            )
@@ -7,11 +7,172 @@ Zacian and Zamazenta's 'rusted' items that will require manual entry. However, m
 
 """
 
-import requests
-from bs4 import BeautifulSoup
+import concurrent.futures
+import contextlib
+import time
 
-def fetch_pokemon_api():
-    """Crafts API requests to fetch data on all Pokemon from the Pokeapi."""
+from . import bulbapedia, httpclient, staticdump
+
+POKEAPI_WORKERS = 16
+
+API_URL = "https://pokeapi.co/api/v2/"
+PAGE_SIZE = 1000
+# PokeAPI numbers alternate forms (megas, regional forms, ...) and shadow moves from 10001 on. They aren't part of the datasets.
+ALTERNATE_ID_START = 10001
+
+_dump = None
+
+# Items are held items if they are in one of these categories, or carry one of these attributes.
+HELD_ITEM_CATEGORIES = ["held-items", "species-specific", "memories"]
+HELD_ITEM_ATTRIBUTES = ["holdable", "holdable-active"]
+
+
+def get_json(url):
+    """Fetches a PokeAPI resource, from the static dump when one is active and through the shared HTTP client otherwise."""
+
+    if _dump is not None:
+        return _dump.get_json(url)
+    return httpclient.get_json(url)
+
+
+@contextlib.contextmanager
+def static_dump(path):
+    """Serves every PokeAPI request made in the block from a static data dump (see staticdump.py) instead of the network.
+
+    Bulbapedia fallbacks for missing effects still go through the shared HTTP client and its cache.
+    """
+
+    global _dump
+    previous = _dump
+    _dump = staticdump.StaticDump(path)
+    try:
+        yield _dump
+    finally:
+        _dump.close()
+        _dump = previous
+
+
+def resource_id(url):
+    """PokeAPI resource URLs end with the numeric ID, e.g. https://pokeapi.co/api/v2/move/33/ -> 33."""
+    return int(url.rstrip("/").rsplit("/", 1)[-1])
+
+
+def list_resources(endpoint, page_size=PAGE_SIZE):
+    """Walks the paginated list endpoint of a resource type, e.g. "pokemon" or "move", following its next links.
+
+    Returns:
+        The sorted IDs of every resource the endpoint lists, without the alternate forms numbered from ALTERNATE_ID_START.
+    """
+
+    ids = set()
+    url = f"{API_URL}{endpoint}/?limit={page_size}&offset=0"
+    while url:
+        page = get_json(url)
+        ids.update(resource_id(resource["url"]) for resource in page["results"])
+        url = page.get("next")
+    return sorted(i for i in ids if i < ALTERNATE_ID_START)
+
+
+def held_item_candidates():
+    """Collects the items of every held item category and attribute, instead of probing every item ID.
+
+    Returns:
+        The sorted IDs of items that can be held. Each of them is still checked with the full item resource.
+    """
+
+    ids = set()
+    for endpoint, names in [("item-category", HELD_ITEM_CATEGORIES), ("item-attribute", HELD_ITEM_ATTRIBUTES)]:
+        for name in names:
+            resource = get_json(f"{API_URL}{endpoint}/{name}/")
+            ids.update(resource_id(item["url"]) for item in resource["items"])
+    return sorted(ids)
+
+
+def fetch_in_order(ids, fetch_one, label, max_workers=POKEAPI_WORKERS, errors=None):
+    """Calls fetch_one for every ID, max_workers at a time, and returns the rows in the order of ids.
+
+    Requests complete in any order, but the rows are reassembled by ID so the CSVs come out exactly as a sequential crawl would write them.
+    Instead of printing a line per resource, failures are collected per ID and a single summary is printed at the end.
+
+    Args:
+        ids: The IDs to fetch.
+        fetch_one: Function taking an ID and returning its row, or None when the resource should be left out.
+        label: What is being fetched, for the summary line.
+        max_workers: Number of IDs fetched concurrently.
+        errors: Optional dictionary that is filled with the error message of every ID that failed.
+
+    Returns:
+        The rows of every ID that was fetched and kept, ordered like ids.
+    """
+
+    ids = list(ids)
+    rows = {}
+    failed = {}
+    start = time.perf_counter()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_one, i): i for i in ids}
+        for future in concurrent.futures.as_completed(futures):
+            i = futures[future]
+            try:
+                rows[i] = future.result()
+            except Exception as e:
+                failed[i] = f"{type(e).__name__}: {e}"
+
+    kept = [rows[i] for i in ids if rows.get(i) is not None]
+    summary = f"Fetched {len(kept)} {label} in {time.perf_counter() - start:.1f}s ({len(rows) - len(kept)} skipped, {len(failed)} failed)"
+    if failed:
+        failed_ids = sorted(failed)
+        summary += f", failed IDs: {', '.join(map(str, failed_ids[:20]))}{' ...' if len(failed_ids) > 20 else ''}"
+    print(summary)
+
+    if errors is not None:
+        errors.update(failed)
+    return kept
+
+def fill_from_bulbapedia(rows, column, title, errors=None, clean=None):
+    """Fills the empty effect column of rows from Bulbapedia, resolving every missing effect in one batched lookup.
+
+    Rows whose effect can't be found on Bulbapedia either are left out, like a failed fetch.
+
+    Args:
+        rows: The fetched rows, modified in place.
+        column: Index of the effect column.
+        title: Function taking a row and returning the title of its Bulbapedia article.
+        errors: Optional dictionary that is filled with a message for every row whose effect could not be found.
+        clean: Optional function applied to each effect found.
+
+    Returns:
+        The rows that have an effect.
+    """
+
+    missing = [row for row in rows if not row[column]]
+    if not missing:
+        return rows
+
+    try:
+        effects = bulbapedia.get_fallback().effects(title(row) for row in missing)
+    except Exception as e:
+        print(f"Error fetching {len(missing)} missing effects from Bulbapedia: {e}")
+        effects = {}
+    for row in missing:
+        effect = effects.get(title(row))
+        if effect is None:
+            if errors is not None:
+                errors[row[0]] = f"No effect on Pokeapi or Bulbapedia for {title(row)}"
+            continue
+        row[column] = clean(effect) if clean else effect
+    print(f"Filled {sum(bool(row[column]) for row in missing)} of {len(missing)} missing effects from Bulbapedia")
+    return [row for row in rows if row[column]]
+
+def fetch_pokemon_api(ids=None, max_workers=POKEAPI_WORKERS, errors=None):
+    """Crafts API requests to fetch data on all Pokemon from the Pokeapi.
+
+    Args:
+        ids: Optional IDs to fetch. By default they are discovered from the pokemon list endpoint.
+        max_workers: Number of resources requested concurrently.
+        errors: Optional dictionary that is filled with the error message of every ID that failed.
+    """
 
     url = "https://pokeapi.co/api/v2/pokemon/"
 
@@ -33,40 +194,44 @@ def fetch_pokemon_api():
     ]
     pokemon_data = [headers]
 
-    for i in range(1026):
-        try:
-            pokemon = requests.get(f"{url}{i}").json()
-            name = pokemon["name"]
-            types = [type["type"]["name"] for type in pokemon["types"]]
-            base_stats = {stat["stat"]["name"]: stat["base_stat"] for stat in pokemon["stats"]}
-            abilities = [ability["ability"]["name"] for ability in pokemon["abilities"]]
-
-            pokemon_data.append(
-                [
-                    i,
-                    name,
-                    types[0] if types else None,
-                    types[1] if len(types) > 1 else None,
-                    base_stats.get("hp"),
-                    base_stats.get("attack"),
-                    base_stats.get("defense"),
-                    base_stats.get("special-attack"),
-                    base_stats.get("special-defense"),
-                    base_stats.get("speed"),
-                    abilities[0] if abilities else None,
-                    abilities[1] if len(abilities) > 1 else None,
-                    abilities[2] if len(abilities) > 2 else None,
-                    pokemon["sprites"]["front_default"]
-                ]
-            )
-            print(f"Fetched data for Pokémon index {i}")
-        except Exception as e:
-            print(f"Error fetching Pokémon with index {i}: {e}")
+    def fetch_pokemon(i):
+        pokemon = get_json(f"{url}{i}")
+        name = pokemon["name"]
+        types = [type["type"]["name"] for type in pokemon["types"]]
+        base_stats = {stat["stat"]["name"]: stat["base_stat"] for stat in pokemon["stats"]}
+        abilities = [ability["ability"]["name"] for ability in pokemon["abilities"]]
+
+        return [
+            i,
+            name,
+            types[0] if types else None,
+            types[1] if len(types) > 1 else None,
+            base_stats.get("hp"),
+            base_stats.get("attack"),
+            base_stats.get("defense"),
+            base_stats.get("special-attack"),
+            base_stats.get("special-defense"),
+            base_stats.get("speed"),
+            abilities[0] if abilities else None,
+            abilities[1] if len(abilities) > 1 else None,
+            abilities[2] if len(abilities) > 2 else None,
+            pokemon["sprites"]["front_default"]
+        ]
+
+    if ids is None:
+        ids = list_resources("pokemon")
+    pokemon_data.extend(fetch_in_order(ids, fetch_pokemon, "Pokémon", max_workers, errors))
 
     return pokemon_data
 
-def fetch_ability_api():
-    """Directly calls the Pokeapi to fetch all ability data."""
+def fetch_ability_api(ids=None, max_workers=POKEAPI_WORKERS, errors=None):
+    """Directly calls the Pokeapi to fetch all ability data.
+
+    Args:
+        ids: Optional IDs to fetch. By default they are discovered from the ability list endpoint.
+        max_workers: Number of resources requested concurrently.
+        errors: Optional dictionary that is filled with the error message of every ID that failed.
+    """
 
     def get_english_effect(effects):
         """Since Pokeapi doesn't have a consistent listing of languages, we need to search for the english effect specifically."""
@@ -75,17 +240,6 @@ def fetch_ability_api():
                 return effect["effect"]
         return None
     
-    def fetch_bulbapedia_effect(name):
-        """Sometimes Pokeapi is missing data for a given ability. In this case, we can fetch the data from Bulbapedia."""
-        name = name.replace(" ", "_")
-
-        url = f"https://bulbapedia.bulbagarden.net/wiki/{name}_(Ability)"
-        response = requests.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        effect = soup.find('span', {'class': 'mw-headline', 'id': 'Effect'}).parent.find_next("p").text
-        return effect
-    
     def capital(words):
         words = words.split(" ")
         if len(words) > 1:
@@ -104,32 +258,38 @@ def fetch_ability_api():
         "description",
     ]
     ability_data = [headers]
-#
-    for i in range(1, 308):
-        try:
-            ability = requests.get(f"{url}{i}").json()
-            name = ability["name"].replace("-", " ")
-
-            effect = get_english_effect(ability["effect_entries"])
-
-            if not effect:
-                effect = fetch_bulbapedia_effect(capital(name))
-
-            ability_data.append(
-                [
-                    i,
-                    name,
-                    effect,
-                ]
-            )
-            print(f"Fetched data for ability index {i}")
-        except Exception as e:
-            print(f"Error fetching ability with index {i}: {e}")
+
+    def fetch_ability(i):
+        ability = get_json(f"{url}{i}")
+        if not ability.get("is_main_series", True):
+            return None
+        name = ability["name"].replace("-", " ")
+
+        effect = get_english_effect(ability["effect_entries"])
+
+        return [
+            i,
+            name,
+            effect,
+        ]
+
+    if ids is None:
+        ids = list_resources("ability")
+    ability_data.extend(fetch_in_order(ids, fetch_ability, "abilities", max_workers, errors))
+
+    # Sometimes Pokeapi is missing data for a given ability. In this case, we fill it in from Bulbapedia.
+    ability_data[1:] = fill_from_bulbapedia(ability_data[1:], 2, lambda row: f"{capital(row[1])} (Ability)", errors)
 
     return ability_data
 
-def fetch_move_api():
-    """Directly calls the Pokeapi to fetch all move data."""
+def fetch_move_api(ids=None, max_workers=POKEAPI_WORKERS, errors=None):
+    """Directly calls the Pokeapi to fetch all move data.
+
+    Args:
+        ids: Optional IDs to fetch. By default they are discovered from the move list endpoint.
+        max_workers: Number of resources requested concurrently.
+        errors: Optional dictionary that is filled with the error message of every ID that failed.
+    """
 
     def get_english_effect(effects):
         """Since Pokeapi doesn't have a consistent listing of languages, we need to search for the english effect specifically."""
@@ -138,16 +298,6 @@ def fetch_move_api():
                 return [effect["effect"], effect["short_effect"]]
         return None
     
-    def fetch_bulbapedia_effect(name):
-        """Sometimes Pokeapi is missing data for a given move. In this case, we can fetch the data from Bulbapedia."""
-        name = name.replace(" ", "_")
-        url = f"https://bulbapedia.bulbagarden.net/wiki/{name}_(move)"
-        response = requests.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        effect = soup.find('span', {'class': 'mw-headline', 'id': 'Effect'}).parent.find_next("p").text
-        return effect
-
     url = "https://pokeapi.co/api/v2/move/"
 
     headers = [ 
@@ -162,61 +312,59 @@ def fetch_move_api():
     ]
 
     move_data = [headers]
-    for i in range(1,920):
-        try:
-            move = requests.get(f"{url}{i}").json()
-            name = move["name"].replace("-", " ").title()
-            type = move["type"]["name"]
-            category = move["damage_class"]["name"]
-            power = move["power"]
-            accuracy = move["accuracy"]
-
-            effects = get_english_effect(move["effect_entries"])
-
-            if not effects:
-                long_effect = fetch_bulbapedia_effect(name)
-                short_effect = None
-            else:
-                long_effect = effects if isinstance(effects, str) else effects[0]
-                short_effect = effects[1] if effects[1] else None
-            
+    def fetch_move(i):
+        move = get_json(f"{url}{i}")
+        name = move["name"].replace("-", " ").title()
+        type = move["type"]["name"]
+        category = move["damage_class"]["name"]
+        power = move["power"]
+        accuracy = move["accuracy"]
+
+        effects = get_english_effect(move["effect_entries"])
+
+        if not effects:
+            # Filled in from Bulbapedia once every move is fetched.
+            long_effect = None
+            short_effect = None
+        else:
+            long_effect = effects if isinstance(effects, str) else effects[0]
+            short_effect = effects[1] if effects[1] else None
             long_effect = long_effect.replace("\n", "").strip('"')
-            if short_effect: 
-                short_effect = short_effect.replace("\n", "")
-
-            move_data.append(
-                [
-                    i,
-                    name,
-                    type,
-                    category,
-                    power,
-                    accuracy,
-                    f"{long_effect}",
-                    f"{short_effect}",
-                ]
-            )
-            print(f"Fetched data for move index {i}")
-        except Exception as e:
-            print(f"Error fetching move with index {i} {e}")
         
+        if short_effect: 
+            short_effect = short_effect.replace("\n", "")
+
+        return [
+            i,
+            name,
+            type,
+            category,
+            power,
+            accuracy,
+            long_effect,
+            f"{short_effect}",
+        ]
+
+    if ids is None:
+        ids = list_resources("move")
+    move_data.extend(fetch_in_order(ids, fetch_move, "moves", max_workers, errors))
+
+    # Sometimes Pokeapi is missing data for a given move. In this case, we fill it in from Bulbapedia.
+    move_data[1:] = fill_from_bulbapedia(
+        move_data[1:], 6, lambda row: f"{row[1]} (move)", errors, clean=lambda effect: effect.replace("\n", "").strip('"')
+    )
 
     return move_data
 
-def fetch_held_item_api():
-    """This function fetches all held item data from the Pokeapi."""
+def fetch_held_item_api(ids=None, max_workers=POKEAPI_WORKERS, errors=None):
+    """This function fetches all held item data from the Pokeapi.
 
-    def fetch_bulbapedia_effect(name):
-        """Sometimes Pokeapi is missing data for a given held item. In this case, we can fetch the data from Bulbapedia."""
-        name = name.replace(" ", "_")
-        url = f"https://bulbapedia.bulbagarden.net/wiki/{name}"
-        response = requests.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
+    Args:
+        ids: Optional IDs to fetch. By default they are discovered from the held item categories and attributes.
+        max_workers: Number of resources requested concurrently.
+        errors: Optional dictionary that is filled with the error message of every ID that failed.
+    """
 
-        effect = soup.find('span', {'class': 'mw-headline', 'id': 'Effect'}).parent.find_next("p").text
-        effect.strip('"')
-        return effect
-    
     def check_if_held_item(item):
         """Pokeapi lists a multitude of held items under a variety of aliases. This function checks if the item is a held item using a subset of possible names."""
         valid_categories = ["holdable-active", "holdable", "species-specific","memories"]
@@ -237,29 +385,26 @@ def fetch_held_item_api():
     ]
     held_item_data = [headers]
 
-    for i in range(126, 1703):
-        try:
-            item = requests.get(f"{url}{i}").json()
-            name = item["name"].replace("-", " ")
-
-            if(check_if_held_item(item) == False):
-                print(f"Skipping item {name} as it is not a held item")
-                continue
-            
-            if(item["effect_entries"]):
-                effect = item["effect_entries"][0]["effect"]
-            else:
-                effect = fetch_bulbapedia_effect(name.title())
-
-            held_item_data.append(
-                [
-                    i,
-                    name,
-                    effect,
-                ]
-            )
-            print(f"Fetched data for held item index {i}")
-        except Exception as e:
-            print(f"Error fetching held item with index {i}: {e}")
+    def fetch_held_item(i):
+        item = get_json(f"{url}{i}")
+        name = item["name"].replace("-", " ")
+
+        if(check_if_held_item(item) == False):
+            return None
+        
+        effect = item["effect_entries"][0]["effect"] if item["effect_entries"] else None
+
+        return [
+            i,
+            name,
+            effect,
+        ]
+
+    if ids is None:
+        ids = held_item_candidates()
+    held_item_data.extend(fetch_in_order(ids, fetch_held_item, "held items", max_workers, errors))
+
+    # Sometimes Pokeapi is missing data for a given held item. In this case, we fill it in from Bulbapedia.
+    held_item_data[1:] = fill_from_bulbapedia(held_item_data[1:], 2, lambda row: row[1].title(), errors)
 
     return held_item_data
\ No newline at end of file
@@ -5,9 +5,22 @@ The functions of this file are used to create, modify, and prepare CSV files for
 Because it's almost certain that new data will be acquired over the lifetime of this project, we include a different function to append new rows.
 """
 
+import contextlib
+import itertools
 import pandas as pd
 import datacollection.scraper as scraper
 import datacollection.pokeapi as pokeapi
+import datacollection.httpclient as httpclient
+import datacollection.discovery as discovery
+import datacollection.images as images
+import datacollection.changes as changes
+import datacollection.datasets as datasets
+import datacollection.textclean as textclean
+import datacollection.keyindex as keyindex
+import datacollection.stages as stages
+import datacollection.compact as compact
+import datacollection.usage as usage
+import datacollection.similarity as similarity
 import os
 
 TOURNAMENT_PATH = r"src\data\tournaments.csv"
@@ -18,6 +31,62 @@ ABILITIES_PATH = r"src\data\abilities.csv"
 MOVES_PATH = r"src\data\moves.csv"
 ITEMS_PATH = r"src\data\items.csv"
 ICONS_PATH = r"src\data\icons.csv"
+TEAMS_FRONTIER_PATH = "src/data/teams_frontier.sqlite"
+IMAGES_DIR = "src/data/images"
+GAME_FINGERPRINTS_PATH = "src/data/game_fingerprints.sqlite"
+
+# Storage format of the datasets written by the make_*_csv functions: ".csv", or ".parquet" / ".arrow" with pyarrow installed.
+# The paths above keep their .csv names, dataset_path swaps the extension. The stream_*_csv functions always write CSV.
+DATASET_FORMAT = ".csv"
+
+# Cleaning rules of the game data text columns, each applied to its column in a single pass (see textclean.py).
+# Newlines are removed before anything else, so the old r'\s*.\n\s*' substitution of the abilities could never match and is gone.
+ABILITY_DESCRIPTION = textclean.TextCleaner(
+    textclean.truncate("Overworld:"),
+    textclean.remove('\n'),
+    textclean.strip(),
+    textclean.collapse_whitespace(),
+    textclean.remove('"'),
+)
+ITEM_DESCRIPTION = textclean.TextCleaner(
+    textclean.truncate("Used on a"),
+    textclean.remove('\n'),
+    textclean.strip(),
+    textclean.space_after(':'),
+    textclean.collapse_whitespace(),
+    textclean.remove('"'),
+)
+MOVE_EFFECT = textclean.TextCleaner(textclean.remove('\n'))
+
+# Primary keys of the datasets that new crawls are appended to. Rows whose key is already stored are not appended again.
+STANDINGS_KEY = ["tournament_id", "player_id"]
+TEAMS_KEY = ["tournament_id", "player_id", "pokemon"]
+APPEND_KEYS = {'standings': STANDINGS_KEY, 'teams': TEAMS_KEY}
+
+# The only standings columns needed to crawl teamlists.
+TEAMLIST_COLUMNS = ["tournament_id", "player_id", "team_list"]
+
+# Peak memory of the chunked functions (iter_dataset, clean_dataset, append_chunks, add_column_to_csv): datasets are processed in
+# chunks sized to this budget, so memory use no longer grows with the number of seasons stored.
+MEMORY_BUDGET = datasets.MEMORY_BUDGET
+
+# State of the stage runner behind make_all_csv and fetch_official_data (see stages.py). The game data barely changes, so it is only
+# fetched again once it is older than GAME_DATA_MAX_AGE, or when its code changed. The tournament listing and standings are always
+# fetched again, and team lists, which rk9 may publish after the standings, once they are older than TEAMS_MAX_AGE.
+STAGES_STATE_PATH = "src/data/stages.sqlite"
+STAGE_WORKERS = 8
+GAME_DATA_MAX_AGE = 7 * 24 * 3600
+TEAMS_MAX_AGE = 24 * 3600
+
+# Usage statistics are counted once per tournament and division and stored here (see usage.py), so only new or changed tournaments are counted.
+USAGE_PATH = usage.USAGE_PATH
+USAGE_STANDINGS_COLUMNS = ["tournament_id", "player_id", "division", "standing"]
+
+# MinHash/LSH index of the teams (see similarity.py), updated one tournament at a time like the usage statistics.
+SIMILARITY_PATH = similarity.SIMILARITY_PATH
+
+STANDINGS_WORKERS = 8
+STREAM_BATCH_SIZE = 500
 
 def create_csv(df, filepath):
     """
@@ -36,102 +105,636 @@ def create_csv(df, filepath):
     
     df.to_csv(filepath, index=False, encoding='utf-8', header=True)
 
-def append_to_csv(data, filepath, data_type):
+def local_path(filepath):
+    """Turns the backslashes of the paths above into the separator of the platform: as written, they only work on Windows."""
+    return os.path.normpath(filepath.replace("\\", "/"))
+
+def dataset_path(filepath):
+    """Returns where the dataset for filepath is stored in the configured DATASET_FORMAT."""
+    return datasets.with_format(local_path(filepath), DATASET_FORMAT)
+
+def save_dataset(df, filepath):
     """
-    Appends new rows to an existing CSV file.
-    
+    Saves a dataset in the configured DATASET_FORMAT.
+
     Args:
-        data: The data to be appended to the CSV.
-        filepath: The path where the CSV is saved.
-        data_type: The type of data being appended.
+        df: The data to be saved.
+        filepath: The CSV path of the dataset, e.g. TEAMS_PATH. Its extension is swapped for DATASET_FORMAT.
     """
 
-    df = pd.DataFrame(data)
-    
+    datasets.write(df, dataset_path(filepath))
+
+def dataset_key(filepath):
+    """Returns the key columns of the standings and teams datasets, whose replaced rows are dropped when they are read."""
+    return {local_path(STANDINGS_PATH): STANDINGS_KEY, local_path(TEAMS_PATH): TEAMS_KEY}.get(local_path(filepath))
+
+def load_dataset(filepath, columns=None):
+    """
+    Loads a dataset saved with save_dataset. For the standings and teams, only the last row stored for each key is kept.
+
+    Args:
+        filepath: The CSV path of the dataset, e.g. TEAMS_PATH.
+        columns: Optional list of columns to load. Parquet and Arrow datasets only decode these columns.
+    """
+
+    key = dataset_key(filepath)
+    if key is not None:
+        return keyindex.read_latest(dataset_path(filepath), key, columns)
+    return datasets.read(dataset_path(filepath), columns)
+
+def iter_dataset(filepath, columns=None, memory_budget=MEMORY_BUDGET):
+    """
+    Yields a dataset saved with save_dataset as DataFrame chunks, instead of loading it whole.
+    For the standings and teams, only the last row stored for each key is kept.
+
+    Args:
+        filepath: The CSV path of the dataset, e.g. TEAMS_PATH.
+        columns: Optional list of columns to load.
+        memory_budget: Roughly how many bytes the chunks may take up while they are processed.
+    """
+
+    key = dataset_key(filepath)
+    if key is not None:
+        return keyindex.iter_latest(dataset_path(filepath), key, columns, memory_budget)
+    return datasets.iter_chunks(dataset_path(filepath), columns, memory_budget)
+
+def load_vocabularies():
+    """Returns compact.Vocabularies keyed to the IDs of the game data tables that have been built."""
+
+    game_data = {
+        "pokemon": POKEMON_PATH,
+        "moves": MOVES_PATH,
+        "abilities": ABILITIES_PATH,
+        "items": ITEMS_PATH,
+    }
+    tables = {}
+    for name, filepath in game_data.items():
+        if os.path.exists(dataset_path(filepath)):
+            tables[name] = load_dataset(filepath, columns=list(compact.GAME_DATA_COLUMNS[name]))
+    return compact.Vocabularies.from_game_data(**tables)
+
+def load_compact(filepath, encode, vocabularies=None, memory_budget=MEMORY_BUDGET):
+    """
+    Loads a dataset as a compact.CompactTable, encoding it one chunk at a time so the decoded table is never held whole.
+
+    Args:
+        filepath: The CSV path of the dataset, e.g. TEAMS_PATH.
+        encode: compact.encode_teams or compact.encode_standings.
+        vocabularies: Optional compact.Vocabularies to share with other tables. Defaults to load_vocabularies().
+        memory_budget: Roughly how many bytes the chunks may take up while they are encoded.
+    """
+
+    vocabularies = vocabularies or load_vocabularies()
+    chunks = [encode(chunk, vocabularies) for chunk in iter_dataset(filepath, memory_budget=memory_budget)]
+    return compact.concat(chunks)
+
+def load_compact_teams(vocabularies=None, memory_budget=MEMORY_BUDGET):
+    """Loads the teams dataset as a compact.CompactTable, with species, moves, abilities and items coded by their game data IDs."""
+    return load_compact(TEAMS_PATH, compact.encode_teams, vocabularies, memory_budget)
+
+def load_compact_standings(vocabularies=None, memory_budget=MEMORY_BUDGET):
+    """Loads the standings dataset as a compact.CompactTable."""
+    return load_compact(STANDINGS_PATH, compact.encode_standings, vocabularies, memory_budget)
+
+def tournament_digests(filepath):
+    """
+    Returns a digest of the rows of every tournament of the standings or teams dataset, read from its key index.
+
+    The digest of a tournament changes whenever rows are appended to it or replaced, e.g. when a partly crawled tournament is
+    crawled again, so whatever is derived from a tournament can be recomputed only when it changed.
+    """
+
+    return keyindex.group_digests(dataset_path(filepath), dataset_key(filepath))
+
+def iter_tournaments(filepath, tournament_ids, columns=None, memory_budget=MEMORY_BUDGET):
+    """
+    Yields (tournament_id, rows) for each of the given tournaments of a dataset, reading it a chunk at a time.
+
+    A first pass over the tournament_id column finds the last row of each tournament, so a tournament is yielded as soon as the
+    chunk holding that row is read. Only the tournaments spread over the chunks read so far are held in memory, not the dataset.
+
+    Args:
+        filepath: The CSV path of the dataset, e.g. TEAMS_PATH.
+        tournament_ids: The IDs of the tournaments to yield.
+        columns: Optional list of columns to load. Must include tournament_id.
+        memory_budget: Roughly how many bytes the chunks may take up while they are read.
+    """
+
+    tournament_ids = set(tournament_ids)
+    last_rows = {}
+    offset = 0
+    for chunk in iter_dataset(filepath, ["tournament_id"], memory_budget):
+        for position, tournament_id in enumerate(chunk["tournament_id"], offset):
+            if tournament_id in tournament_ids:
+                last_rows[tournament_id] = position
+        offset += len(chunk)
+
+    pending = {}
+    offset = 0
+    for chunk in iter_dataset(filepath, columns, memory_budget):
+        offset += len(chunk)
+        for tournament_id, rows in chunk[chunk["tournament_id"].isin(last_rows)].groupby("tournament_id", sort=False):
+            pending.setdefault(tournament_id, []).append(rows)
+        for tournament_id in [tournament_id for tournament_id in pending if last_rows[tournament_id] < offset]:
+            yield tournament_id, pd.concat(pending.pop(tournament_id), ignore_index=True)
+
+def update_usage_stats(rebuild=False, memory_budget=MEMORY_BUDGET):
+    """
+    Counts the usage statistics of the tournaments that are new or whose teams or standings changed since they were counted.
+
+    Changes are found from the key indexes of the teams and standings (see tournament_digests), so a partly crawled tournament
+    is counted again once the rest of its teams are stored. The teams are then read a tournament at a time (see iter_tournaments)
+    and each tournament is counted on its own, so memory stays bounded by the largest tournament, even with rebuild=True.
+    Only the standings columns the counts need are loaded, for the tournaments being counted.
+
+    Args:
+        rebuild: If True, count every tournament again.
+        memory_budget: Roughly how many bytes the chunks may take up while they are read.
+
+    Returns:
+        The number of tournament divisions counted.
+    """
+
+    store = usage.UsageStore(USAGE_PATH, load_vocabularies())
+    try:
+        standings_digests = tournament_digests(STANDINGS_PATH)
+        digests = {
+            tournament_id: f"{digest}:{standings_digests.get(tournament_id, '')}"
+            for tournament_id, digest in tournament_digests(TEAMS_PATH).items()
+        }
+        counted_digests = {} if rebuild else store.digests()
+        changed = {tournament_id for tournament_id, digest in digests.items() if counted_digests.get(tournament_id) != digest}
+        if not changed:
+            print("Usage statistics are up to date")
+            return 0
+
+        standings = pd.concat(
+            [chunk[chunk["tournament_id"].isin(changed)] for chunk in iter_dataset(STANDINGS_PATH, USAGE_STANDINGS_COLUMNS, memory_budget)],
+            ignore_index=True,
+        )
+        standings = dict(tuple(standings.groupby("tournament_id", sort=False)))
+        counted = 0
+        for tournament_id, teams in iter_tournaments(TEAMS_PATH, changed, memory_budget=memory_budget):
+            no_standings = pd.DataFrame(columns=USAGE_STANDINGS_COLUMNS)
+            counted += store.update(teams, standings.get(tournament_id, no_standings), {tournament_id: digests[tournament_id]})
+        print(f"Counted usage statistics of {counted} divisions of {len(changed)} new or changed tournaments")
+        return counted
+    finally:
+        store.close()
+
+def usage_stats(tournament_ids=None, divisions=None):
+    """
+    Returns a usage.Usage summed over a set of tournaments and divisions, from the counts stored by update_usage_stats.
+
+    Args:
+        tournament_ids: Optional collection of tournament IDs. Defaults to every counted tournament.
+        divisions: Optional collection of divisions, e.g. ["Masters"]. Defaults to every division.
+    """
+
+    store = usage.UsageStore(USAGE_PATH, load_vocabularies())
+    try:
+        return store.rollup(tournament_ids, divisions)
+    finally:
+        store.close()
+
+def update_similarity_index(rebuild=False, memory_budget=MEMORY_BUDGET):
+    """
+    Hashes the teams of the tournaments that are new or whose teams changed since they were added to the similar-team index.
+
+    As in update_usage_stats, changes are found from the key index of the teams and the teams are read and hashed a tournament at
+    a time. Updates only write to the index database and never load the indexed teams, so memory stays bounded by the largest
+    tournament, even with rebuild=True.
+
+    Args:
+        rebuild: If True, hash the teams of every tournament again.
+        memory_budget: Roughly how many bytes the chunks may take up while they are read.
+
+    Returns:
+        The number of teams hashed.
+    """
+
+    index = similarity.SimilarityIndex(SIMILARITY_PATH)
+    try:
+        digests = tournament_digests(TEAMS_PATH)
+        hashed_digests = {} if rebuild else index.digests()
+        changed = {tournament_id for tournament_id, digest in digests.items() if hashed_digests.get(tournament_id) != digest}
+        if not changed:
+            print("Similar-team index is up to date")
+            return 0
+        hashed = 0
+        for tournament_id, teams in iter_tournaments(TEAMS_PATH, changed, memory_budget=memory_budget):
+            hashed += index.update(teams, {tournament_id: digests[tournament_id]})
+        print(f"Hashed {hashed} teams of {len(changed)} new or changed tournaments into the similar-team index")
+        return hashed
+    finally:
+        index.close()
+
+def similar_teams(team, k=10):
+    """
+    Returns the k teams most similar to a team, from the index built by update_similarity_index.
+
+    The index is loaded on every call. To answer many queries, keep a similarity.SimilarityIndex open instead.
+
+    Args:
+        team: DataFrame of the members of one team, with the columns of the teams dataset.
+        k: Number of teams to return.
+    """
+
+    index = similarity.SimilarityIndex(SIMILARITY_PATH)
+    try:
+        return index.query(team, k)
+    finally:
+        index.close()
+
+def clean_data(df, data_type):
+    """Applies the cleaning function of a data type ('tournament', 'standings', 'teams' or 'pokemon') to a DataFrame."""
+
     if data_type == 'tournament':
         df = clean_tournament_data(df)
     elif data_type == 'standings':
         df = clean_standings_data(df)
     elif data_type == 'pokemon':
         df = clean_pokemon_data(df)
+    elif data_type == 'teams':
+        df = clean_teams_data(df)
+    return df
+
+def clean_dataset(filepath, data_type, memory_budget=MEMORY_BUDGET):
+    """
+    Cleans a saved dataset in place, one chunk at a time.
+
+    Duplicates are only dropped within a chunk; across chunks, the key index of the standings and teams takes care of them.
+
+    Args:
+        filepath: The CSV path of the dataset, e.g. STANDINGS_PATH.
+        data_type: The type of data in the dataset, as in append_to_csv.
+        memory_budget: Roughly how many bytes the chunks may take up while they are processed.
+
+    Returns:
+        The number of rows written.
+    """
+
+    chunks = iter_dataset(filepath, memory_budget=memory_budget)
+    return datasets.write_chunks((clean_data(chunk, data_type) for chunk in chunks), dataset_path(filepath))
+
+def create_game_csv(df, filepath, dataset, key):
+    """
+    Creates a game data CSV file like create_csv, and writes the delta against the previous build next to it.
+
+    Args:
+        df: The cleaned game data.
+        filepath: The path where the CSV will be saved. The delta goes to changes.delta_path(local_path(filepath)).
+        dataset: The name the record fingerprints are stored under.
+        key: The ID column of the data.
+
+    Returns:
+        The changes.Delta of inserted, updated and deleted IDs.
+    """
+
+    save_dataset(df, filepath)
+
+    store = changes.FingerprintStore(GAME_FINGERPRINTS_PATH)
+    try:
+        return changes.record_changes(df, key, dataset, local_path(filepath), store)
+    finally:
+        store.close()
+
+def append_to_csv(data, filepath, data_type):
+    """
+    Appends new rows to an existing CSV file.
+    Standings and teams rows are checked against the key index of the file first, so appending the same rows twice is a no-op.
+    
+    Args:
+        data: The data to be appended to the CSV.
+        filepath: The path where the CSV is saved.
+        data_type: The type of data being appended.
+    """
+
+    df = clean_data(pd.DataFrame(data), data_type)
+
+    if data_type in APPEND_KEYS:
+        keyindex.append_unique(df, filepath, APPEND_KEYS[data_type])
+        return
     
     df.to_csv(filepath, mode='a', index=False, header=False, encoding='utf-8')
 
-def add_column_to_csv(column_name, column_data, filepath):
+def append_chunks(chunks, filepath, data_type):
+    """
+    Appends an iterable of DataFrame chunks to a dataset, cleaning and writing one chunk at a time.
+    Standings and teams rows whose key is already stored are skipped, as in append_to_csv.
+
+    Args:
+        chunks: An iterable of DataFrames, e.g. from iter_dataset or pd.read_csv(..., chunksize=...).
+        filepath: The path of the dataset, created if it doesn't exist.
+        data_type: The type of data being appended.
+
+    Returns:
+        The number of rows appended.
+    """
+
+    chunks = (clean_data(chunk, data_type) for chunk in chunks)
+
+    if data_type in APPEND_KEYS:
+        return keyindex.append_unique_chunks(chunks, filepath, APPEND_KEYS[data_type])['appended']
+    return datasets.append_chunks(chunks, filepath)
+
+def stream_to_csv(rows, filepath, columns, clean=None, batch_size=STREAM_BATCH_SIZE, append=False, key=None):
+    """
+    Writes rows to a CSV file in small batches as they arrive, instead of collecting everything in memory first.
+
+    Args:
+        rows: An iterable (usually a generator) of rows.
+        filepath: The path where the CSV will be saved.
+        columns: The column names of the rows.
+        clean: Optional cleaning function applied to each batch DataFrame before it is written.
+        batch_size: How many rows are cleaned and flushed to disk at once.
+        append: If True, append to an existing file instead of overwriting it.
+        key: Optional primary key columns. When given, the key index of the file is kept up to date,
+            and when appending, rows whose key is already stored are skipped.
+
+    Returns:
+        The number of rows written.
+    """
+
+    filepath = local_path(filepath)
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    write_header = not (append and os.path.exists(filepath))
+    written = 0
+    rows = iter(rows)
+
+    index = keyindex.KeyIndex(keyindex.index_path(filepath), key) if key else None
+    if index is not None:
+        if append:
+            index.sync(filepath)
+        else:
+            index.clear()
+
+    try:
+        with open(filepath, 'a' if append else 'w', encoding='utf-8', newline='') as file:
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch and not write_header:
+                    break
+
+                df = pd.DataFrame(batch, columns=columns)
+                if clean is not None and batch:
+                    df = clean(df)
+                if index is not None:
+                    df, _ = index.select(df)
+
+                df.to_csv(file, index=False, header=write_header)
+                file.flush()
+                if index is not None:
+                    index.add(df)
+                write_header = False
+                written += len(df)
+
+                if not batch:
+                    break
+
+        if index is not None:
+            index.stamp(filepath)
+    finally:
+        if index is not None:
+            index.close()
+
+    return written
+
+def add_column_to_csv(column_name, column_data, filepath, memory_budget=MEMORY_BUDGET):
     """
     Adds a new column to an existing CSV file.
+    The file is rewritten one chunk at a time, so it never has to fit in memory.
     
     Args:
         column_name: The name of the new column.
-        column_data: The data for the new column.
+        column_data: The data for the new column: a single value for every row, a sequence with one value per row,
+            or a function computing the values from a DataFrame chunk.
         filepath: The path where the CSV is saved.
+        memory_budget: Roughly how many bytes the chunks may take up while they are processed.
     """
 
-    df = pd.read_csv(filepath, encoding='utf-8')
-    df[column_name] = column_data
-    df.to_csv(filepath, index=False, encoding='utf-8')
+    if isinstance(column_data, pd.Series):
+        column_data = column_data.to_numpy()
 
+    def with_column(chunks):
+        offset = 0
+        for chunk in chunks:
+            if callable(column_data):
+                chunk[column_name] = column_data(chunk)
+            elif pd.api.types.is_list_like(column_data):
+                chunk[column_name] = list(column_data[offset:offset + len(chunk)])
+            else:
+                chunk[column_name] = column_data
+            offset += len(chunk)
+            yield chunk
 
+    datasets.write_chunks(with_column(datasets.iter_chunks(filepath, memory_budget=memory_budget)), filepath)
 
-def make_all_csv():
-    """Fetches all data and creates CSV files."""
 
-    make_tournaments_csv()
-    make_standings_csv()
-    make_teams_csv()
-    make_pokemon_csv()
-    make_abilities_csv()
-    make_moves_csv()
-    make_held_items_csv()
-
-
-def fetch_game_data():
-    """This is just a seperate function for retrieving ONLY pokemon, moves, abilities, and items data."""
-    make_pokemon_csv()
-    make_moves_csv()
-    make_abilities_csv()
-    make_held_items_csv()
-
-def fetch_official_data():
+
+def build_stages():
+    """Declares every stage of a full refresh with the files it reads and writes, for the stage runner.
+
+    sync_images isn't a stage: it rewrites the teams and pokemon CSVs other stages produce, so it is only run on request.
+    """
+
+    tournaments = dataset_path(TOURNAMENT_PATH)
+    standings = dataset_path(STANDINGS_PATH)
+    teams = dataset_path(TEAMS_PATH)
+    pokemon = dataset_path(POKEMON_PATH)
+
+    return [
+        stages.Stage("tournaments", make_tournaments_csv, outputs=[tournaments], max_age=0, modules=[discovery, scraper]),
+        stages.Stage("standings", make_standings_csv, inputs=[tournaments], outputs=[standings], max_age=0, modules=[scraper]),
+        stages.Stage("teams", make_teams_csv, inputs=[standings], outputs=[teams], max_age=TEAMS_MAX_AGE, modules=[scraper, keyindex]),
+        stages.Stage("pokemon", make_pokemon_csv, outputs=[pokemon], max_age=GAME_DATA_MAX_AGE, modules=[pokeapi, changes]),
+        stages.Stage("abilities", make_abilities_csv, outputs=[dataset_path(ABILITIES_PATH)], max_age=GAME_DATA_MAX_AGE, modules=[pokeapi, changes]),
+        stages.Stage("moves", make_moves_csv, outputs=[dataset_path(MOVES_PATH)], max_age=GAME_DATA_MAX_AGE, modules=[pokeapi, changes]),
+        stages.Stage("items", make_held_items_csv, outputs=[dataset_path(ITEMS_PATH)], max_age=GAME_DATA_MAX_AGE, modules=[pokeapi, changes]),
+        stages.Stage("usage", update_usage_stats, inputs=[teams, standings], outputs=[USAGE_PATH], modules=[usage, compact, keyindex]),
+        stages.Stage("similarity", update_similarity_index, inputs=[teams], outputs=[SIMILARITY_PATH], modules=[similarity, keyindex]),
+    ]
+
+def run_stages(names=None, force=False):
+    """
+    Runs stages of a full refresh through the stage runner: independent stages run in parallel, and stages whose inputs
+    and code didn't change since their last successful run are skipped. A timing report is printed at the end.
+
+    Args:
+        names: Optional list of stage names to run, e.g. ["tournaments", "standings"]. Defaults to every stage.
+        force: If True, run the stages even if they are up to date.
+
+    Returns:
+        A dictionary of stage name to stages.Result.
+    """
+
+    selected = [stage for stage in build_stages() if names is None or stage.name in names]
+    runner = stages.StageRunner(selected, state_path=STAGES_STATE_PATH, max_workers=STAGE_WORKERS)
+    return runner.run(force=force)
+
+def make_all_csv(force=False):
+    """Fetches all data and creates CSV files.
+
+    The game data stages run alongside the tournaments -> standings -> teams chain, and up to date stages are skipped.
+
+    Args:
+        force: If True, rebuild every dataset even if it is up to date.
+    """
+
+    run_stages(force=force)
+
+    httpclient.get_client().print_stats()
+
+
+def fetch_game_data(dump=None):
+    """This is just a seperate function for retrieving ONLY pokemon, moves, abilities, and items data.
+
+    Args:
+        dump: Optional path to a PokeAPI static data dump (an api-data checkout or tarball) to read from instead of the API.
+    """
+    with pokeapi.static_dump(dump) if dump else contextlib.nullcontext():
+        make_pokemon_csv()
+        make_moves_csv()
+        make_abilities_csv()
+        make_held_items_csv()
+
+    httpclient.get_client().print_stats()
+
+def fetch_official_data(force=False):
     """This is a seperate function for retrieving ONLY tournament, standings, and team data."""
+    run_stages(["tournaments", "standings", "teams", "pokemon"], force=force)
+
+    httpclient.get_client().print_stats()
+
+def refresh_official_data():
+    """Incrementally refreshes tournament, standings, and team data.
+
+    Only tournaments that are new on the events page, or whose rk9_id has just appeared, are crawled.
+    Their standings and teams are appended to the existing CSV files.
+    """
+    queue = make_tournaments_csv(incremental=True)
+    print(f"{len(queue)} tournaments queued for crawling")
+
+    if queue.empty:
+        return
+
+    standings = make_standings_csv(queue)
+    make_teams_csv(standings)
+    update_usage_stats()
+    update_similarity_index()
+
+    httpclient.get_client().print_stats()
+
+def stream_official_data():
+    """Fetches tournament, standings, and team data, streaming standings and teams to disk as they are crawled."""
     make_tournaments_csv()
-    make_standings_csv()
-    make_teams_csv()
-    make_pokemon_csv()
+    stream_standings_csv()
+    stream_teams_csv()
+
+    httpclient.get_client().print_stats()
+
+def make_tournaments_csv(incremental=False):
+    """Fetches tournament data and creates a CSV file.
 
-def make_tournaments_csv():
-    """Fetches tournament data and creates a CSV file."""
+    Args:
+        incremental: If True and a tournaments CSV already exists, diff the live listing against it instead of rewriting it from scratch.
+
+    Returns:
+        The tournaments whose standings need to be crawled: every tournament, or in incremental mode only the new and newly linked ones.
+    """
     url = "https://rk9.gg/events/pokemon"
     response = scraper.fetch_html(url)
     data = scraper.fetch_all_tournament_data(response)
-    df = pd.DataFrame(data)
+    df = pd.DataFrame(data[1:], columns=data[0])
     df = clean_tournament_data(df)
 
-    create_csv(df, TOURNAMENT_PATH)
+    if incremental and os.path.exists(dataset_path(TOURNAMENT_PATH)):
+        stored = clean_tournament_data(load_dataset(TOURNAMENT_PATH))
+        df, queue = discovery.diff_tournaments(df, stored)
+        save_dataset(df, TOURNAMENT_PATH)
+        return queue
 
-def make_standings_csv():
-    """Fetches standings data and creates a CSV file."""
-    df = pd.read_csv(TOURNAMENT_PATH)
-    data = scraper.fetch_standings_data(df)
-    headers = data[0]
-    rows = data[1:]
+    save_dataset(df, TOURNAMENT_PATH)
+    return df
 
-    df = pd.DataFrame(rows, columns=headers)
+def make_standings_csv(tournaments=None):
+    """Fetches standings data and creates a CSV file.
+
+    Args:
+        tournaments: Optional DataFrame of tournaments to crawl. When given, their standings are appended to the existing CSV
+            instead of re-crawling every tournament in the tournaments CSV. Players that are already stored are updated in place
+            instead of being appended twice.
+
+    Returns:
+        The cleaned standings that were fetched.
+    """
+    df = load_dataset(TOURNAMENT_PATH) if tournaments is None else tournaments
+    df = scraper.fetch_standings_data(df, max_workers=STANDINGS_WORKERS)
     df = clean_standings_data(df)
 
-    create_csv(df, STANDINGS_PATH)
+    if tournaments is not None and os.path.exists(dataset_path(STANDINGS_PATH)):
+        keyindex.append_unique(df, dataset_path(STANDINGS_PATH), STANDINGS_KEY, replace=True)
+    else:
+        save_dataset(df, STANDINGS_PATH)
+        keyindex.index_dataset(df, dataset_path(STANDINGS_PATH), STANDINGS_KEY)
+    return df
 
-def make_teams_csv():
-    """Fetches teams data and creates a CSV file."""
+def make_teams_csv(standings=None, staged=False):
+    """Fetches teams data and creates a CSV file.
 
-    data = scraper.fetch_team_data(pd.read_csv(STANDINGS_PATH))
+    Args:
+        standings: Optional DataFrame of standings rows to crawl teams for. When given, the teams are appended to the existing CSV,
+            skipping the team members that are already stored.
+        staged: If True, parse teamlists in a process pool through scraper.fetch_team_data_staged.
+    """
+
+    df = load_dataset(STANDINGS_PATH, columns=TEAMLIST_COLUMNS) if standings is None else standings
+    if staged:
+        data = scraper.fetch_team_data_staged(df, frontier_path=TEAMS_FRONTIER_PATH)
+    else:
+        data = scraper.fetch_team_data(df, frontier_path=TEAMS_FRONTIER_PATH)
     headers = data[0]
     rows = data[1:]
 
     df = pd.DataFrame(rows, columns=headers)
     df = clean_teams_data(df)
 
-    create_csv(df, TEAMS_PATH)
+    if standings is not None and os.path.exists(dataset_path(TEAMS_PATH)):
+        keyindex.append_unique(df, dataset_path(TEAMS_PATH), TEAMS_KEY, replace=True)
+    else:
+        save_dataset(df, TEAMS_PATH)
+        keyindex.index_dataset(df, dataset_path(TEAMS_PATH), TEAMS_KEY)
+
+def stream_standings_csv(tournaments=None):
+    """Crawls standings and writes them to the standings CSV in batches as each roster is parsed.
+
+    Args:
+        tournaments: Optional DataFrame of tournaments to crawl. When given, the rows are appended to the existing CSV.
+    """
+    df = load_dataset(TOURNAMENT_PATH) if tournaments is None else tournaments
+    rows = scraper.iter_standings_rows(df, max_workers=STANDINGS_WORKERS)
+
+    written = stream_to_csv(
+        rows, STANDINGS_PATH, scraper.STANDINGS_COLUMNS, clean_standings_data, append=tournaments is not None, key=STANDINGS_KEY
+    )
+    print(f"Wrote {written} standings rows")
+
+def stream_teams_csv(standings=None):
+    """Crawls teamlists and writes them to the teams CSV in batches as pages finish.
+
+    The standings CSV is read in chunks and only a bounded number of teamlist pages are in flight at once,
+    so memory use doesn't grow with the number of players.
+
+    Args:
+        standings: Optional DataFrame of standings rows to crawl. When given, the rows are appended to the existing CSV.
+    """
+    rows = scraper.iter_team_rows(local_path(STANDINGS_PATH) if standings is None else standings)
+
+    written = stream_to_csv(rows, TEAMS_PATH, scraper.TEAM_COLUMNS, clean_teams_data, append=standings is not None, key=TEAMS_KEY)
+    print(f"Wrote {written} team member rows")
 
 def make_pokemon_csv():
     """Fetches Pokémon data from the Pokeapi and creates a CSV file."""
@@ -143,7 +746,7 @@ def make_pokemon_csv():
     df = pd.DataFrame(rows, columns=headers)
     df = clean_pokemon_data(df)
 
-    create_csv(df, POKEMON_PATH)
+    create_game_csv(df, POKEMON_PATH, "pokemon", "pokemon_id")
     
 def make_abilities_csv():
     """Fetches ability data from the Pokeapi and creates a CSV file."""
@@ -159,7 +762,7 @@ def make_abilities_csv():
     df = pd.DataFrame(rows, columns=headers)
     df = clean_abilities_data(df)
 
-    create_csv(df, ABILITIES_PATH)
+    create_game_csv(df, ABILITIES_PATH, "abilities", "ability_id")
 
 def make_moves_csv():
     """Fetches move data from the Pokeapi and creates a CSV file."""
@@ -180,7 +783,7 @@ def make_moves_csv():
     df = pd.DataFrame(rows, columns=headers)
     df = clean_moves_data(df)
 
-    create_csv(df, MOVES_PATH)
+    create_game_csv(df, MOVES_PATH, "moves", "move_id")
 
 def make_held_items_csv():
     """Fetches held item data from the Pokeapi and creates a CSV file."""
@@ -197,7 +800,7 @@ def make_held_items_csv():
     df = pd.DataFrame(rows, columns=headers)
     df = clean_items_data(df)
 
-    create_csv(df, ITEMS_PATH)
+    create_game_csv(df, ITEMS_PATH, "items", "item_id")
 
 def make_icons_csv():
     """Fetches item icon links and creates a csv file."""
@@ -211,6 +814,57 @@ def make_icons_csv():
     df = pd.DataFrame(data, columns=headers)
     create_csv(df, ICONS_PATH)
 
+def sync_images(memory_budget=MEMORY_BUDGET):
+    """Downloads every sprite and item icon referenced by the CSVs into the local image store, and rewrites their image columns to local keys.
+
+    Already stored images are never requested again, so this can run after every crawl. Afterwards, serving a team needs no remote
+    image fetches: images.ImageStore(IMAGES_DIR).path(key) gives the file for any key in the teams, pokemon or icons CSVs.
+
+    Each dataset is read twice in chunks, once for its image columns and once to rewrite it, so it never has to fit in memory.
+    The teams are rewritten without their replaced rows and their key index is rebuilt from the chunks as they are written.
+
+    Args:
+        memory_budget: Roughly how many bytes the chunks may take up while they are processed.
+    """
+
+    image_columns = [
+        (TEAMS_PATH, dataset_path(TEAMS_PATH), ["icon"]),
+        (POKEMON_PATH, dataset_path(POKEMON_PATH), ["sprite"]),
+        (ICONS_PATH, local_path(ICONS_PATH), ["icon_link"]),
+    ]
+    store = images.ImageStore(IMAGES_DIR)
+    try:
+        for filepath, path, columns in image_columns:
+            if not os.path.exists(path):
+                continue
+            key = dataset_key(filepath)
+
+            def chunks(columns=None):
+                if key is not None:
+                    return iter_dataset(filepath, columns, memory_budget)
+                return datasets.iter_chunks(path, columns, memory_budget)
+
+            # Only the unique URLs are kept, so each image is looked up once however many teams use it.
+            urls = {}
+            for chunk in chunks(columns):
+                for column in columns:
+                    urls.update(dict.fromkeys(chunk[column].tolist()))
+            counts = store.sync(urls)
+
+            rewritten = (store.rewrite(chunk, columns) for chunk in chunks())
+            if key is not None:
+                keyindex.write_indexed(rewritten, path, key)
+            else:
+                datasets.write_chunks(rewritten, path)
+            print(
+                f"{os.path.basename(path)}: {counts['downloaded']} images downloaded, "
+                f"{counts['stored']} already stored, {counts['failed']} failed"
+            )
+            for url, error in counts["errors"]:
+                print(f"Error fetching image {url}: {error}")
+    finally:
+        store.close()
+
 """
 
 Below are functions for cleaning the data in the CSV files. Since each data type can come in many forms due to the inconsistency of their sources, each type has their own pre-defined cleaning logic. 
@@ -288,14 +942,7 @@ def clean_abilities_data(df):
 
     df = df.drop_duplicates()
 
-    separator = "Overworld:"
-    df['description'] = df['description'].fillna('').astype(str)
-    df['description'] = df['description'].str.split(separator, n=1).str[0]
-    df['description'] = df['description'].str.replace('\n', '', regex=False).str.strip()
-
-    df['description'] = df['description'].str.replace(r'\s*.\n\s*', '', regex= True)
-    df['description'] = df['description'].str.replace(r'\s+', ' ', regex= True)
-    df['description'] = df['description'].str.replace('"', '')
+    df['description'] = ABILITY_DESCRIPTION.clean(df['description'])
 
     print("cleaning done")
     return df
@@ -315,11 +962,8 @@ def clean_moves_data(df):
     df = df.drop_duplicates()
 
     #remove new lines
-    df['long_effect'] = df['long_effect'].fillna('').astype(str)
-    df['long_effect'] = df['long_effect'].str.replace('\n', '')
-
-    df['short_effect'] = df['short_effect'].fillna('').astype(str)
-    df['short_effect'] = df['short_effect'].str.replace('\n', '')
+    df['long_effect'] = MOVE_EFFECT.clean(df['long_effect'])
+    df['short_effect'] = MOVE_EFFECT.clean(df['short_effect'])
 
     return df
 
@@ -328,13 +972,6 @@ def clean_items_data(df):
 
     df = df.drop_duplicates()
 
-    separator = "Used on a"
-    df['item_description'] = df['item_description'].fillna('').astype(str)
-    df['item_description'] = df['item_description'].str.split(separator, n=1).str[0]
-    df['item_description'] = df['item_description'].str.replace('\n', '', regex=False).str.strip()
-
-    df['item_description'] = df['item_description'].str.replace(r'\s*:\s*', ': ', regex= True)
-    df['item_description'] = df['item_description'].str.replace(r'\s+', ' ', regex= True)
-    df['item_description'] = df['item_description'].str.replace('"', '')
+    df['item_description'] = ITEM_DESCRIPTION.clean(df['item_description'])
     
     return df
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""Adaptive per-host rate limiting for the shared HTTP client.
+
+Each host we crawl tolerates a different amount of traffic: rk9 happily serves a few dozen teamlists at once, PokeAPI asks for fair use,
+and Bulbapedia is a community wiki we really shouldn't hammer. Every host gets a HostLimiter combining two controls:
+
+    - a token bucket capping the request rate, so bursts never exceed what we consider polite for that host;
+    - a concurrency limit adjusted with AIMD (additive increase, multiplicative decrease), the same idea TCP uses for congestion control.
+      While responses are healthy the limit creeps up by roughly one request per round of responses; a 429, a 5xx, a connection error
+      or a sharp rise in latency halves it. A Retry-After header pauses the host entirely until the server says it's ready again.
+
+This way each crawl finds the throughput a host allows on its own, instead of relying on a hand-tuned worker count.
+
+"""
+
+import threading
+import time
+
+DEFAULT_RATE = 10.0
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Requests per second, burst size, and the concurrency bounds for each host.
+HOST_LIMITS = {
+    "rk9.gg": {"rate": 20.0, "burst": 20, "max_concurrency": 32},
+    "pokeapi.co": {"rate": 20.0, "burst": 20, "max_concurrency": 16},
+    "bulbapedia.bulbagarden.net": {"rate": 2.0, "burst": 2, "max_concurrency": 2},
+    "pokemondb.net": {"rate": 2.0, "burst": 2, "max_concurrency": 2},
+}
+
+DECREASE_FACTOR = 0.5
+LATENCY_DECREASE_FACTOR = 0.8
+DECREASE_COOLDOWN = 1.0
+LATENCY_TOLERANCE = 2.0
+LATENCY_WARMUP = 10
+FAST_ALPHA = 0.3
+SLOW_ALPHA = 0.05
+
+
+class HostLimiter:
+    """Token bucket plus AIMD concurrency limit for a single host.
+
+    Args:
+        rate: Sustained requests per second allowed by the token bucket.
+        burst: Size of the token bucket, i.e. how many requests can go out back to back.
+        max_concurrency: Upper bound for the adaptive concurrency limit.
+        min_concurrency: Lower bound for the adaptive concurrency limit.
+        initial_concurrency: Starting concurrency limit. Defaults to half of max_concurrency.
+    """
+
+    def __init__(
+        self,
+        rate=DEFAULT_RATE,
+        burst=None,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        min_concurrency=1,
+        initial_concurrency=None,
+    ):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(
+            initial_concurrency if initial_concurrency is not None else max(min_concurrency, max_concurrency // 2)
+        )
+
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self.active = 0
+        self.blocked_until = 0.0
+
+        self.fast_latency = None
+        self.slow_latency = None
+        self.samples = 0
+
+        self.counters = {"requests": 0, "throttled": 0, "decreases": 0, "waited": 0.0}
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Blocks until the host is not paused, a concurrency slot is free, and a token is available."""
+
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.active >= int(self.limit):
+                    wait = None
+                elif self.tokens < 1:
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    self.tokens -= 1
+                    self.active += 1
+                    self.counters["requests"] += 1
+                    self.counters["waited"] += now - start
+                    return
+
+                self._cond.wait(wait)
+
+    def release(self, status=None, latency=None, retry_after=None):
+        """Frees the slot taken by acquire and adapts the concurrency limit to the outcome.
+
+        Args:
+            status: The HTTP status code of the response, or None if the request failed without one.
+            latency: How long the request took, in seconds.
+            retry_after: Seconds the server asked us to wait before sending anything else.
+        """
+
+        with self._cond:
+            now = time.monotonic()
+            self.active -= 1
+
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+            if status is None or status == 429 or status >= 500:
+                if status == 429:
+                    self.counters["throttled"] += 1
+                self._decrease(now, DECREASE_FACTOR)
+            elif latency is not None and self._latency_rising(latency):
+                self._decrease(now, LATENCY_DECREASE_FACTOR)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+            self._cond.notify_all()
+
+    def _latency_rising(self, latency):
+        """Tracks a fast and a slow moving average of latency and reports when the fast one pulls well ahead."""
+
+        self.samples += 1
+        if self.fast_latency is None:
+            self.fast_latency = self.slow_latency = latency
+            return False
+
+        self.fast_latency += FAST_ALPHA * (latency - self.fast_latency)
+        self.slow_latency += SLOW_ALPHA * (latency - self.slow_latency)
+        return self.samples > LATENCY_WARMUP and self.fast_latency > self.slow_latency * LATENCY_TOLERANCE
+
+    def _decrease(self, now, factor):
+        # A burst of in-flight requests failing together should only count as one congestion signal.
+        if now - self._last_decrease < DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_concurrency, self.limit * factor)
+        self.counters["decreases"] += 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                **self.counters,
+                "concurrency": int(self.limit),
+                "latency": self.fast_latency,
+            }
+
+
+class RateLimiter:
+    """Hands out one HostLimiter per host, configured from HOST_LIMITS.
+
+    Args:
+        host_limits: Mapping of hostname to HostLimiter keyword arguments. Hosts not listed get the defaults.
+    """
+
+    def __init__(self, host_limits=None):
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def for_host(self, host):
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = HostLimiter(**self.host_limits.get(host, {}))
+                self._limiters[host] = limiter
+            return limiter
+
+    def stats(self):
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {host: limiter.stats() for host, limiter in limiters.items()}
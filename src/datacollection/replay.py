@@ -0,0 +1,230 @@
+"""Record and replay of crawled pages for offline runs.
+
+The scraper and pokeapi fetchers need rk9, PokeAPI and Bulbapedia to be online, which makes the pipeline impossible to test or benchmark
+repeatably. This module captures every response that goes through the shared HTTP client into a fixture corpus on disk, and serves that
+corpus back from a local HTTP server. While replaying, the client rewrites every URL to point at the local server, so the whole
+processor.make_all_csv pipeline runs unchanged, offline. The server can inject latency and errors to see how concurrency, caching and
+rate limiting behave under realistic conditions.
+
+Typical use case example:
+    with replay.recording("tests/corpus"):
+        processor.make_standings_csv()        <--- talks to the live sites and saves every response
+
+    with replay.offline("tests/corpus", latency=0.05, error_rate=0.01):
+        processor.make_standings_csv()        <--- the same crawl, served from the corpus
+
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import httpclient, ratelimit
+
+INDEX_FILE = "index.jsonl"
+BODIES_DIR = "bodies"
+
+
+class Corpus:
+    """A directory of recorded responses, indexed by their original URL.
+
+    The index is an append-only JSON lines file, so recording is cheap and a crashed recording keeps everything saved so far.
+    When a URL was recorded more than once, the last entry wins.
+
+    Args:
+        corpus_dir: Directory holding the index and the response bodies.
+    """
+
+    def __init__(self, corpus_dir):
+        self.corpus_dir = corpus_dir
+        self.entries = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(corpus_dir, BODIES_DIR), exist_ok=True)
+
+        index_path = os.path.join(corpus_dir, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["url"]] = entry
+
+    def add(self, url, body, status=200, content_type="text/html; charset=utf-8"):
+        """Saves a response body under its original URL."""
+
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        name = hashlib.sha1(url.encode()).hexdigest()
+        entry = {"url": url, "path": f"{BODIES_DIR}/{name}", "status": status, "content_type": content_type}
+
+        with self._lock:
+            with open(os.path.join(self.corpus_dir, entry["path"]), "wb") as file:
+                file.write(body)
+            with open(os.path.join(self.corpus_dir, INDEX_FILE), "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry) + "\n")
+            self.entries[url] = entry
+
+    def get(self, url):
+        """Returns (status, content_type, body) for a recorded URL, or None if it was never recorded."""
+
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+        with open(os.path.join(self.corpus_dir, entry["path"]), "rb") as file:
+            return entry["status"], entry["content_type"], file.read()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class Recorder:
+    """HttpClient hook that saves every response it sees into a Corpus."""
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+
+    def record(self, url, response):
+        self.corpus.add(
+            url,
+            response.content,
+            response.status_code,
+            response.headers.get("Content-Type", "application/octet-stream"),
+        )
+
+
+def original_url(path):
+    """Maps a replay server path like /rk9.gg/roster/ABC back to https://rk9.gg/roster/ABC, undoing httpclient.rebase_url."""
+    return "https://" + path.lstrip("/")
+
+
+class ReplayServer:
+    """Serves a Corpus over HTTP on localhost.
+
+    Args:
+        corpus: The Corpus (or corpus directory) to serve.
+        latency: Seconds added to every response, or a (min, max) tuple for a uniformly random delay.
+        error_rate: Fraction of requests answered with a 503 instead of the recorded response.
+        seed: Seed for the latency and error randomness, to make runs repeatable.
+    """
+
+    def __init__(self, corpus, latency=0.0, error_rate=0.0, seed=None):
+        self.corpus = Corpus(corpus) if isinstance(corpus, str) else corpus
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.counters = {"served": 0, "missing": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    def _delay(self):
+        with self._lock:
+            if isinstance(self.latency, tuple):
+                return self.random.uniform(*self.latency)
+            return self.latency
+
+    def _should_fail(self):
+        with self._lock:
+            return self.error_rate and self.random.random() < self.error_rate
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counters[outcome] += 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                delay = server._delay()
+                if delay:
+                    time.sleep(delay)
+
+                if server._should_fail():
+                    server._count("errors")
+                    self._respond(503, "text/plain", b"injected error")
+                    return
+
+                recorded = server.corpus.get(original_url(self.path))
+                if recorded is None:
+                    server._count("missing")
+                    self._respond(404, "text/plain", b"not recorded")
+                    return
+
+                server._count("served")
+                self._respond(*recorded)
+
+            def _respond(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+@contextlib.contextmanager
+def recording(corpus_dir, client=None):
+    """Installs a shared client that records every response into corpus_dir for the duration of the block."""
+
+    client = client or httpclient.HttpClient(rate_limiter=ratelimit.RateLimiter())
+    client.recorder = Recorder(Corpus(corpus_dir))
+    previous = httpclient.set_client(client)
+    try:
+        yield client
+    finally:
+        httpclient.set_client(previous)
+
+
+@contextlib.contextmanager
+def offline(corpus_dir, latency=0.0, error_rate=0.0, seed=None, client=None):
+    """Serves corpus_dir from a local server and routes the shared client to it for the duration of the block.
+
+    Yields:
+        The running ReplayServer, whose counters report how many recorded, missing and failed responses were served.
+    """
+
+    with ReplayServer(corpus_dir, latency, error_rate, seed) as server:
+        client = client or httpclient.HttpClient()
+        client.replay_base = server.url
+        previous = httpclient.set_client(client)
+        try:
+            yield server
+        finally:
+            httpclient.set_client(previous)
+            client.close()
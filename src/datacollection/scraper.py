@@ -6,19 +6,25 @@ to fill the standings dataset. Similarly, team view is hidden behind more links,
 
 """
 
+import collections
 import concurrent.futures
 from bs4 import BeautifulSoup
-import requests
 import hashlib
 from daterangeparser import parse
 import pandas as pd
 
+from . import frontier, httpclient, parsers, pipeline
 
-def fetch_all_tournament_data(response):
+
+def fetch_all_tournament_data(response, backend=parsers.DEFAULT_BACKEND):
     """Fetches tournament data from rk9 website.
 
     Retrieves the tournament data from the HTML response, parses it, and returns it in a format that can be used to create a CSV file.
 
+    Args:
+        response: The HTML of the rk9 events page.
+        backend: The table parsing engine to use, see parsers.BACKENDS.
+
     Returns:
         A nested list containing the corresponding table columns, as well as the additional 'tournament_id' column.
         Each row in the list represents a tournament, with the first row containing the column headers.
@@ -62,8 +68,7 @@ def fetch_all_tournament_data(response):
             f"{tournament_name}{location}{start_date}".encode()
         ).hexdigest()
 
-    soup = BeautifulSoup(response, "lxml")
-    rows = soup.find_all("tr")
+    rows = parsers.table_rows(response, backend)
     tournaments_data = [
         (
             [
@@ -78,9 +83,7 @@ def fetch_all_tournament_data(response):
         )
     ]
 
-    for row in rows:
-        columns = row.find_all("td")
-
+    for columns in rows:
         if len(columns) >= 5:
             date = columns[0].text.strip()
             tournament_name = columns[2].text.strip()
@@ -91,13 +94,12 @@ def fetch_all_tournament_data(response):
                 tournament_name, location, start_date
             )
 
-            logo_img = columns[1].find("img")
-            if logo_img:
-                logo_link = "rk9.gg" + logo_img["src"]
+            logo_img = columns[1].images
+            logo_link = "rk9.gg" + logo_img[0] if logo_img else None
 
-            link = columns[4].find("a", string="VG")
+            link = next((href for text, href in columns[4].links if text == "VG"), None)
             if link:
-                rk9_id = link["href"].replace("/tournament/", "")
+                rk9_id = link.replace("/tournament/", "")
             else:
                 rk9_id = None
 
@@ -118,189 +120,340 @@ def fetch_all_tournament_data(response):
     return tournaments_data
 
 
-def fetch_standings_data(tournament_data):
+STANDINGS_COLUMNS = [
+    "tournament_id",
+    "player_id",
+    "first_name",
+    "last_name",
+    "country",
+    "division",
+    "trainer_name",
+    "team_list",
+    "standing",
+]
+
+
+def has_rk9_id(rk9_id):
+    """Tournaments without a VG roster come back from the csv as NaN or the 'missing_rk9_id' placeholder."""
+    return not pd.isna(rk9_id) and rk9_id not in ("", "missing_rk9_id")
+
+
+def fetch_tournament_standings(tournament_id, rk9_id, backend=parsers.DEFAULT_BACKEND):
+    """Fetches and parses the roster page of a single tournament.
+
+    Args:
+        tournament_id: Our generated id for the tournament, prepended to every row.
+        rk9_id: The rk9 id used to build the roster URL.
+        backend: The table parsing engine to use, see parsers.BACKENDS.
+
+    Returns:
+        A list of standings rows, in the order they appear on the roster page.
+    """
+
+    standings_url = f"https://rk9.gg/roster/{rk9_id}"
+    response = fetch_html(standings_url)
+
+    return parsers.parse_roster(response, tournament_id, backend)
+
+
+def iter_standings_rows(tournament_data, max_workers=1, backend=parsers.DEFAULT_BACKEND):
+    """Yields standings rows tournament by tournament, as soon as each roster has been parsed.
+
+    Rows come out grouped by tournament in the same order as tournament_data. With max_workers above 1, a sliding window of
+    at most twice that many roster pages is fetched ahead of the consumer, so memory stays flat however many tournaments are
+    crawled. A tournament whose roster fails to download or parse is reported and skipped.
+
+    Args:
+        tournament_data: A pandas DataFrame containing the corresponding table columns for tournaments.
+        max_workers: The maximum number of roster pages fetched at once. 1 keeps the crawl sequential.
+        backend: The table parsing engine used for roster pages, see parsers.BACKENDS.
+    """
+
+    def fetch_safely(tournament):
+        tournament_id, rk9_id = tournament
+        try:
+            return fetch_tournament_standings(tournament_id, rk9_id, backend)
+        except Exception as e:
+            print(f"Failed to fetch standings for tournament {tournament_id} ({rk9_id}): {e}")
+            return []
+
+    tournaments = (
+        (row["tournament_id"], row["rk9_id"])
+        for _, row in tournament_data.iterrows()
+        if has_rk9_id(row["rk9_id"])
+    )
+
+    if max_workers <= 1:
+        for tournament in tournaments:
+            yield from fetch_safely(tournament)
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        window = collections.deque()
+        for tournament in tournaments:
+            window.append(executor.submit(fetch_safely, tournament))
+            if len(window) >= max_workers * 2:
+                yield from window.popleft().result()
+        while window:
+            yield from window.popleft().result()
+
+
+def fetch_standings_data(tournament_data, max_workers=1, backend=parsers.DEFAULT_BACKEND):
     """Fetches standings data from rk9 website.
 
     Creates a URL using rk9_id and fetches all standings data from the website.
+    With max_workers above 1, roster pages are fetched concurrently by a bounded thread pool. Rows are still
+    returned grouped by tournament in the same order as tournament_data, and a tournament whose roster fails
+    to download or parse is reported and skipped instead of aborting the whole crawl.
 
     Args:
         tournament_data: A pandas DataFrame containing the corresponding table columns for tournaments.
+        max_workers: The maximum number of roster pages fetched at once. 1 keeps the crawl sequential.
+        backend: The table parsing engine used for roster pages, see parsers.BACKENDS.
 
     Returns:
         A pandas DataFrame containing the corresponding table columns for standings, as well as the additional 'tournament_id' column.
         Most of the columns are self-explanatory, but the team list column will be a JSON file, which will be parsed later.
-
-    Raises:
-        IOError: If the HTML response is invalid.
     """
 
-    def generate_player_id(player_id, first_name, last_name):
-        """rk9 does not provide player_id in its entirety, so we'll generate our own."""
-        return hashlib.md5(f"{player_id}{first_name}{last_name}".encode()).hexdigest()
+    standings_data = list(iter_standings_rows(tournament_data, max_workers, backend))
 
-    standings_data = []
+    standings_df = pd.DataFrame(standings_data, columns=STANDINGS_COLUMNS)
 
-    for _, row in tournament_data.iterrows():
-        tournament_id = row["tournament_id"]
-        rk9_id = row["rk9_id"]
-        if rk9_id:
-            standings_url = f"https://rk9.gg/roster/{rk9_id}"
-            response = fetch_html(standings_url)
-            soup = BeautifulSoup(response, "lxml")
+    return standings_df
 
-            rows = soup.find_all("tr")
 
-            for row in rows:
-                columns = row.find_all("td")
-                try:
-                    if (
-                        columns
-                    ):  # Certain tournaments don't have standing links or lack country data.
-                        first_name = columns[1].text.strip()
-                        last_name = columns[2].text.strip()
-                        country = columns[3].text.strip() if len(columns) >= 8 else None
-                        division = columns[3 if country is None else 4].text.strip()
-                        trainer_name = columns[4 if country is None else 5].text.strip()
-                        team_list_element = columns[5 if country is None else 6].find(
-                            "a"
-                        )
-                        team_list = (
-                            team_list_element["href"].replace("/teamlist/public/", "")
-                            if team_list_element
-                            else "Submitted"
-                        )
-                        standing = columns[6 if country is None else 7].text.strip()
-                        player_id = generate_player_id(
-                            columns[0].text.strip(), first_name, last_name
-                        )
-
-                        standings_data.append(
-                            [
-                                tournament_id,
-                                player_id,
-                                first_name,
-                                last_name,
-                                country,
-                                division,
-                                trainer_name,
-                                team_list,
-                                standing,
-                            ]
-                        )
-                except IndexError:
-                    print(IndexError)
-                    print(columns)
-
-    standings_df = pd.DataFrame(
-        standings_data,
-        columns=[
-            "tournament_id",
-            "player_id",
-            "first_name",
-            "last_name",
-            "country",
-            "division",
-            "trainer_name",
-            "team_list",
-            "standing",
-        ],
-    )
+TEAM_WORKERS = 32
+TEAM_WINDOW = 64
+STANDINGS_CHUNK_SIZE = 5000
 
-    return standings_df
+TEAM_COLUMNS = [
+    "tournament_id",
+    "player_id",
+    "icon",
+    "pokemon",
+    "form",
+    "tera_type",
+    "ability",
+    "held_item",
+    "move1",
+    "move2",
+    "move3",
+    "move4",
+]
 
 
-def fetch_team_data(filepath):
-    """Takes in the filepath for the standings csv and creates a new csv with team member data"""
+def fetch_team_members(url):
+    """Fetch the team members using the constructed url."""
 
-    def fetch_team_members(url):
-        """Fetch the team members using the constructed url."""
+    return parse_team_members(fetch_html(url))
 
-        response = fetch_html(url)
-        soup = BeautifulSoup(response, "lxml")
 
-        team_members = []
+def parse_team_members(response, backend=parsers.DEFAULT_BACKEND):
+    """Parses the team members out of a teamlist page.
 
-        team = soup.find_all("div", {"class": "pokemon bg-light-green-50 p-3"})
+    Sets with missing fields or fewer than four moves come back with None in those columns instead of failing the whole page.
+    """
 
-        for team_member in team[:6]:
-            poke_icon = team_member.find("img")["src"]
+    return [list(member) for member in parsers.parse_teamlist(response, backend)]
 
-            raw_text = team_member.get_text(separator=" ", strip=True)
-            name = ""
-            form = "N/A"
 
-            if "[" in raw_text and "]" in raw_text:
-                name = raw_text.split("[")[0].strip()
-                form = raw_text.split("[")[1].split("]")[0].strip()
-            else:
-                name = raw_text.split(" ")[0]
+def teamlist_url(team_list):
+    return f"https://rk9.gg/teamlist/public/{team_list}"
 
-            tera_type_tag = team_member.find("b", text="Tera Type:").next_sibling
-            tera_type = tera_type_tag.strip().strip('"') if tera_type_tag else None
 
-            ability_tag = team_member.find("b", text="Ability:").next_sibling
-            ability = (
-                ability_tag.strip().strip('"').replace("&nbsp;", "").strip()
-                if ability_tag
-                else None
-            )
+def fetch_team_data(standings, frontier_path=None, max_workers=TEAM_WORKERS):
+    """Takes in the standings (a DataFrame or the filepath of the standings csv) and returns the team member data.
 
-            held_item_tag = team_member.find("b", text="Held Item:").next_sibling
-            held_item = held_item_tag.strip().strip('"') if held_item_tag else None
-
-            moves = team_member.find_all("span", {"class": "badge"})
-            move1, move2, move3, move4 = moves
-
-            team_member_data = [
-                poke_icon,
-                name,
-                form,
-                tera_type,
-                ability,
-                held_item,
-                move1.text,
-                move2.text,
-                move3.text,
-                move4.text,
-            ]
+    Rows whose teamlist is only the 'Submitted' placeholder, and repeated teamlist ids, are skipped.
 
-            team_members.append(team_member_data)
-        return team_members
-
-    df = pd.read_csv(filepath)
-    team_data = [
-        [
-            "tournament_id",
-            "player_id",
-            "icon",
-            "pokemon",
-            "form",
-            "tera_type",
-            "ability",
-            "held_item",
-            "move1",
-            "move2",
-            "move3",
-            "move4",
-        ]
-    ]
+    Args:
+        standings: A DataFrame of standings rows, or the path of the standings csv.
+        frontier_path: Optional path of a persistent crawl frontier (see frontier.py). When given, every finished teamlist is
+            saved as soon as it is parsed, and a crawl that was interrupted picks up where it stopped.
+        max_workers: The number of worker threads fetching teamlist pages. The shared client's rate limiter decides how many requests actually reach rk9 at once.
+
+    Returns:
+        A nested list of team member rows, with the first row containing the column headers.
+    """
+
+    if frontier_path is not None:
+        df = pd.read_csv(standings) if isinstance(standings, str) else standings
+        return fetch_team_data_resumable(df, frontier_path, max_workers)
+
+    team_data = [list(TEAM_COLUMNS)]
+    team_data.extend(iter_team_rows(standings, max_workers))
+
+    return team_data
+
+
+def standings_chunks(standings, chunksize=STANDINGS_CHUNK_SIZE):
+    """Yields the standings as DataFrame chunks, whether given a DataFrame, a csv path, or an iterable of DataFrames."""
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future_to_url = {
-            executor.submit(
-                fetch_team_members, f"https://rk9.gg/teamlist/public/{row['team_list']}"
-            ): row
-            for index, row in df.iterrows()
-        }
-        for future in concurrent.futures.as_completed(future_to_url):
-            row = future_to_url[future]
+    if isinstance(standings, pd.DataFrame):
+        yield standings
+    elif isinstance(standings, str):
+        yield from pd.read_csv(standings, chunksize=chunksize)
+    else:
+        yield from standings
+
+
+def iter_team_rows(standings, max_workers=TEAM_WORKERS, max_in_flight=TEAM_WINDOW):
+    """Yields team member rows as teamlist pages finish downloading.
+
+    At most max_in_flight teamlist pages are queued in the thread pool at any time, and a csv path is read in chunks,
+    so memory stays flat no matter how many players are crawled. Placeholder and duplicate teamlists are skipped.
+
+    Args:
+        standings: A DataFrame of standings rows, the path of the standings csv, or an iterable of DataFrame chunks.
+        max_workers: The number of worker threads fetching teamlist pages. The shared client's rate limiter decides how many requests actually reach rk9 at once.
+        max_in_flight: The maximum number of submitted teamlist pages that haven't been consumed yet.
+    """
+
+    def team_lists():
+        seen = set()
+        for chunk in standings_chunks(standings):
+            for tournament_id, player_id, team_list in zip(
+                chunk["tournament_id"], chunk["player_id"], chunk["team_list"]
+            ):
+                if frontier.is_placeholder(team_list) or team_list in seen:
+                    continue
+                seen.add(team_list)
+                yield tournament_id, player_id, team_list
+
+    def collect(in_flight):
+        done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            tournament_id, player_id = in_flight.pop(future)
             try:
                 members = future.result()
                 for member in members:
-                    team_data.append([row["tournament_id"], row["player_id"], *member])
+                    yield [tournament_id, player_id, *member]
             except Exception as e:
                 print(f"An error occurred: {e}")
 
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = {}
+        for tournament_id, player_id, team_list in team_lists():
+            future = executor.submit(fetch_team_members, teamlist_url(team_list))
+            in_flight[future] = (tournament_id, player_id)
+            if len(in_flight) >= max_in_flight:
+                yield from collect(in_flight)
+        while in_flight:
+            yield from collect(in_flight)
+
+
+def fetch_team_data_resumable(df, frontier_path, max_workers=TEAM_WORKERS, max_in_flight=TEAM_WINDOW):
+    """Crawls teamlists through a persistent frontier, so progress survives crashes and interruptions.
+
+    As in iter_team_rows, at most max_in_flight teamlist pages are queued in the thread pool at any time.
+    """
+
+    crawl = frontier.CrawlFrontier(frontier_path)
+    try:
+        counts = crawl.add(zip(df["team_list"], df["tournament_id"], df["player_id"]))
+        pending = crawl.pending()
+        print(
+            f"Teamlist frontier: {counts['queued']} new, {counts['placeholders']} placeholders and "
+            f"{counts['duplicates']} already known skipped, {len(pending)} to fetch"
+        )
+
+        def collect(in_flight):
+            done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                team_list = in_flight.pop(future)
+                try:
+                    crawl.mark_done(team_list, future.result())
+                except Exception as e:
+                    crawl.mark_failed(team_list, e)
+                    print(f"An error occurred for teamlist {team_list}: {e}")
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            in_flight = {}
+            for team_list, _, _ in pending:
+                in_flight[executor.submit(fetch_team_members, teamlist_url(team_list))] = team_list
+                if len(in_flight) >= max_in_flight:
+                    collect(in_flight)
+            while in_flight:
+                collect(in_flight)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+        team_data = [list(TEAM_COLUMNS)]
+        for tournament_id, player_id, members in crawl.results(df["team_list"]):
+            for member in members:
+                team_data.append([tournament_id, player_id, *member])
+        return team_data
+    finally:
+        crawl.close()
+
+def fetch_team_data_staged(standings, frontier_path=None, fetch_workers=TEAM_WORKERS, parse_workers=None):
+    """Crawls teamlists with a staged pipeline: I/O threads fetch pages, a process pool parses them, one writer collects rows.
+
+    Parsing runs outside the GIL-bound fetch threads, so it scales across every core. Placeholder and duplicate teamlists are
+    skipped as in fetch_team_data, and a per-stage throughput report is printed at the end.
+
+    Args:
+        standings: A DataFrame of standings rows, the path of the standings csv, or an iterable of DataFrame chunks.
+        frontier_path: Optional path of a persistent crawl frontier. Only pending teamlists are fetched and each result is
+            saved by the writer stage as soon as it is parsed.
+        fetch_workers: Number of I/O threads downloading teamlist pages.
+        parse_workers: Number of parser processes. None uses one per core.
+
+    Returns:
+        A nested list of team member rows, with the first row containing the column headers.
+    """
+
+    team_data = [list(TEAM_COLUMNS)]
+
+    if frontier_path is not None:
+        df = pd.concat(list(standings_chunks(standings)), ignore_index=True)
+        crawl = frontier.CrawlFrontier(frontier_path)
+        crawl.add(zip(df["team_list"], df["tournament_id"], df["player_id"]))
+        items = crawl.pending()
+    else:
+        crawl = None
+        seen = set()
+        items = []
+        for chunk in standings_chunks(standings):
+            for tournament_id, player_id, team_list in zip(
+                chunk["tournament_id"], chunk["player_id"], chunk["team_list"]
+            ):
+                if not frontier.is_placeholder(team_list) and team_list not in seen:
+                    seen.add(team_list)
+                    items.append((team_list, tournament_id, player_id))
+
+    def fetch(item):
+        return fetch_html(teamlist_url(item[0]))
+
+    def write(item, members, error):
+        team_list, tournament_id, player_id = item
+        if error is not None:
+            print(f"An error occurred for teamlist {team_list}: {error}")
+            if crawl is not None:
+                crawl.mark_failed(team_list, error)
+        elif crawl is not None:
+            crawl.mark_done(team_list, members)
+        else:
+            for member in members:
+                team_data.append([tournament_id, player_id, *member])
+
+    staged = pipeline.StagedPipeline(fetch, parse_team_members, write, fetch_workers, parse_workers)
+    try:
+        staged.run(items)
+        staged.report()
+
+        if crawl is not None:
+            for tournament_id, player_id, members in crawl.results(df["team_list"]):
+                for member in members:
+                    team_data.append([tournament_id, player_id, *member])
+    finally:
+        if crawl is not None:
+            crawl.close()
+
     return team_data
 
 def fetch_icon_links():
@@ -329,5 +482,12 @@ def fetch_icon_links():
     return item_data
 
 def fetch_html(url):
-    response = requests.get(url)
+    """Fetches a page through the shared keep-alive client and returns its body as text.
+
+    Raises:
+        requests.HTTPError: If the page answered with an error status, e.g. a 404, or a 503 once retries ran out. Its body would
+            otherwise parse as an empty page.
+    """
+    response = httpclient.get(url)
+    response.raise_for_status()
     return response.text
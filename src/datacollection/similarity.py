@@ -0,0 +1,382 @@
+"""Similar-team search over the teams table, using MinHash signatures and locality-sensitive hashing.
+
+A team is described by a set of tokens: each of its species, and each (species, held item), (species, move) and (species, tera type)
+pair. Two teams are as similar as the Jaccard similarity of their token sets. Comparing a team against every team of the dataset
+means reading every token of every team, so the index instead keeps, per team:
+
+    signature       the minimum of NUM_PERM random hash functions over its tokens; two signatures agree on a given hash function
+                    with a probability equal to the Jaccard similarity of the two teams
+    band keys       the signature cut into BANDS bands of NUM_PERM / BANDS rows, each hashed to a single integer
+
+Teams sharing any band key with the query are the candidates. With the default 32 bands of 4 rows, teams with a similarity of 0.5
+are found with a probability of 87% and teams above 0.7 almost always, while most unrelated teams are never looked at. The
+candidates are then re-ranked by their exact Jaccard similarity, so the scores returned are exact and only recall is approximate.
+brute_force scores every team exactly, for comparison.
+
+Teams are hashed one tournament at a time and stored in an SQLite database, so the index is updated with only the new tournaments.
+Updates only write to the database: the signatures and tokens of every team are loaded into memory on the first query after the
+index was opened or updated, so adding many tournaments in a row neither holds nor copies the whole index.
+
+Typical use case example:
+    index = similarity.SimilarityIndex("src/data/similarity.sqlite")
+    index.update(new_teams)                           <--- only these tournaments are hashed
+    index.query(team, k=10)                           <--- the 10 most similar teams to the members of one team
+
+"""
+
+import functools
+import hashlib
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+SIMILARITY_PATH = "src/data/similarity.sqlite"
+NUM_PERM = 128
+BANDS = 32
+SEED = 1
+SIGNATURE_BATCH = 1024
+
+TEAM_KEY = ["tournament_id", "player_id"]
+MOVE_COLUMNS = ["move1", "move2", "move3", "move4"]
+# Team column -> prefix of the tokens pairing it with the species.
+TOKEN_COLUMNS = {"held_item": "item", "tera_type": "tera", **{column: "move" for column in MOVE_COLUMNS}}
+
+BAND_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+TOKEN_CACHE_SIZE = 1 << 16
+
+
+@functools.lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def token_hash(token):
+    """Stable 64-bit hash of a token, the same in every process (unlike hash())."""
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+
+
+def member_tokens(species, values):
+    """The tokens of one team member: its species, and its species paired with each of its values (keyed by team column)."""
+
+    if pd.isna(species):
+        return []
+    tokens = [f"species:{species}"]
+    for column, prefix in TOKEN_COLUMNS.items():
+        value = values.get(column)
+        if not pd.isna(value):
+            tokens.append(f"{prefix}:{species}|{value}")
+    return tokens
+
+
+def pair_hashes(prefix, species, values):
+    """Hashes the tokens pairing each species with a value, hashing each distinct pair once.
+
+    Returns:
+        (hashes, valid): the hashes of the rows where neither is missing, and the mask of those rows.
+    """
+
+    species_codes, species_uniques = pd.factorize(species)
+    value_codes, value_uniques = pd.factorize(values)
+    valid = (species_codes >= 0) & (value_codes >= 0)
+    pairs = species_codes[valid].astype(np.int64) * len(value_uniques) + value_codes[valid]
+    uniques, inverse = np.unique(pairs, return_inverse=True)
+    names = np.asarray(species_uniques, dtype=object)[uniques // max(len(value_uniques), 1)]
+    others = np.asarray(value_uniques, dtype=object)[uniques % max(len(value_uniques), 1)]
+    hashes = np.array([token_hash(f"{prefix}:{name}|{other}") for name, other in zip(names, others)], dtype=np.uint64)
+    return hashes[inverse.ravel()], valid
+
+
+def team_tokens(teams):
+    """Turns team members into the token set of each team.
+
+    Args:
+        teams: DataFrame of team members, with the columns of scraper.TEAM_COLUMNS.
+
+    Returns:
+        (keys, offsets, tokens): a DataFrame of the tournament_id and player_id of each team, the offsets of each team's tokens,
+        and the sorted, unique uint64 token hashes of every team, one team after another.
+    """
+
+    teams = teams.dropna(subset=TEAM_KEY)
+    grouped = teams.groupby(TEAM_KEY, sort=True)
+    keys = grouped.size().index.to_frame(index=False)
+    team = grouped.ngroup().to_numpy()
+    species = teams["pokemon"].to_numpy(dtype=object)
+
+    owners = []
+    hashes = []
+    species_codes, species_uniques = pd.factorize(species)
+    species_hashes = np.array([token_hash(f"species:{name}") for name in species_uniques], dtype=np.uint64)
+    owners.append(team[species_codes >= 0])
+    hashes.append(species_hashes[species_codes[species_codes >= 0]])
+    for column, prefix in TOKEN_COLUMNS.items():
+        pair, valid = pair_hashes(prefix, species, teams[column].to_numpy(dtype=object))
+        owners.append(team[valid])
+        hashes.append(pair)
+
+    owners = np.concatenate(owners)
+    hashes = np.concatenate(hashes)
+    order = np.lexsort((hashes, owners))
+    owners, hashes = owners[order], hashes[order]
+    unique = np.ones(len(owners), dtype=bool)
+    unique[1:] = (owners[1:] != owners[:-1]) | (hashes[1:] != hashes[:-1])
+    owners, hashes = owners[unique], hashes[unique]
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(owners, minlength=len(keys)))]).astype(np.int64)
+    return keys, offsets, hashes
+
+
+class MinHasher:
+    """NUM_PERM random hash functions, and the MinHash signatures they give token sets.
+
+    Args:
+        num_perm: Number of hash functions, i.e. the length of a signature.
+        seed: Seed of the hash function parameters. Signatures are only comparable between hashers with the same seed.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, seed=SEED):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        # Multiply-shift hashing: the top 32 bits of a * x + b modulo 2**64, with a odd. No division, unlike modulo a prime.
+        self.a = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+        self.b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True)
+
+    def _permute(self, tokens):
+        with np.errstate(over="ignore"):
+            return ((self.a[:, None] * tokens[None, :] + self.b[:, None]) >> np.uint64(32)).astype(np.uint32)
+
+    def signatures(self, offsets, tokens):
+        """Returns the (teams, num_perm) uint32 signatures of the token sets delimited by offsets. Empty sets get all ones."""
+
+        teams = len(offsets) - 1
+        result = np.full((teams, self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        for first in range(0, teams, SIGNATURE_BATCH):
+            last = min(first + SIGNATURE_BATCH, teams)
+            starts = offsets[first:last]
+            ends = offsets[first + 1 : last + 1]
+            filled = np.flatnonzero(ends > starts)
+            if not len(filled):
+                continue
+            hashed = self._permute(tokens[starts[0] : ends[-1]])
+            result[first + filled] = np.minimum.reduceat(hashed, starts[filled] - starts[0], axis=1).T
+        return result
+
+
+def band_keys(signatures, bands=BANDS):
+    """Hashes each band of rows of the signatures to one integer, giving a (teams, bands) uint64 array."""
+
+    rows = signatures.shape[1] // bands
+    keys = np.zeros((len(signatures), bands), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for row in range(rows):
+            keys = keys * BAND_MULTIPLIER + signatures[:, row::rows][:, :bands].astype(np.uint64)
+    return keys
+
+
+def jaccard(query, offsets, tokens, teams):
+    """Exact Jaccard similarity between the query token set and the token sets of the given teams."""
+
+    teams = np.asarray(teams, dtype=np.int64)
+    starts = offsets[teams]
+    sizes = offsets[teams + 1] - starts
+    owner = np.repeat(np.arange(len(teams)), sizes)
+    positions = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes) + np.repeat(starts, sizes)
+    shared = np.bincount(owner, weights=np.isin(tokens[positions], query), minlength=len(teams))
+    union = len(query) + sizes - shared
+    return np.divide(shared, union, out=np.zeros(len(teams)), where=union > 0)
+
+
+class SimilarityIndex:
+    """MinHash/LSH index of the teams, stored in an SQLite database and loaded into memory as NumPy arrays when first queried.
+
+    Args:
+        path: Location of the SQLite database. Use ":memory:" for an index that doesn't survive the process.
+        num_perm: Length of the signatures.
+        bands: Number of LSH bands. num_perm must be a multiple of it. Fewer, longer bands find fewer but closer candidates.
+        seed: Seed of the hash functions.
+
+    Raises:
+        ValueError: If the database was built with other settings, since its signatures wouldn't be comparable.
+    """
+
+    def __init__(self, path=SIMILARITY_PATH, num_perm=NUM_PERM, bands=BANDS, seed=SEED):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS settings (
+                name TEXT PRIMARY KEY,
+                value INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS teams (
+                tournament_id TEXT,
+                player_id TEXT,
+                signature BLOB,
+                tokens BLOB,
+                PRIMARY KEY (tournament_id, player_id)
+            );
+            CREATE TABLE IF NOT EXISTS digests (
+                tournament_id TEXT PRIMARY KEY,
+                digest TEXT
+            );
+            """
+        )
+        settings = {"num_perm": num_perm, "bands": bands, "seed": seed}
+        with self._db:
+            self._db.executemany("INSERT OR IGNORE INTO settings (name, value) VALUES (?, ?)", settings.items())
+        stored = dict(self._db.execute("SELECT name, value FROM settings"))
+        if stored != settings:
+            raise ValueError(f"{path} was built with {stored}, not {settings}")
+
+        self.bands = bands
+        self.hasher = MinHasher(num_perm, seed)
+        self._arrays = None
+        self._order = None
+
+    def _load(self):
+        rows = self._db.execute("SELECT tournament_id, player_id, signature, tokens FROM teams ORDER BY rowid").fetchall()
+        keys = pd.DataFrame([row[:2] for row in rows], columns=TEAM_KEY)
+        signatures = [np.frombuffer(row[2], dtype=np.uint32) for row in rows]
+        signatures = np.stack(signatures) if signatures else np.empty((0, self.hasher.num_perm), dtype=np.uint32)
+        tokens = [np.frombuffer(row[3], dtype=np.uint64) for row in rows]
+        offsets = np.concatenate([[0], np.cumsum([len(team) for team in tokens], dtype=np.int64)]).astype(np.int64)
+        tokens = np.concatenate(tokens) if tokens else np.array([], dtype=np.uint64)
+        self._arrays = (keys, signatures, offsets, tokens)
+        self._order = None
+
+    def _loaded(self):
+        if self._arrays is None:
+            self._load()
+        return self._arrays
+
+    @property
+    def keys(self):
+        """DataFrame of the tournament_id and player_id of every team, in index order."""
+        return self._loaded()[0]
+
+    @property
+    def signatures(self):
+        return self._loaded()[1]
+
+    @property
+    def offsets(self):
+        """Start of the tokens of every team in tokens, plus their end."""
+        return self._loaded()[2]
+
+    @property
+    def tokens(self):
+        return self._loaded()[3]
+
+    def _build_buckets(self):
+        # Per band, the band keys sorted, and the teams in that order, so the teams sharing a key are one searchsorted away.
+        # Built on the first query after an update, so adding many tournaments in a row doesn't sort the index every time.
+        keys = band_keys(self.signatures, self.bands)
+        self._order = np.argsort(keys, axis=0, kind="stable")
+        self._sorted_keys = np.take_along_axis(keys, self._order, axis=0)
+
+    def __len__(self):
+        if self._arrays is not None:
+            return len(self._arrays[0])
+        return self._db.execute("SELECT COUNT(*) FROM teams").fetchone()[0]
+
+    def tournaments(self):
+        """Returns the IDs of the tournaments in the index."""
+        return {row[0] for row in self._db.execute("SELECT DISTINCT tournament_id FROM teams")}
+
+    def digests(self):
+        """Returns the digest each tournament was last hashed with, for the tournaments whose update was given one."""
+        return dict(self._db.execute("SELECT tournament_id, digest FROM digests"))
+
+    def update(self, teams, digests=None):
+        """Hashes the teams of the tournaments in teams, replacing their previous teams. Other tournaments are left untouched.
+
+        Only the database is written; the arrays of a loaded index are dropped and loaded again on the next query.
+
+        Args:
+            teams: The team members of the tournaments to hash.
+            digests: Optional dictionary of tournament ID to a digest of its rows (see keyindex.group_digests), stored along with
+                the teams so a later update can tell which tournaments changed since.
+
+        Returns:
+            The number of teams hashed.
+        """
+
+        keys, offsets, tokens = team_tokens(teams)
+        signatures = self.hasher.signatures(offsets, tokens)
+        tournament_ids = sorted(set(teams["tournament_id"]))
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO digests (tournament_id, digest) VALUES (?, ?)", (digests or {}).items())
+            self._db.executemany("DELETE FROM teams WHERE tournament_id = ?", [(tournament_id,) for tournament_id in tournament_ids])
+            self._db.executemany(
+                "INSERT INTO teams (tournament_id, player_id, signature, tokens) VALUES (?, ?, ?, ?)",
+                [
+                    (tournament_id, player_id, signatures[team].tobytes(), tokens[offsets[team] : offsets[team + 1]].tobytes())
+                    for team, (tournament_id, player_id) in enumerate(keys.itertuples(index=False))
+                ],
+            )
+
+        self._arrays = None
+        self._order = None
+        return len(keys)
+
+    def _query_tokens(self, team):
+        # A single team is tokenized row by row: for six members that is much faster than the vectorized team_tokens.
+        columns = {column: team[column].tolist() for column in TOKEN_COLUMNS if column in team}
+        tokens = set()
+        for row, species in enumerate(team["pokemon"].tolist()):
+            values = {column: column_values[row] for column, column_values in columns.items()}
+            tokens.update(token_hash(token) for token in member_tokens(species, values))
+        return np.array(sorted(tokens), dtype=np.uint64)
+
+    def _result(self, teams, scores, k):
+        top = np.lexsort((teams, -scores))[:k]
+        df = self.keys.iloc[teams[top]].reset_index(drop=True)
+        df["similarity"] = scores[top]
+        return df
+
+    def candidates(self, signature):
+        """Returns the teams sharing at least one band key with a signature."""
+
+        if self._order is None:
+            self._build_buckets()
+        keys = band_keys(signature[None, :], self.bands)[0]
+        found = []
+        for band, key in enumerate(keys):
+            first = np.searchsorted(self._sorted_keys[:, band], key, side="left")
+            last = np.searchsorted(self._sorted_keys[:, band], key, side="right")
+            found.append(self._order[first:last, band])
+        return np.unique(np.concatenate(found)) if found else np.array([], dtype=np.int64)
+
+    def query(self, team, k=10, rerank=True):
+        """Finds the teams most similar to a team.
+
+        Args:
+            team: DataFrame of the members of one team, with the columns of scraper.TEAM_COLUMNS (the IDs may be left out).
+            k: Number of teams to return.
+            rerank: If True, score the candidates by their exact Jaccard similarity, otherwise by the share of signature rows
+                they agree on.
+
+        Returns:
+            A DataFrame with the tournament_id, player_id and similarity of up to k teams, most similar first. An indexed team
+            finds itself, with a similarity of 1.
+        """
+
+        query = self._query_tokens(team)
+        signature = self.hasher.signatures(np.array([0, len(query)]), query)[0]
+        teams = self.candidates(signature)
+        if rerank:
+            scores = jaccard(query, self.offsets, self.tokens, teams)
+        else:
+            scores = (self.signatures[teams] == signature).mean(axis=1)
+        return self._result(teams, scores, k)
+
+    def brute_force(self, team, k=10):
+        """Finds the teams most similar to a team by scoring every team of the index exactly. Returns the same as query."""
+
+        query = self._query_tokens(team)
+        teams = np.arange(len(self))
+        return self._result(teams, jaccard(query, self.offsets, self.tokens, teams), k)
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,284 @@
+"""Dependency-aware runner for the stages that build the datasets.
+
+make_all_csv used to call every make_*_csv function one after another, although the four game data tables don't depend on each
+other nor on the tournaments -> standings -> teams chain. Each stage now declares the files it reads and writes, and the runner
+derives the dependency graph from them: a stage starts as soon as the stages producing its inputs are done, so independent stages
+run side by side and a full refresh takes as long as its longest chain instead of the sum of every stage.
+
+A stage is skipped when nothing it depends on changed since its last successful run: the hash of its code and of every input file
+is stored in a small SQLite database after each success, and compared before the next run. The code hashed is the source of the
+stage's function and of the modules listed in its Stage.modules; edits anywhere else (e.g. a helper module not listed) don't
+invalidate it, so list every module doing the stage's real work. Stages reading a live source (rk9, PokeAPI) can't know whether it
+changed, so they run again once their last success is older than their max_age. A stage whose dependency failed is not run at all.
+
+Typical use case example:
+    runner = stages.StageRunner([
+        stages.Stage("tournaments", make_tournaments, outputs=["tournaments.csv"], max_age=0),
+        stages.Stage("standings", make_standings, inputs=["tournaments.csv"], outputs=["standings.csv"]),
+        stages.Stage("moves", make_moves, outputs=["moves.csv"], max_age=7 * 24 * 3600),
+    ])
+    runner.run()                                    <--- tournaments and moves run in parallel, standings after tournaments
+
+"""
+
+import concurrent.futures
+import hashlib
+import inspect
+import os
+import sqlite3
+import time
+from typing import NamedTuple
+
+STATE_PATH = "src/data/stages.sqlite"
+MAX_WORKERS = 4
+HASH_BLOCK_SIZE = 1024 * 1024
+
+RAN = "ran"
+SKIPPED = "skipped"
+FAILED = "failed"
+BLOCKED = "blocked"
+
+
+class Stage(NamedTuple):
+    """A unit of work of the runner.
+
+    Attributes:
+        name: Unique name of the stage.
+        run: Function called without arguments to run the stage.
+        inputs: Files the stage reads. Stages writing one of them run first.
+        outputs: Files the stage writes. The stage always runs when one of them is missing.
+        after: Names of other stages that must finish first even though no file links them.
+        max_age: Seconds after which the stage runs again even if nothing changed, 0 to always run. None never expires.
+        modules: Modules whose source is hashed along with the stage's function, e.g. the scraper a crawling stage calls.
+    """
+
+    name: str
+    run: object
+    inputs: tuple = ()
+    outputs: tuple = ()
+    after: tuple = ()
+    max_age: float = None
+    modules: tuple = ()
+
+
+class Result(NamedTuple):
+    status: str
+    seconds: float = 0.0
+    error: object = None
+
+
+def file_hash(path):
+    """SHA-256 of a file's content, or of a directory's file names and sizes. Missing paths hash as "missing"."""
+
+    if not os.path.exists(path):
+        return "missing"
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        for root, _, files in sorted(os.walk(path)):
+            for name in sorted(files):
+                file = os.path.join(root, name)
+                digest.update(f"{os.path.relpath(file, path)}:{os.path.getsize(file)}\n".encode())
+        return digest.hexdigest()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_hash(function, modules=()):
+    """SHA-256 of a function's source and of the given modules' source, so editing a stage invalidates its previous runs.
+
+    Only that code is hashed: changes to other functions or modules the stage happens to call go unnoticed.
+    """
+
+    digest = hashlib.sha256()
+    for code in [function, *modules]:
+        try:
+            source = inspect.getsource(code)
+        except (OSError, TypeError):
+            source = f"{getattr(code, '__module__', '')}.{getattr(code, '__qualname__', getattr(code, '__name__', repr(code)))}"
+        digest.update(source.encode())
+    return digest.hexdigest()
+
+
+def fingerprint(stage):
+    """Combines the code hash of a stage with the hashes of its input files."""
+
+    digest = hashlib.sha256(code_hash(stage.run, stage.modules).encode())
+    for path in sorted(stage.inputs):
+        digest.update(f"\n{path}:{file_hash(path)}".encode())
+    return digest.hexdigest()
+
+
+class StageState:
+    """Remembers the fingerprint and time of the last successful run of every stage.
+
+    Args:
+        path: Location of the SQLite database. Use ":memory:" for a state that doesn't survive the process.
+    """
+
+    def __init__(self, path=STATE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stages (
+                name TEXT PRIMARY KEY,
+                fingerprint TEXT,
+                finished_at REAL,
+                seconds REAL
+            )
+            """
+        )
+        self._db.commit()
+
+    def last_run(self, name):
+        """Returns the (fingerprint, finished_at) of the last successful run of a stage, or None."""
+        return self._db.execute("SELECT fingerprint, finished_at FROM stages WHERE name = ?", (name,)).fetchone()
+
+    def record(self, name, fingerprint, seconds):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO stages (name, fingerprint, finished_at, seconds) VALUES (?, ?, ?, ?)",
+                (name, fingerprint, time.time(), seconds),
+            )
+
+    def close(self):
+        self._db.close()
+
+
+class StageRunner:
+    """Runs stages in dependency order, independent ones in parallel, skipping those that are up to date.
+
+    Args:
+        stages: The Stage objects to run.
+        state_path: Location of the StageState database.
+        max_workers: How many stages may run at the same time.
+
+    Raises:
+        ValueError: If two stages share a name, a stage waits for an unknown stage, or the dependencies form a cycle.
+    """
+
+    def __init__(self, stages, state_path=STATE_PATH, max_workers=MAX_WORKERS):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique")
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self.dependencies = self._dependencies()
+        self.order = self._topological_order()
+        self.results = {}
+        self.wall = 0.0
+
+    def _dependencies(self):
+        producers = {}
+        for stage in self.stages.values():
+            for path in stage.outputs:
+                producers.setdefault(path, set()).add(stage.name)
+
+        dependencies = {}
+        for stage in self.stages.values():
+            unknown = set(stage.after) - set(self.stages)
+            if unknown:
+                raise ValueError(f"Stage {stage.name!r} waits for unknown stages {sorted(unknown)}")
+            needed = set(stage.after)
+            for path in stage.inputs:
+                needed |= producers.get(path, set())
+            needed.discard(stage.name)
+            dependencies[stage.name] = needed
+        return dependencies
+
+    def _topological_order(self):
+        order = []
+        remaining = dict(self.dependencies)
+        while remaining:
+            ready = sorted(name for name, needed in remaining.items() if not needed - set(order))
+            if not ready:
+                raise ValueError(f"Stage dependencies form a cycle between {sorted(remaining)}")
+            order.extend(ready)
+            for name in ready:
+                del remaining[name]
+        return order
+
+    def is_up_to_date(self, stage, state, current):
+        """True if the stage's last success had the same fingerprint, hasn't expired and left every output in place."""
+
+        last = state.last_run(stage.name)
+        if last is None or last[0] != current:
+            return False
+        if stage.max_age is not None and time.time() - last[1] >= stage.max_age:
+            return False
+        return all(os.path.exists(path) for path in stage.outputs)
+
+    def run(self, force=False):
+        """Runs every stage that isn't up to date, then prints the timing report.
+
+        Args:
+            force: If True, run every stage even if it is up to date.
+
+        Returns:
+            A dictionary of stage name to Result.
+        """
+
+        self.results = {}
+        state = StageState(self.state_path)
+        start = time.perf_counter()
+        pending = list(self.order)
+        running = {}
+
+        def execute(stage):
+            began = time.perf_counter()
+            stage.run()
+            return time.perf_counter() - began
+
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while pending or running:
+                    for name in list(pending):
+                        needed = self.dependencies[name]
+                        if not needed <= set(self.results):
+                            continue
+                        pending.remove(name)
+                        stage = self.stages[name]
+                        if any(self.results[dependency].status in (FAILED, BLOCKED) for dependency in needed):
+                            self.results[name] = Result(BLOCKED)
+                        elif not force and self.is_up_to_date(stage, state, fingerprint(stage)):
+                            self.results[name] = Result(SKIPPED)
+                        else:
+                            print(f"Stage {name} started")
+                            running[executor.submit(execute, stage)] = stage
+
+                    if not running:
+                        continue
+                    done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        stage = running.pop(future)
+                        try:
+                            seconds = future.result()
+                        except Exception as e:
+                            print(f"Stage {stage.name} failed: {e}")
+                            self.results[stage.name] = Result(FAILED, error=e)
+                            continue
+                        # Hashed after the run, so a stage rewriting its own inputs is up to date next time.
+                        state.record(stage.name, fingerprint(stage), seconds)
+                        self.results[stage.name] = Result(RAN, seconds)
+        finally:
+            state.close()
+            self.wall = time.perf_counter() - start
+
+        self.report()
+        return self.results
+
+    def report(self):
+        """Prints the status and duration of every stage, and how long the whole run took compared to running them in a row."""
+
+        for name in self.order:
+            result = self.results.get(name)
+            if result is None:
+                continue
+            error = f"  {result.error}" if result.error is not None else ""
+            print(f"{name:<14} {result.status:<8} {result.seconds:8.1f} s{error}")
+        serial = sum(result.seconds for result in self.results.values())
+        print(f"{'total':<14} {'':<8} {self.wall:8.1f} s  ({serial:.1f} s of stage time)")
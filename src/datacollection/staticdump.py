@@ -0,0 +1,96 @@
+"""Reads PokeAPI resources from a local copy of its static data dump.
+
+PokeAPI publishes every resource it serves as static JSON files (https://github.com/PokeAPI/api-data), laid out exactly like the API:
+data/api/v2/move/33/index.json holds what https://pokeapi.co/api/v2/move/33/ returns, and data/api/v2/move/index.json lists every move.
+StaticDump maps API URLs onto those files, either in an extracted api-data directory or straight from a downloaded tarball, so a full
+game-data build can run from disk in seconds, with no network and with reproducible results.
+
+Typical use case example:
+    with pokeapi.static_dump("api-data-master.tar.gz"):
+        pokeapi.fetch_move_api()             <--- every PokeAPI request is read from the tarball instead
+
+"""
+
+import json
+import os
+import tarfile
+import threading
+from urllib.parse import urlsplit
+
+API_ROOT = "api/v2"
+INDEX_FILE = "index.json"
+
+
+def resource_path(url):
+    """Turns an API URL (absolute, or relative like /api/v2/pokemon/1/) into its path below api/v2, e.g. ["pokemon", "1"]."""
+
+    path = urlsplit(url).path
+    if API_ROOT not in path:
+        raise ValueError(f"Not a PokeAPI URL: {url}")
+    return [part for part in path.split(API_ROOT, 1)[1].split("/") if part]
+
+
+class StaticDump:
+    """A PokeAPI static data dump, as an extracted directory or a tar archive.
+
+    Args:
+        path: The api-data checkout (or any directory containing api/v2 or data/api/v2), or a .tar/.tar.gz of it.
+
+    Raises:
+        FileNotFoundError: If no api/v2 tree is found at path.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._names = {}
+        self._lock = threading.Lock()
+        self._tar = None
+
+        if os.path.isdir(path):
+            for candidate in (path, os.path.join(path, "data")):
+                if os.path.isdir(os.path.join(candidate, API_ROOT)):
+                    self.base = os.path.join(candidate, API_ROOT)
+                    break
+            else:
+                raise FileNotFoundError(f"No {API_ROOT} directory in {path}")
+        else:
+            self._tar = tarfile.open(path)
+            for member in self._tar.getmembers():
+                if member.isfile() and f"{API_ROOT}/" in member.name:
+                    self._names[member.name.split(f"{API_ROOT}/", 1)[1]] = member
+            if not self._names:
+                raise FileNotFoundError(f"No {API_ROOT} files in {path}")
+
+    def _load(self, relative_path):
+        if self._tar is None:
+            with open(os.path.join(self.base, relative_path), encoding="utf-8") as file:
+                return json.load(file)
+
+        member = self._names.get(relative_path)
+        if member is None:
+            raise FileNotFoundError(f"{relative_path} is not in {self.path}")
+        # Tar archives are read through a single file handle, so only the reads are serialized; parsing happens outside the lock.
+        with self._lock:
+            data = self._tar.extractfile(member).read()
+        return json.loads(data)
+
+    def _find_by_name(self, resource, name):
+        for entry in self._load(f"{resource}/{INDEX_FILE}")["results"]:
+            if entry["name"] == name:
+                return resource_path(entry["url"])
+        raise FileNotFoundError(f"No {resource} named {name!r} in {self.path}")
+
+    def get_json(self, url):
+        """Returns the resource the API would answer for url. List endpoints return the full listing as a single last page."""
+
+        parts = resource_path(url)
+        if len(parts) == 1:
+            return {**self._load(f"{parts[0]}/{INDEX_FILE}"), "next": None, "previous": None}
+        if len(parts) == 2 and not parts[1].isdigit():
+            # The dump only has directories per ID, named resources are looked up in the listing.
+            parts = self._find_by_name(*parts)
+        return self._load("/".join(parts + [INDEX_FILE]))
+
+    def close(self):
+        if self._tar is not None:
+            self._tar.close()
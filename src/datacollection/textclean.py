@@ -0,0 +1,157 @@
+"""Single-pass text cleaning for the description columns of the game data.
+
+The cleaning functions in processor.py used to chain five or six pandas .str operations per column (split on a separator, drop
+newlines, strip, collapse whitespace, drop quotes). Every one of them walks the whole column and allocates a new Series, and the
+split turns the column into Python objects, so the regular expressions that follow run one value at a time anyway.
+A TextCleaner takes the same steps as a list of rules and compiles them into one function, so each value goes through all the
+steps at once and the column is walked a single time. Rules run in the order they are given, exactly like the chained calls did,
+and each one gives exactly the same result as the pandas call it replaces, so the output is the same.
+
+The two regular expressions that made up most of the cleaning time are done with str methods instead: collapse_whitespace with
+str.split and str.join, and space_after with str.split and str.strip. str.split, str.strip and the \\s of Python regular
+expressions all use the same definition of whitespace, so nothing changes.
+
+A cleaner made only of remove rules has nothing to fuse, and pandas already runs those as vectorized string kernels, so it keeps
+doing that.
+
+Typical use case example:
+    DESCRIPTION = textclean.TextCleaner(
+        textclean.truncate("Overworld:"),
+        textclean.remove("\\n"),
+        textclean.strip(),
+        textclean.collapse_whitespace(),
+    )
+    df["description"] = DESCRIPTION.clean(df["description"])
+
+"""
+
+import re
+from typing import NamedTuple
+
+import pandas as pd
+
+TRUNCATE = "truncate"
+REMOVE = "remove"
+STRIP = "strip"
+SUB = "sub"
+COLLAPSE_WHITESPACE = "collapse_whitespace"
+SPACE_AFTER = "space_after"
+
+
+class Rule(NamedTuple):
+    kind: str
+    argument: object = None
+
+
+def truncate(separator):
+    """Keeps the text before the first occurrence of separator, like .str.split(separator, n=1).str[0]."""
+    return Rule(TRUNCATE, separator)
+
+
+def remove(substring):
+    """Deletes every occurrence of substring, like .str.replace(substring, "", regex=False)."""
+    return Rule(REMOVE, substring)
+
+
+def strip():
+    """Strips leading and trailing whitespace, like .str.strip()."""
+    return Rule(STRIP)
+
+
+def sub(pattern, replacement):
+    """Replaces every match of a regular expression, like .str.replace(pattern, replacement, regex=True)."""
+    return Rule(SUB, (re.compile(pattern), replacement))
+
+
+def collapse_whitespace():
+    """Turns every run of whitespace into a single space, like .str.replace(r"\\s+", " ", regex=True)."""
+    return Rule(COLLAPSE_WHITESPACE)
+
+
+def space_after(mark):
+    """Removes the whitespace around every occurrence of mark and puts a single space after it.
+
+    For ":" this is .str.replace(r"\\s*:\\s*", ": ", regex=True).
+    """
+    return Rule(SPACE_AFTER, mark)
+
+
+def as_text(value):
+    """Missing values become empty strings and anything else its str(), like .fillna("").astype(str)."""
+
+    if isinstance(value, str):
+        return value
+    if pd.isna(value):
+        return ""
+    return str(value)
+
+
+def _collapse_whitespace(text):
+    words = text.split()
+    if not words:
+        return " " if text else ""
+    collapsed = " ".join(words)
+    if text[0].isspace():
+        collapsed = " " + collapsed
+    if text[-1].isspace():
+        collapsed += " "
+    return collapsed
+
+
+def _space_after(text, mark):
+    if mark not in text:
+        return text
+    parts = text.split(mark)
+    last = len(parts) - 1
+    return (mark + " ").join(
+        part.rstrip() if i == 0 else part.lstrip() if i == last else part.strip() for i, part in enumerate(parts)
+    )
+
+
+def compile_rule(rule):
+    """Returns the function applying a single rule to a string."""
+
+    kind, argument = rule
+    if kind == TRUNCATE:
+        return lambda text: text.partition(argument)[0]
+    if kind == REMOVE:
+        return lambda text: text.replace(argument, "")
+    if kind == STRIP:
+        return str.strip
+    if kind == SUB:
+        regex, replacement = argument
+        return lambda text: regex.sub(replacement, text)
+    if kind == COLLAPSE_WHITESPACE:
+        return _collapse_whitespace
+    if kind == SPACE_AFTER:
+        return lambda text: _space_after(text, argument)
+    raise ValueError(f"Unknown cleaning rule {kind!r}")
+
+
+class TextCleaner:
+    """A list of cleaning rules compiled into one function applied to each value of a column.
+
+    Args:
+        *rules: Rules made with truncate, remove, strip, sub, collapse_whitespace and space_after, in the order they should run.
+    """
+
+    def __init__(self, *rules):
+        self.rules = rules
+        self._steps = [compile_rule(rule) for rule in rules]
+        self.vectorized = all(rule.kind == REMOVE for rule in rules)
+
+    def __call__(self, value):
+        text = as_text(value)
+        for step in self._steps:
+            text = step(text)
+        return text
+
+    def clean(self, series):
+        """Cleans a whole column. Returns a new Series with the same index and name."""
+
+        if self.vectorized:
+            series = series.fillna("").astype(str)
+            for rule in self.rules:
+                series = series.str.replace(rule.argument, "", regex=False)
+            return series
+        return pd.Series([self(value) for value in series.tolist()], index=series.index, name=series.name)
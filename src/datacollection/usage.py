@@ -0,0 +1,367 @@
+"""Incremental usage statistics over the teams and standings.
+
+Meta questions (usage of each species, their most common items, moves, tera types and abilities, the most common cores, how well a
+species places) used to mean a fresh groupby over the whole teams table joined to the standings. The counts behind every one of those
+answers are now computed once per tournament and division, stored, and summed when a question is asked:
+
+    teams               number of teams
+    species             members of each species
+    species_item        (species, held item) pairs, and likewise species_move, species_tera and species_ability
+    pairs               (species, species) pairs on the same team, the cores
+    species_ranked      members of each species whose player has a standing, and species_standing the sum of those standings
+    top_cut_species     (cut, species) pairs for the members whose player placed within each cut of TOP_CUTS
+    top_cut_teams       teams that placed within each cut
+
+Each count table is a pair of NumPy arrays: sorted int64 keys (a code, or two codes packed into one integer) and their counts.
+Codes come from the compact.Vocabularies, so species, moves, abilities and items are counted by their game data IDs. Adding a
+tournament only computes its own counts, and a rollup over any set of tournaments and divisions concatenates the stored arrays and
+sums them by key, without touching a single team row.
+
+Typical use case example:
+    store = usage.UsageStore("src/data/usage.sqlite")
+    store.update(new_teams, new_standings)                     <--- only these tournaments are counted
+    stats = store.rollup(divisions=["Masters"])
+    stats.species(10)                                         <--- the 10 most used species and their usage
+    stats.partners("species_item", "Incineroar", 5)           <--- its 5 most common items
+
+"""
+
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from . import compact
+
+USAGE_PATH = "src/data/usage.sqlite"
+TOP_CUTS = (8, 16, 32, 64)
+UNKNOWN_DIVISION = "Unknown"
+
+MOVE_COLUMNS = ["move1", "move2", "move3", "move4"]
+USAGE_VOCABULARIES = {
+    "pokemon": "pokemon",
+    "held_item": "items",
+    "tera_type": "types",
+    "ability": "abilities",
+    **{column: "moves" for column in MOVE_COLUMNS},
+}
+PARTNER_TENSORS = {
+    "species_item": "items",
+    "species_move": "moves",
+    "species_tera": "types",
+    "species_ability": "abilities",
+}
+
+PAIR_SHIFT = 32
+LOW_BITS = (1 << PAIR_SHIFT) - 1
+
+
+def pack(first, second):
+    """Packs two arrays of non-negative codes into one int64 key per pair."""
+    return (np.asarray(first, dtype=np.int64) << PAIR_SHIFT) | np.asarray(second, dtype=np.int64)
+
+
+def unpack(keys):
+    keys = np.asarray(keys, dtype=np.int64)
+    return keys >> PAIR_SHIFT, keys & LOW_BITS
+
+
+def count(keys, weights=None):
+    """Counts (or sums the weights of) each distinct key. Returns sorted (keys, counts) int64 arrays."""
+
+    keys = np.asarray(keys, dtype=np.int64)
+    if weights is None:
+        unique, counts = np.unique(keys, return_counts=True)
+        return unique, counts.astype(np.int64)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.rint(np.bincount(inverse, weights=weights, minlength=len(unique))).astype(np.int64)
+
+
+def merge(tables):
+    """Sums a list of (keys, counts) tables into one."""
+
+    tables = list(tables)
+    if not tables:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    keys = np.concatenate([keys for keys, _ in tables])
+    counts = np.concatenate([counts for _, counts in tables])
+    return count(keys, counts)
+
+
+def team_pairs(team, species):
+    """Packs every pair of species found on the same team, the lower code first."""
+
+    if len(team) == 0:
+        return np.array([], dtype=np.int64)
+    order = np.lexsort((species, team))
+    team, species = team[order], species[order]
+
+    positions = np.arange(len(team))
+    starts = np.r_[True, team[1:] != team[:-1]]
+    group = np.cumsum(starts) - 1
+    slot = positions - np.maximum.accumulate(np.where(starts, positions, 0))
+
+    members = np.full((group[-1] + 1, slot.max() + 1), compact.MISSING, dtype=np.int64)
+    members[group, slot] = species
+    first, second = np.triu_indices(members.shape[1], k=1)
+    a, b = members[:, first].ravel(), members[:, second].ravel()
+    valid = (a != compact.MISSING) & (b != compact.MISSING)
+    return pack(a[valid], b[valid])
+
+
+def tensors(codes, team, standing):
+    """Computes every count table for the members of one tournament division.
+
+    Args:
+        codes: Dictionary of team column to int64 array of codes.
+        team: Array giving the team of each member.
+        standing: Float array of the standing of each member's player, NaN if unknown.
+    """
+
+    species = codes["pokemon"]
+    has_species = species != compact.MISSING
+    result = {"teams": count(np.zeros(len(np.unique(team)), dtype=np.int64))}
+    result["species"] = count(species[has_species])
+
+    for name, column in [("species_item", "held_item"), ("species_tera", "tera_type"), ("species_ability", "ability")]:
+        other = codes[column]
+        valid = has_species & (other != compact.MISSING)
+        result[name] = count(pack(species[valid], other[valid]))
+
+    moves = np.concatenate([codes[column] for column in MOVE_COLUMNS])
+    owners = np.tile(species, len(MOVE_COLUMNS))
+    valid = (owners != compact.MISSING) & (moves != compact.MISSING)
+    result["species_move"] = count(pack(owners[valid], moves[valid]))
+
+    result["pairs"] = count(team_pairs(team[has_species], species[has_species]))
+
+    ranked = has_species & ~np.isnan(standing)
+    result["species_ranked"] = count(species[ranked])
+    result["species_standing"] = count(species[ranked], standing[ranked])
+
+    cut_species = []
+    cut_teams = []
+    for cut in TOP_CUTS:
+        within = ranked & (standing <= cut)
+        cut_species.append(pack(np.full(within.sum(), cut), species[within]))
+        cut_teams.append(np.full(len(np.unique(team[~np.isnan(standing) & (standing <= cut)])), cut))
+    result["top_cut_species"] = count(np.concatenate(cut_species))
+    result["top_cut_teams"] = count(np.concatenate(cut_teams))
+    return result
+
+
+def aggregate(teams, standings, vocabularies):
+    """Computes the count tables of every tournament division found in teams.
+
+    Args:
+        teams: DataFrame of team members, with the columns of scraper.TEAM_COLUMNS.
+        standings: DataFrame with at least the tournament_id, player_id, division and standing of the players.
+        vocabularies: The compact.Vocabularies to code the team columns with.
+
+    Returns:
+        A dictionary of (tournament_id, division) to a dictionary of table name to (keys, counts).
+    """
+
+    players = standings[["tournament_id", "player_id", "division", "standing"]].drop_duplicates(["tournament_id", "player_id"])
+    df = teams.merge(players, on=["tournament_id", "player_id"], how="left")
+    df["division"] = df["division"].fillna(UNKNOWN_DIVISION)
+
+    codes = {column: vocabularies[name].encode(df[column]).astype(np.int64) for column, name in USAGE_VOCABULARIES.items()}
+    team = df.groupby(["tournament_id", "player_id"], sort=False).ngroup().to_numpy()
+    standing = pd.to_numeric(df["standing"], errors="coerce").to_numpy(dtype=float)
+
+    results = {}
+    for key, rows in df.groupby(["tournament_id", "division"], sort=False).indices.items():
+        results[key] = tensors({column: values[rows] for column, values in codes.items()}, team[rows], standing[rows])
+    return results
+
+
+class Usage:
+    """Usage statistics summed over a set of tournament divisions.
+
+    Args:
+        tables: Dictionary of table name to (keys, counts).
+        vocabularies: The compact.Vocabularies the codes refer to.
+    """
+
+    def __init__(self, tables, vocabularies):
+        self.tables = tables
+        self.vocabularies = vocabularies
+
+    @property
+    def teams(self):
+        _, counts = self.tables["teams"]
+        return int(counts.sum())
+
+    def name(self, vocabulary, codes):
+        return self.vocabularies[vocabulary].decode(codes)
+
+    def species(self, n=None):
+        """The most used species: their member count and the share of teams using them."""
+
+        keys, counts = self.tables["species"]
+        df = pd.DataFrame({"pokemon": self.name("pokemon", keys), "count": counts})
+        df["usage"] = df["count"] / max(self.teams, 1)
+        return df.sort_values("count", ascending=False, kind="stable").head(n).reset_index(drop=True)
+
+    def partners(self, table, species, n=None):
+        """The most common items, moves, tera types or abilities of a species, and the share of its members using them.
+
+        Args:
+            table: One of species_item, species_move, species_tera or species_ability.
+            species: The species name, as it appears in the teams.
+            n: Optional number of rows to return.
+        """
+
+        code = self.vocabularies["pokemon"].codes.get(species)
+        keys, counts = self.tables[table]
+        owners, others = unpack(keys)
+        mine = owners == code
+        species_keys, species_counts = self.tables["species"]
+        total = species_counts[species_keys == code].sum()
+
+        df = pd.DataFrame({PARTNER_TENSORS[table]: self.name(PARTNER_TENSORS[table], others[mine]), "count": counts[mine]})
+        df["share"] = df["count"] / max(total, 1)
+        return df.sort_values("count", ascending=False, kind="stable").head(n).reset_index(drop=True)
+
+    def cores(self, n=None):
+        """The most common pairs of species on the same team."""
+
+        keys, counts = self.tables["pairs"]
+        first, second = unpack(keys)
+        df = pd.DataFrame({"pokemon1": self.name("pokemon", first), "pokemon2": self.name("pokemon", second), "count": counts})
+        df["usage"] = df["count"] / max(self.teams, 1)
+        return df.sort_values("count", ascending=False, kind="stable").head(n).reset_index(drop=True)
+
+    def performance(self):
+        """Average standing of each species, and the share of its members that made each top cut."""
+
+        keys, counts = self.tables["species"]
+        df = pd.DataFrame({"pokemon": self.name("pokemon", keys), "count": counts})
+
+        ranked = pd.Series(dict(zip(*self.tables["species_ranked"])), dtype="float64")
+        standing = pd.Series(dict(zip(*self.tables["species_standing"])), dtype="float64")
+        df["average_standing"] = (standing / ranked).reindex(keys).to_numpy()
+
+        cut_keys, cut_counts = self.tables["top_cut_species"]
+        cuts, species = unpack(cut_keys)
+        for cut in TOP_CUTS:
+            within = pd.Series(cut_counts[cuts == cut], index=species[cuts == cut], dtype="float64")
+            df[f"top{cut}"] = (within.reindex(keys).fillna(0) / ranked.reindex(keys)).to_numpy()
+        return df.sort_values("count", ascending=False, kind="stable").reset_index(drop=True)
+
+
+class UsageStore:
+    """Count tables of every tournament division, and the vocabulary codes they use, stored in an SQLite database.
+
+    Args:
+        path: Location of the SQLite database. Use ":memory:" for a store that doesn't survive the process.
+        vocabularies: Optional compact.Vocabularies, e.g. keyed to the game data. Codes stored by earlier runs take precedence.
+    """
+
+    def __init__(self, path=USAGE_PATH, vocabularies=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS counts (
+                tournament_id TEXT,
+                division TEXT,
+                tensor TEXT,
+                keys BLOB,
+                counts BLOB,
+                PRIMARY KEY (tournament_id, division, tensor)
+            );
+            CREATE TABLE IF NOT EXISTS vocabulary (
+                name TEXT,
+                code INTEGER,
+                value TEXT,
+                PRIMARY KEY (name, code)
+            );
+            CREATE TABLE IF NOT EXISTS digests (
+                tournament_id TEXT PRIMARY KEY,
+                digest TEXT
+            );
+            """
+        )
+        self._db.commit()
+
+        self.vocabularies = vocabularies or compact.Vocabularies()
+        for name, code, value in self._db.execute("SELECT name, code, value FROM vocabulary"):
+            self.vocabularies[name].assign(value, code)
+
+    def tournaments(self):
+        """Returns the IDs of the tournaments that have been counted."""
+        return {row[0] for row in self._db.execute("SELECT DISTINCT tournament_id FROM counts")}
+
+    def digests(self):
+        """Returns the digest each tournament was last counted with, for the tournaments whose update was given one."""
+        return dict(self._db.execute("SELECT tournament_id, digest FROM digests"))
+
+    def update(self, teams, standings, digests=None):
+        """Counts the tournaments in teams, replacing their previous counts. Other tournaments are left untouched.
+
+        Args:
+            teams: The team members of the tournaments to count.
+            standings: Standings rows of those tournaments, with their division and standing.
+            digests: Optional dictionary of tournament ID to a digest of its rows (see keyindex.group_digests), stored along with
+                the counts so a later update can tell which tournaments changed since.
+
+        Returns:
+            The number of tournament divisions counted.
+        """
+
+        results = aggregate(teams, standings, self.vocabularies)
+        tournament_ids = sorted({tournament_id for tournament_id, _ in results})
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO digests (tournament_id, digest) VALUES (?, ?)", (digests or {}).items())
+            self._db.executemany("DELETE FROM counts WHERE tournament_id = ?", [(tournament_id,) for tournament_id in tournament_ids])
+            self._db.executemany(
+                "INSERT INTO counts (tournament_id, division, tensor, keys, counts) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (tournament_id, division, name, keys.tobytes(), counts.tobytes())
+                    for (tournament_id, division), tables in results.items()
+                    for name, (keys, counts) in tables.items()
+                ],
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO vocabulary (name, code, value) VALUES (?, ?, ?)",
+                [
+                    (name, code, value)
+                    for name in set(USAGE_VOCABULARIES.values())
+                    for value, code in self.vocabularies[name].codes.items()
+                ],
+            )
+        return len(results)
+
+    def rollup(self, tournament_ids=None, divisions=None):
+        """Sums the stored counts of a set of tournaments and divisions.
+
+        Args:
+            tournament_ids: Optional collection of tournament IDs. Defaults to every counted tournament.
+            divisions: Optional collection of divisions, e.g. ["Masters"]. Defaults to every division.
+
+        Returns:
+            A Usage.
+        """
+
+        tournament_ids = None if tournament_ids is None else set(tournament_ids)
+        divisions = None if divisions is None else set(divisions)
+        tables = {}
+        for tournament_id, division, name, keys, counts in self._db.execute(
+            "SELECT tournament_id, division, tensor, keys, counts FROM counts"
+        ):
+            if tournament_ids is not None and tournament_id not in tournament_ids:
+                continue
+            if divisions is not None and division not in divisions:
+                continue
+            tables.setdefault(name, []).append((np.frombuffer(keys, dtype=np.int64), np.frombuffer(counts, dtype=np.int64)))
+
+        names = ["teams", "species", "pairs", "species_ranked", "species_standing", "top_cut_species", "top_cut_teams", *PARTNER_TENSORS]
+        return Usage({name: merge(tables.get(name, [])) for name in names}, self.vocabularies)
+
+    def close(self):
+        self._db.close()
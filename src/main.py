@@ -17,15 +17,22 @@ def get_data():
     Use fetch_game_data() to fetch pokemon, moves, abilities, and held items data.
     Use fetch_official_data() to fetch tournament, standings, and team data.
     Use make_all_csv() to fetch all data and create CSV files.    
+    Use refresh_official_data() to only crawl tournaments that are new since the last run.
+    Use sync_images() to download every sprite and item icon locally and point the CSVs at the local copies.
     
     """
     #processor.fetch_game_data()
     #processor.fetch_official_data()
     #processor.make_all_csv()
+    #processor.refresh_official_data()
+    #processor.sync_images()
 
 def upload_game_data():
     uploader.upload_game_data()
 
+def upload_game_delta():
+    uploader.upload_game_delta()
+
 def main():
     uploader.upload_pokemon("src/data/pokemon.csv")
 
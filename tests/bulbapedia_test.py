@@ -0,0 +1,113 @@
+"""This module is for testing the batched Bulbapedia fallback in bulbapedia.py."""
+
+import pytest
+from src.datacollection import bulbapedia, pokeapi
+
+LEFTOVERS = """{{ItemInfobox|name=Leftovers}}
+'''Leftovers''' is a type of [[held item]].
+
+==Effect==
+===Battle===
+{{main|Held item}}
+At the end of every turn, the holder restores 1/16 of its maximum {{stat|HP}}.<ref>Bulbanews</ref>
+This continues while it is held.
+
+==Description==
+Some description.
+"""
+
+STANCE_CHANGE = """==Effect==
+The form of [[Aegislash (Pokémon)|Aegislash]] changes before it uses {{m|King's Shield}}.
+"""
+
+
+class FakeWiki:
+    """Answers MediaWiki query requests from a dictionary of title -> (revision, wikitext)."""
+
+    def __init__(self, articles, aliases=None):
+        self.articles = articles
+        self.aliases = aliases or {}
+        self.requests = []
+
+    def get_json(self, url, params):
+        titles = params["titles"].split("|")
+        self.requests.append((params["prop"], titles))
+        redirects = [{"from": title, "to": self.aliases[title]} for title in titles if title in self.aliases]
+        pages = []
+        for title in titles:
+            title = self.aliases.get(title, title)
+            if title not in self.articles:
+                pages.append({"title": title, "missing": True})
+                continue
+            revision, wikitext = self.articles[title]
+            if params["prop"] == "info":
+                pages.append({"title": title, "lastrevid": revision})
+            else:
+                pages.append({"title": title, "revisions": [{"revid": revision, "slots": {"main": {"content": wikitext}}}]})
+        return {"query": {"redirects": redirects, "pages": pages}}
+
+
+@pytest.fixture
+def wiki(monkeypatch):
+    wiki = FakeWiki(
+        {"Leftovers": (10, LEFTOVERS), "Stance Change (Ability)": (20, STANCE_CHANGE), "Tackle (move)": (30, "No effect here")},
+        aliases={"Stance change (Ability)": "Stance Change (Ability)"},
+    )
+    monkeypatch.setattr(bulbapedia.httpclient, "get_json", wiki.get_json)
+    return wiki
+
+
+def test_effect_section_reads_the_first_paragraph():
+    assert bulbapedia.effect_section(LEFTOVERS) == (
+        "At the end of every turn, the holder restores 1/16 of its maximum HP. This continues while it is held."
+    )
+    assert bulbapedia.effect_section(STANCE_CHANGE) == "The form of Aegislash changes before it uses King's Shield."
+    assert bulbapedia.effect_section("==Description==\nNothing") is None
+
+
+def test_effects_are_batched_and_cached_by_revision(wiki, tmp_path):
+    fallback = bulbapedia.EffectFallback(str(tmp_path / "bulbapedia.sqlite"), batch_size=2)
+    titles = ["Leftovers", "Stance change (Ability)", "Tackle (move)", "Missing Item", "Leftovers"]
+
+    first = fallback.effects(titles)
+    first_requests = list(wiki.requests)
+    wiki.requests.clear()
+    second = fallback.effects(titles)
+
+    assert first == second
+    assert first["Leftovers"].startswith("At the end of every turn")
+    assert first["Stance change (Ability)"].startswith("The form of Aegislash")
+    assert first["Tackle (move)"] is None and first["Missing Item"] is None
+    assert [prop for prop, _ in first_requests] == ["info", "info", "revisions", "revisions"]
+    assert [prop for prop, _ in wiki.requests] == ["info", "info"]
+
+    wiki.articles["Leftovers"] = (11, "==Effect==\nUpdated.")
+    wiki.requests.clear()
+    assert fallback.effects(["Leftovers"]) == {"Leftovers": "Updated."}
+    assert wiki.requests == [("info", ["Leftovers"]), ("revisions", ["Leftovers"])]
+
+
+def test_missing_item_effects_are_filled_in_one_lookup(wiki, monkeypatch):
+    items = {
+        191: {"name": "leftovers", "category": {"name": "held-items"}, "attributes": [], "effect_entries": []},
+        999: {"name": "mystery-item", "category": {"name": "held-items"}, "attributes": [], "effect_entries": []},
+    }
+
+    def get_json(url, params=None):
+        if params is not None:
+            return wiki.get_json(url, params)
+        return items[pokeapi.resource_id(url)]
+
+    monkeypatch.setattr(pokeapi.httpclient, "get_json", get_json)
+    previous = bulbapedia.set_fallback(bulbapedia.EffectFallback(":memory:"))
+    errors = {}
+
+    try:
+        data = pokeapi.fetch_held_item_api([191, 999], errors=errors)
+    finally:
+        bulbapedia.set_fallback(previous)
+
+    assert data[1][2].startswith("At the end of every turn")
+    assert [row[1] for row in data[1:]] == ["leftovers"]
+    assert list(errors) == [999]
+    assert [prop for prop, _ in wiki.requests] == ["info", "revisions"]
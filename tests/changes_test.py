@@ -0,0 +1,76 @@
+"""This module is for testing the game data change detection in changes.py."""
+
+import pandas as pd
+from src.datacollection import changes
+
+
+def build(rows):
+    return pd.DataFrame(rows, columns=["move_id", "move_name", "power", "short_effect"])
+
+
+def test_refresh_writes_only_the_changed_records(tmp_path):
+    store = changes.FingerprintStore(str(tmp_path / "fingerprints.sqlite"))
+    filepath = str(tmp_path / "moves.csv")
+
+    first = changes.record_changes(
+        build([[1, "Pound", 40, "Inflicts damage"], [2, "Karate Chop", 50, None], [3, "Double Slap", 15, "Hits 2-5 times"]]),
+        "move_id",
+        "moves",
+        filepath,
+        store,
+    )
+    store.commit("moves")
+    unchanged = changes.record_changes(
+        build([[1, "Pound", 40, "Inflicts damage"], [2, "Karate Chop", 50, None], [3, "Double Slap", 15, "Hits 2-5 times"]]),
+        "move_id",
+        "moves",
+        filepath,
+        store,
+    )
+    store.commit("moves")
+    second = changes.record_changes(
+        build([[1, "Pound", 40, "Inflicts damage"], [2, "Karate Chop", 50, "High critical hit ratio"], [4, "Comet Punch", 18, None]]),
+        "move_id",
+        "moves",
+        filepath,
+        store,
+    )
+
+    assert first == changes.Delta(["1", "2", "3"], [], [])
+    assert len(unchanged) == 0
+    assert second == changes.Delta(inserted=["4"], updated=["2"], deleted=["3"])
+
+    upserts, deleted = changes.read_delta(filepath, "move_id")
+    assert list(upserts["move_id"]) == [2, 4]
+    assert upserts["short_effect"][0] == "High critical hit ratio"
+    assert "change" not in upserts.columns
+    assert deleted == [3]
+
+
+def test_deltas_accumulate_until_they_are_uploaded(tmp_path):
+    store = changes.FingerprintStore(":memory:")
+    filepath = str(tmp_path / "moves.csv")
+    changes.record_changes(build([[1, "Pound", 40, None], [2, "Karate Chop", 50, None]]), "move_id", "moves", filepath, store)
+    store.commit("moves")
+
+    # Two refreshes without an upload in between: the second delta still holds the change of the first one.
+    changes.record_changes(build([[1, "Pound", 45, None], [2, "Karate Chop", 50, None]]), "move_id", "moves", filepath, store)
+    delta = changes.record_changes(build([[1, "Pound", 45, None], [3, "Comet Punch", 18, None]]), "move_id", "moves", filepath, store)
+
+    assert delta == changes.Delta(inserted=["3"], updated=["1"], deleted=["2"])
+    upserts, deleted = changes.read_delta(filepath, "move_id")
+    assert list(upserts["move_id"]) == [1, 3] and deleted == [2]
+
+    assert store.commit("moves") and not store.commit("moves")
+    assert len(store.diff("moves", changes.fingerprints(build([[1, "Pound", 45, None], [3, "Comet Punch", 18, None]]), "move_id"))) == 0
+
+
+def test_fingerprints_are_kept_per_dataset(tmp_path):
+    store = changes.FingerprintStore(":memory:")
+    df = build([[1, "Pound", 40, None]])
+
+    changes.record_changes(df, "move_id", "moves", str(tmp_path / "moves.csv"), store)
+    delta = changes.record_changes(df.rename(columns={"move_id": "item_id"}), "item_id", "items", str(tmp_path / "items.csv"), store)
+
+    assert delta.inserted == ["1"]
+    assert changes.read_delta(str(tmp_path / "pokemon.csv"), "pokemon_id") == (None, None)
@@ -0,0 +1,83 @@
+"""This module is for testing the compact team encoding in compact.py."""
+
+import numpy as np
+import pandas as pd
+from src.datacollection import compact
+
+TOURNAMENT = "ef37920b3b369e1a760695ee54214f7f"
+PLAYER = "837fa77093dc73a1b4d9eed3386f5f0f"
+
+
+def teams():
+    return pd.DataFrame(
+        [
+            [TOURNAMENT, PLAYER, "https://sprites/727_000.png", "Incineroar", None, "Ghost", "Intimidate", "Assault Vest", "Fake Out", "U-turn", "Flare Blitz", "Knock Off"],
+            [TOURNAMENT, PLAYER, "https://sprites/035_000.png", "Clefairy", None, "Grass", "Friend Guard", "Eviolite", "Follow Me", "Protect", "Helping Hand", "After You"],
+            [TOURNAMENT, "0" * 32, "https://sprites/727_000.png", "Incineroar", "N/A", None, "Intimidate", "Safety Goggles", "Fake Out", "Parting Shot", "U-Turn", "Protect"],
+        ],
+        columns=["tournament_id", "player_id", "icon", "pokemon", "form", "tera_type", "ability", "held_item", "move1", "move2", "move3", "move4"],
+    )
+
+
+def test_teams_decode_losslessly_with_codes_keyed_to_game_ids():
+    moves = pd.DataFrame({"move_id": [182, 252, 369], "move_name": ["Protect", "Fake Out", "U Turn"]})
+    vocabularies = compact.Vocabularies.from_game_data(moves=moves)
+    df = teams()
+
+    table = compact.encode_teams(df, vocabularies)
+
+    pd.testing.assert_frame_equal(table.decode(), df)
+    assert table.ids["tournament_id"].dtype == np.dtype("S16")
+    assert list(table.codes["move1"]) == [252, vocabularies["moves"].codes["Follow Me"], 252]
+    assert list(table.codes["move4"])[2] == 182 and list(table.codes["move2"])[0] == 369
+    # A second spelling of the same move keeps its own code, so decoding gives back "U-Turn".
+    assert list(table.codes["move3"])[2] not in (369, compact.MISSING)
+    assert list(table.codes["tera_type"])[2] == compact.MISSING
+
+
+def test_chunks_share_vocabularies_and_concatenate():
+    df = teams()
+    vocabularies = compact.Vocabularies()
+    odd = df.copy()
+    odd.loc[2, "player_id"] = "not an md5"
+
+    table = compact.concat([compact.encode_teams(df.iloc[:2], vocabularies), compact.encode_teams(odd.iloc[2:], vocabularies)])
+
+    pd.testing.assert_frame_equal(table.decode(), pd.concat([df.iloc[:2], odd.iloc[2:]], ignore_index=True))
+    assert "player_id" in table.plain.columns and "tournament_id" in table.ids
+    assert len(table) == 3 and table.memory_usage() < df.memory_usage(deep=True).sum()
+
+
+def test_frames_read_from_csv_decode_to_the_same_dtypes(tmp_path):
+    df = teams()
+    df["tera_type"] = None
+    df.to_csv(tmp_path / "teams.csv", index=False)
+    df = pd.read_csv(tmp_path / "teams.csv")
+
+    table = compact.encode_teams(df)
+
+    assert df["tera_type"].dtype == np.float64 and "tera_type" in table.codes
+    pd.testing.assert_frame_equal(table.decode(), df)
+    pd.testing.assert_frame_equal(compact.concat([table, compact.encode_teams(df, table.vocabularies)]).decode(), pd.concat([df, df], ignore_index=True))
+
+
+def test_missing_values_decode_to_the_marker_they_were_stored_with():
+    crawled = pd.DataFrame(teams().values.tolist(), columns=teams().columns, dtype=object)
+    crawled.loc[:1, "form"] = None
+    crawled.loc[2, "move4"] = np.nan
+    crawled.loc[0, "ability"], crawled.loc[1, "ability"] = None, np.nan
+    vocabularies = compact.Vocabularies()
+
+    table = compact.encode_teams(crawled, vocabularies)
+
+    pd.testing.assert_frame_equal(table.decode(), crawled)
+    assert table.decode()["form"].tolist()[:2] == [None, None] and table.missing["form"] is None
+    assert "ability" in table.plain.columns and "form" in table.codes and "move4" in table.codes
+
+    # Chunks marking the same column differently can't share its codes.
+    chunks = [compact.encode_teams(crawled.iloc[:2], vocabularies), compact.encode_teams(crawled.iloc[2:], vocabularies)]
+    chunks[1].missing["form"] = np.nan
+    chunks[1].codes["form"][:] = compact.MISSING
+    mixed = compact.concat(chunks)
+    assert "form" in mixed.plain.columns and mixed.decode()["form"].tolist()[:2] == [None, None]
+    assert np.isnan(mixed.decode()["form"].iloc[2])
@@ -0,0 +1,123 @@
+"""This module is for testing the dataset storage backends in datasets.py."""
+
+import pandas as pd
+import pytest
+from src.datacollection import datasets
+
+
+@pytest.fixture
+def tournaments():
+    return pd.DataFrame(
+        {
+            "tournament_id": ["a", "b"],
+            "tournament_name": ["Worlds", "NAIC"],
+            "start_date": pd.to_datetime(["2024-08-16", "2024-06-07"]),
+            "end_date": pd.to_datetime(["2024-08-18", "2024-06-09"]),
+            "standing": [1, 2],
+        }
+    )
+
+
+def test_csv_round_trip_restores_dates(tmp_path, tournaments):
+    path = str(tmp_path / "tournaments.csv")
+
+    datasets.write(tournaments, path)
+    df = datasets.read(path)
+
+    assert pd.api.types.is_datetime64_any_dtype(df["start_date"])
+    assert list(datasets.read(path, columns=["tournament_id", "end_date"]).columns) == ["tournament_id", "end_date"]
+
+
+@pytest.mark.parametrize("extension", [".parquet", ".arrow"])
+def test_arrow_formats_keep_dtypes_and_project_columns(tmp_path, tournaments, extension):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"tournaments{extension}")
+
+    datasets.write(tournaments, path)
+    datasets.append(tournaments.iloc[:1], path)
+
+    df = datasets.read(path)
+    assert len(df) == 3
+    assert df["start_date"].dtype == tournaments["start_date"].dtype
+    assert df["standing"].dtype == tournaments["standing"].dtype
+    assert list(datasets.read(path, columns=["tournament_name"]).columns) == ["tournament_name"]
+
+    csv_path = datasets.export_csv(path)
+    assert csv_path == str(tmp_path / "tournaments.csv")
+    assert list(datasets.read(csv_path)["tournament_id"]) == ["a", "b", "a"]
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet", ".arrow"])
+def test_chunks_transform_a_dataset_in_place(tmp_path, extension):
+    if extension != ".csv":
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"teams{extension}")
+    datasets.write(pd.DataFrame({"player_id": range(25), "pokemon": ["Incineroar"] * 25}), path)
+
+    assert [len(chunk) for chunk in datasets.iter_chunks(path, chunksize=10)] == [10, 10, 5]
+    chunks = datasets.iter_chunks(path, chunksize=10)
+    assert datasets.write_chunks((chunk.assign(tera_type="Grass") for chunk in chunks), path) == 25
+    assert datasets.append_chunks(iter([pd.DataFrame({"player_id": [99], "pokemon": ["Amoonguss"], "tera_type": ["Water"]})]), path) == 1
+
+    df = datasets.read(path)
+    assert len(df) == 26 and list(df["tera_type"].unique()) == ["Grass", "Water"]
+    assert not (tmp_path / f"teams.partial{extension}").exists()
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet", ".arrow"])
+def test_chunks_starting_with_an_all_missing_column_are_written(tmp_path, extension):
+    if extension != ".csv":
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"teams{extension}")
+    # 2022 teams have no tera type, later seasons do.
+    chunks = [
+        pd.DataFrame({"pokemon": ["Incineroar"], "tera_type": [None]}),
+        pd.DataFrame({"pokemon": ["Amoonguss"], "tera_type": ["Water"]}),
+    ]
+
+    assert datasets.write_chunks(iter(chunks), path) == 2
+    assert datasets.read(path)["tera_type"].tolist()[1] == "Water"
+
+    assert datasets.write_chunks(iter([]), path) == 0
+    df = datasets.read(path)
+    assert df.empty and list(df.columns) == ["pokemon", "tera_type"]
+
+
+def test_chunk_size_follows_the_memory_budget(tmp_path):
+    path = str(tmp_path / "standings.csv")
+    datasets.write(pd.DataFrame({"player_id": [f"{i:032x}" for i in range(5000)]}), path)
+
+    small = datasets.chunk_rows(path, memory_budget=64 * 1024)
+    large = datasets.chunk_rows(path, memory_budget=1024 * 1024)
+
+    assert 0 < small < large
+    assert max(len(chunk) for chunk in datasets.iter_chunks(path, memory_budget=64 * 1024)) == small
+
+
+def test_unknown_format_is_rejected(tmp_path, tournaments):
+    with pytest.raises(ValueError):
+        datasets.write(tournaments, str(tmp_path / "tournaments.xlsx"))
+
+
+@pytest.mark.parametrize("extension", [".parquet", ".arrow"])
+def test_appends_add_part_files_without_rewriting_the_stored_ones(tmp_path, tournaments, extension):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"tournaments{extension}")
+    # A single file, as written before datasets were directories, becomes the first part.
+    tournaments.to_parquet(path, index=False) if extension == ".parquet" else tournaments.to_feather(path)
+
+    datasets.append(tournaments.iloc[:1], path)
+    first = (tmp_path / f"tournaments{extension}" / f"part-00000{extension}").stat()
+    datasets.append_chunks(iter([tournaments.iloc[1:], tournaments.iloc[:1]]), path)
+
+    assert sorted(part.name for part in (tmp_path / f"tournaments{extension}").iterdir()) == [
+        f"part-0000{number}{extension}" for number in range(3)
+    ]
+    assert (tmp_path / f"tournaments{extension}" / f"part-00000{extension}").stat().st_mtime_ns == first.st_mtime_ns
+    df = datasets.read(path)
+    assert df["tournament_id"].tolist() == ["a", "b", "a", "b", "a"]
+    assert df["start_date"].dtype == tournaments["start_date"].dtype
+
+    datasets.write_chunks(datasets.iter_chunks(path, chunksize=2), path)
+    assert len(list((tmp_path / f"tournaments{extension}").iterdir())) == 1
+    assert datasets.read(path)["tournament_id"].tolist() == ["a", "b", "a", "b", "a"]
@@ -0,0 +1,42 @@
+"""This module is for testing the incremental tournament discovery in discovery.py."""
+
+import pandas as pd
+from src.datacollection import discovery
+
+COLUMNS = ["tournament_id", "tournament_name", "rk9_id"]
+
+
+def test_only_new_and_newly_linked_tournaments_are_queued():
+    stored = pd.DataFrame(
+        [
+            ["a", "Worlds", "missing_rk9_id"],
+            ["b", "NAIC", "NA02"],
+            ["c", "EUIC", None],
+        ],
+        columns=COLUMNS,
+    )
+    live = pd.DataFrame(
+        [
+            ["d", "Regional", "RG01"],
+            ["e", "Special", "missing_rk9_id"],
+            ["a", "Worlds", "WC24"],
+            ["b", "NAIC", "NA02"],
+            ["c", "EUIC", "missing_rk9_id"],
+        ],
+        columns=COLUMNS,
+    )
+
+    merged, queue = discovery.diff_tournaments(live, stored)
+
+    assert list(queue["tournament_id"]) == ["d", "a"]
+    assert list(merged["tournament_id"]) == ["a", "b", "c", "d", "e"]
+    assert list(merged["rk9_id"][:2]) == ["WC24", "NA02"]
+
+
+def test_nothing_queued_when_listing_is_unchanged():
+    stored = pd.DataFrame([["b", "NAIC", "NA02"]], columns=COLUMNS)
+
+    merged, queue = discovery.diff_tournaments(stored.copy(), stored)
+
+    assert queue.empty
+    pd.testing.assert_frame_equal(merged, stored)
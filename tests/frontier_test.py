@@ -0,0 +1,87 @@
+"""This module is for testing the resumable teamlist crawl in frontier.py and scraper.py."""
+
+import pandas as pd
+import pytest
+from src.datacollection import frontier, httpclient, replay, scraper
+
+MEMBER = ["icon.png", "Incineroar", "N/A", "Ghost", "Intimidate", "Assault Vest", "Fake Out", "U-turn", "Flare Blitz", "Knock Off"]
+
+
+@pytest.fixture
+def standings():
+    return pd.DataFrame(
+        {
+            "tournament_id": ["t1"] * 5,
+            "player_id": ["p1", "p2", "p3", "p4", "p5"],
+            "team_list": ["T/aaa", "T/bbb", "Submitted", "T/aaa", None],
+        }
+    )
+
+
+def test_frontier_skips_placeholders_and_duplicates(tmp_path, standings):
+    crawl = frontier.CrawlFrontier(str(tmp_path / "frontier.sqlite"))
+
+    counts = crawl.add(zip(standings["team_list"], standings["tournament_id"], standings["player_id"]))
+
+    assert counts == {"queued": 2, "placeholders": 2, "duplicates": 1}
+    assert [row[0] for row in crawl.pending()] == ["T/aaa", "T/bbb"]
+
+
+def test_interrupted_crawl_resumes(tmp_path, monkeypatch, standings):
+    path = str(tmp_path / "frontier.sqlite")
+    fetched = []
+
+    def flaky_fetch(url):
+        fetched.append(url)
+        if url.endswith("bbb") and len(fetched) <= 2:
+            raise ConnectionError("connection reset")
+        return [MEMBER]
+
+    monkeypatch.setattr(scraper, "fetch_team_members", flaky_fetch)
+
+    first = scraper.fetch_team_data(standings, frontier_path=path, max_workers=1)
+    second = scraper.fetch_team_data(standings, frontier_path=path, max_workers=1)
+
+    assert [row[1] for row in first[1:]] == ["p1"]
+    assert [row[1] for row in second[1:]] == ["p1", "p2"]
+    assert fetched.count(scraper.teamlist_url("T/aaa")) == 1
+    assert second[0] == scraper.TEAM_COLUMNS
+
+
+def test_resumable_crawl_keeps_a_bounded_window_in_flight(tmp_path, monkeypatch):
+    standings = pd.DataFrame({"tournament_id": ["t1"] * 20, "player_id": [f"p{i}" for i in range(20)], "team_list": [f"T/{i}" for i in range(20)]})
+    counts = {"submitted": 0, "done": 0, "in_flight": 0}
+    teamlist_url, mark_done = scraper.teamlist_url, frontier.CrawlFrontier.mark_done
+
+    def counted_url(team_list):
+        counts["submitted"] += 1
+        counts["in_flight"] = max(counts["in_flight"], counts["submitted"] - counts["done"])
+        return teamlist_url(team_list)
+
+    def counted_done(self, *args):
+        counts["done"] += 1
+        return mark_done(self, *args)
+
+    monkeypatch.setattr(scraper, "fetch_team_members", lambda url: [MEMBER])
+    monkeypatch.setattr(scraper, "teamlist_url", counted_url)
+    monkeypatch.setattr(frontier.CrawlFrontier, "mark_done", counted_done)
+
+    rows = scraper.fetch_team_data_resumable(standings, str(tmp_path / "frontier.sqlite"), max_workers=2, max_in_flight=3)
+
+    assert len(rows) == 21 and counts["done"] == 20
+    assert counts["in_flight"] <= 3
+
+
+def test_error_pages_are_marked_failed_and_retried(tmp_path, standings):
+    corpus = replay.Corpus(str(tmp_path / "corpus"))
+    corpus.add(scraper.teamlist_url("T/aaa"), "<html>not a teamlist</html>", status=404)
+    corpus.add(scraper.teamlist_url("T/bbb"), "<html>try again later</html>", status=503)
+    path = str(tmp_path / "frontier.sqlite")
+
+    with replay.offline(corpus.corpus_dir, client=httpclient.HttpClient(max_retries=1, backoff_factor=0)):
+        rows = scraper.fetch_team_data(standings, frontier_path=path, max_workers=1)
+
+    crawl = frontier.CrawlFrontier(path)
+    assert rows == [scraper.TEAM_COLUMNS]
+    assert sorted(row[0] for row in crawl.pending()) == ["T/aaa", "T/bbb"]
+    crawl.close()
@@ -0,0 +1,118 @@
+"""This module is for testing the shared HTTP client in httpclient.py."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from src.datacollection import httpcache, httpclient, ratelimit
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures = {}
+    downloads = 0
+
+    def do_GET(self):
+        if self.path.startswith("/etag"):
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            Handler.downloads += 1
+
+        remaining = Handler.failures.get(self.path, 0)
+        if remaining:
+            Handler.failures[self.path] = remaining - 1
+            status, body = 503, b"busy"
+        else:
+            status, body = 200, b'{"path": "%s"}' % self.path.encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_connections_are_reused(server):
+    client = httpclient.HttpClient()
+
+    for i in range(5):
+        assert client.get_json(f"{server}/pokemon/{i}") == {"path": f"/pokemon/{i}"}
+
+    stats = client.stats()["127.0.0.1"]
+    assert stats["requests"] == 5
+    assert stats["connections"] == 1
+    assert stats["reused"] == 4
+
+
+def test_retries_retryable_status(server):
+    client = httpclient.HttpClient(backoff_factor=0)
+    Handler.failures["/flaky"] = 2
+
+    response = client.get(f"{server}/flaky")
+
+    assert response.status_code == 200
+    assert client.stats()["127.0.0.1"]["retries"] == 2
+
+
+def test_any_request_error_frees_the_limiter_slot(server, monkeypatch):
+    limiter = ratelimit.RateLimiter({"127.0.0.1": {"rate": 100, "max_concurrency": 1}})
+    client = httpclient.HttpClient(rate_limiter=limiter)
+
+    def fail(*args, **kwargs):
+        raise requests.exceptions.ChunkedEncodingError("connection broken mid-body")
+
+    monkeypatch.setattr(client.session, "get", fail)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        client.get(f"{server}/broken")
+    monkeypatch.undo()
+
+    assert limiter.for_host("127.0.0.1").active == 0
+    assert client.get(f"{server}/after").status_code == 200
+
+
+def test_cache_serves_fresh_entries_and_revalidates_stale_ones(server, tmp_path):
+    cache = httpcache.ResponseCache(str(tmp_path), ttl_rules=[(r"/etag/fresh", None)], default_ttl=0)
+    client = httpclient.HttpClient(cache=cache)
+    Handler.downloads = 0
+
+    first = client.get_json(f"{server}/etag/fresh")
+    second = client.get(f"{server}/etag/fresh")
+    assert second.from_cache and second.json() == first
+
+    client.get(f"{server}/etag/stale")
+    revalidated = client.get(f"{server}/etag/stale")
+    assert revalidated.from_cache and revalidated.json() == {"path": "/etag/stale"}
+
+    assert Handler.downloads == 2
+    assert client.cache_stats() == {"hits": 1, "revalidated": 1, "misses": 2}
+
+
+def test_cache_evicts_least_recently_used(server, tmp_path):
+    cache = httpcache.ResponseCache(str(tmp_path), max_size=30, ttl_rules=[(r".", None)])
+    client = httpclient.HttpClient(cache=cache)
+
+    for name in ("a", "b", "c"):
+        client.get(f"{server}/{name}")
+        client.get(f"{server}/a")
+
+    assert cache.size() <= 30
+    assert cache.lookup(f"{server}/a") is not None
+    assert cache.lookup(f"{server}/b") is None
@@ -0,0 +1,53 @@
+"""This module is for testing the content-addressed image store in images.py."""
+
+import hashlib
+import os
+
+import pandas as pd
+from src.datacollection import images, replay
+
+PNG = b"\x89PNG\r\n\x1a\nfake pikachu"
+OTHER_PNG = b"\x89PNG\r\n\x1a\nfake incineroar"
+
+PIKACHU = "https://storage.googleapis.com/sprites/broadcast/025_000.png"
+PIKACHU_MIRROR = "https://raw.githubusercontent.com/sprites/25.png"
+INCINEROAR = "https://storage.googleapis.com/sprites/broadcast/727_000.png"
+
+
+def test_sync_downloads_unique_images_once_and_rewrites_columns(tmp_path):
+    corpus = replay.Corpus(str(tmp_path / "corpus"))
+    for url, body in [(PIKACHU, PNG), (PIKACHU_MIRROR, PNG), (INCINEROAR, OTHER_PNG)]:
+        corpus.add(url, body, content_type="image/png")
+    teams = pd.DataFrame(
+        {"pokemon": ["Pikachu", "Incineroar", "Pikachu", "Pikachu"], "icon": [PIKACHU, INCINEROAR, PIKACHU, PIKACHU_MIRROR]}
+    )
+    store = images.ImageStore(str(tmp_path / "images"))
+
+    with replay.offline(corpus.corpus_dir) as server:
+        rewritten, counts = images.sync_columns(teams, ["icon"], store, max_workers=4)
+        again = store.sync(teams["icon"])
+
+    key = hashlib.sha256(PNG).hexdigest() + ".png"
+    assert counts["downloaded"] == 3 and counts["failed"] == 0
+    assert again["downloaded"] == 0 and again["stored"] == 3
+    assert server.counters["served"] == 3
+    assert list(rewritten["icon"]) == [key, hashlib.sha256(OTHER_PNG).hexdigest() + ".png", key, key]
+    assert len(os.listdir(os.path.join(store.root, images.OBJECTS_DIR))) == 2
+    with open(store.path(key), "rb") as file:
+        assert file.read() == PNG
+    assert store.rewrite(rewritten, ["icon"]).equals(rewritten)
+
+
+def test_failed_downloads_keep_their_url(tmp_path):
+    corpus = replay.Corpus(str(tmp_path / "corpus"))
+    corpus.add(PIKACHU, PNG, content_type="image/png")
+    df = pd.DataFrame({"sprite": [PIKACHU, INCINEROAR, None]})
+    store = images.ImageStore(str(tmp_path / "images"))
+
+    with replay.offline(corpus.corpus_dir):
+        rewritten, counts = images.sync_columns(df, ["sprite"], store)
+
+    assert counts["downloaded"] == 1 and counts["failed"] == 1
+    assert counts["errors"][0][0] == INCINEROAR
+    assert rewritten["sprite"][1] == INCINEROAR
+    assert pd.isna(rewritten["sprite"][2])
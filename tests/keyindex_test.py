@@ -0,0 +1,140 @@
+"""This module is for testing the idempotent appends of keyindex.py."""
+
+import pandas as pd
+from src.datacollection import keyindex
+
+KEY = ["tournament_id", "player_id"]
+
+
+def standings(rows):
+    return pd.DataFrame(rows, columns=["tournament_id", "player_id", "trainer_name", "standing"])
+
+
+def test_appending_the_same_rows_twice_stores_them_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "standings.csv")
+    first = standings([["t1", "p1", "Ash", 1], ["t1", "p2", "Misty", 2], ["t1", "p2", "Misty", 2]])
+
+    assert keyindex.append_unique(first, path, KEY) == {"appended": 2, "skipped": 0, "replaced": 0}
+
+    def read(*args, **kwargs):
+        raise AssertionError("the dataset should not be read back")
+
+    monkeypatch.setattr(keyindex.datasets, "read", read)
+    counts = keyindex.append_unique(standings([["t1", "p1", "Ash", 1], ["t2", "p1", "Ash", 5]]), path, KEY)
+
+    assert counts == {"appended": 1, "skipped": 1, "replaced": 0}
+    monkeypatch.undo()
+    stored = pd.read_csv(path)
+    assert list(zip(stored["tournament_id"], stored["player_id"])) == [("t1", "p1"), ("t1", "p2"), ("t2", "p1")]
+
+
+def test_replace_keeps_only_the_newest_row_of_a_key(tmp_path):
+    path = str(tmp_path / "standings.csv")
+    keyindex.append_unique(standings([["t1", "p1", "Ash", 3], ["t1", "p2", "Misty", 4]]), path, KEY, replace=True)
+
+    counts = keyindex.append_unique(standings([["t1", "p1", "Ash", 1], ["t1", "p2", "Misty", 4]]), path, KEY, replace=True)
+
+    assert counts == {"appended": 0, "skipped": 1, "replaced": 1}
+    stored = pd.read_csv(path)
+    assert sorted(zip(stored["player_id"], stored["standing"])) == [("p1", 1), ("p2", 4)]
+
+
+def test_replacing_a_row_appends_it_and_readers_drop_the_old_one(tmp_path, monkeypatch):
+    path = str(tmp_path / "standings.csv")
+    keyindex.append_unique(standings([["t1", f"p{i}", "Ash", i] for i in range(10)]), path, KEY, replace=True)
+
+    def rewrite(*args, **kwargs):
+        raise AssertionError("replacing a few rows should not rewrite the dataset")
+
+    monkeypatch.setattr(keyindex.datasets, "read", rewrite)
+    monkeypatch.setattr(keyindex.datasets, "write_chunks", rewrite)
+    counts = keyindex.append_unique(standings([["t1", "p3", "Ash", 30]]), path, KEY, replace=True)
+    monkeypatch.undo()
+
+    assert counts == {"appended": 0, "skipped": 0, "replaced": 1}
+    assert len(pd.read_csv(path)) == 11
+    latest = keyindex.read_latest(path, KEY)
+    assert len(latest) == 10 and latest.loc[latest["player_id"] == "p3", "standing"].tolist() == [30]
+    chunks = list(keyindex.iter_latest(path, KEY, memory_budget=1))
+    assert pd.concat(chunks, ignore_index=True).equals(latest)
+
+
+def test_index_is_rebuilt_when_the_dataset_changes_behind_its_back(tmp_path):
+    path = str(tmp_path / "standings.csv")
+    keyindex.append_unique(standings([["t1", "p1", "Ash", 1]]), path, KEY)
+    standings([["t1", "p1", "Ash", 1], ["t1", "p9", "Brock", 9]]).to_csv(path, index=False)
+
+    counts = keyindex.append_unique(standings([["t1", "p9", "Brock", 9], ["t1", "p3", "Gary", 3]]), path, KEY)
+
+    assert counts == {"appended": 1, "skipped": 1, "replaced": 0}
+    assert len(pd.read_csv(path)) == 3
+
+
+def test_group_digests_change_only_for_groups_whose_rows_changed(tmp_path):
+    path = str(tmp_path / "standings.csv")
+    keyindex.append_unique(standings([["t1", "p1", "Ash", 3], ["t10", "p1", "Brock", 1]]), path, KEY, replace=True)
+    before = keyindex.group_digests(path, KEY)
+
+    keyindex.append_unique(standings([["t1", "p2", "Misty", 4]]), path, KEY, replace=True)
+    appended = keyindex.group_digests(path, KEY)
+    keyindex.append_unique(standings([["t1", "p2", "Misty", 2]]), path, KEY, replace=True)
+    replaced = keyindex.group_digests(path, KEY)
+
+    assert sorted(before) == ["t1", "t10"]
+    assert appended["t10"] == replaced["t10"] == before["t10"]
+    assert len({before["t1"], appended["t1"], replaced["t1"]}) == 3
+    assert keyindex.group_digests(str(tmp_path / "missing.csv"), KEY) == {}
+
+
+def test_rows_read_back_from_disk_match_their_crawled_fingerprints(tmp_path):
+    path = str(tmp_path / "standings.csv")
+    crawled = pd.DataFrame(
+        [["t1", "p1", None, 1.0, "N/A"], ["t1", "p2", "Misty", None, "Water"], ["t1", "p3", "", 3, "Rock"]],
+        columns=["tournament_id", "player_id", "trainer_name", "standing", "type"],
+    )
+    keyindex.append_unique(crawled, path, KEY, replace=True)
+    index = keyindex.KeyIndex(keyindex.index_path(path), KEY)
+    index.clear()
+    index.sync(path)
+    index.close()
+
+    assert keyindex.append_unique(crawled, path, KEY, replace=True) == {"appended": 0, "skipped": 3, "replaced": 0}
+    assert keyindex.append_unique(crawled, path, KEY, replace=True)["replaced"] == 0
+
+
+def test_compaction_indexes_the_rows_it_writes_without_reading_them_back(tmp_path, monkeypatch):
+    path = str(tmp_path / "standings.csv")
+    keyindex.append_unique(standings([["t1", f"p{i}", "Ash", i] for i in range(4)]), path, KEY, replace=True)
+    keyindex.append_unique(standings([["t1", "p0", "Ash", 10]]), path, KEY, replace=True)
+    reads = []
+    iter_chunks = keyindex.datasets.iter_chunks
+    monkeypatch.setattr(keyindex.datasets, "iter_chunks", lambda *args, **kwargs: reads.append(args) or iter_chunks(*args, **kwargs))
+
+    assert keyindex.compact(path, KEY) == 1
+
+    assert len(reads) == 1
+    index = keyindex.KeyIndex(keyindex.index_path(path), KEY)
+    assert index.is_current(path) and len(index) == 4 and index.stale_count() == 0
+    index.close()
+    assert sorted(pd.read_csv(path)["standing"]) == [1, 2, 3, 10]
+
+
+def test_rewriting_a_dataset_in_place_reindexes_it_from_the_written_chunks(tmp_path, monkeypatch):
+    path = str(tmp_path / "standings.csv")
+    keyindex.append_unique(standings([["t1", f"p{i}", "Ash", i] for i in range(4)]), path, KEY, replace=True)
+    keyindex.append_unique(standings([["t1", "p0", "Ash", 10]]), path, KEY, replace=True)
+    renamed = (chunk.assign(trainer_name="Red") for chunk in keyindex.iter_latest(path, KEY, memory_budget=64))
+
+    def sync(self, dataset_path):
+        raise AssertionError("the rewritten dataset should not be read back")
+
+    monkeypatch.setattr(keyindex.KeyIndex, "sync", sync)
+    assert keyindex.write_indexed(renamed, path, KEY) == 4
+    monkeypatch.undo()
+
+    index = keyindex.KeyIndex(keyindex.index_path(path), KEY)
+    assert index.is_current(path) and len(index) == 4 and index.stale_count() == 0
+    rows, counts = index.select(standings([["t1", "p1", "Red", 1], ["t1", "p2", "Ash", 2]]), replace=True)
+    assert rows["player_id"].tolist() == ["p2"] and counts["replaced"] == 1
+    index.close()
+    assert pd.read_csv(path)["trainer_name"].tolist() == ["Red"] * 4
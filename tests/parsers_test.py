@@ -0,0 +1,80 @@
+"""This module is for testing the table parsing backends in parsers.py."""
+
+import os
+
+import pytest
+from src.datacollection import parsers, scraper
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+ROSTER_HTML = """
+<table>
+<tr><th>ID</th><th>First</th><th>Last</th><th>Country</th><th>Division</th><th>Trainer</th><th>Team</th><th>Standing</th></tr>
+<tr><td>1.....2</td><td> ash </td><td>ketchum</td><td>US</td><td>Masters</td><td>ash</td>
+<td><a href="/teamlist/public/NA02/abc">View</a></td><td>1</td></tr>
+<tr><td>3.....4</td><td>misty</td><td>waterflower</td><td>Seniors</td><td>misty &amp; co</td>
+<td>Submitted</td><td>2</td></tr>
+</table>
+"""
+
+EVENTS_HTML = """
+<table>
+<tr><td>June 7–9, 2024</td><td><img src="/static/images/naic.png"></td><td>NAIC 2024</td><td>New Orleans, US</td>
+<td><a href="/tournament/NA02TCG">TCG</a> <a href="/tournament/NA02">VG</a></td></tr>
+<tr><td>August 16–18, 2024</td><td></td><td>Worlds 2024</td><td>Honolulu, US</td><td></td></tr>
+</table>
+"""
+
+
+@pytest.mark.parametrize("backend", sorted(parsers.BACKENDS))
+def test_backends_match_soup_roster(backend):
+    expected = parsers.parse_roster(ROSTER_HTML, "t1", "soup")
+
+    assert parsers.parse_roster(ROSTER_HTML, "t1", backend) == expected
+    assert [row[4] for row in expected] == ["US", None]
+    assert [row[7] for row in expected] == ["NA02/abc", "Submitted"]
+    assert expected[1][6] == "misty & co"
+
+
+@pytest.mark.parametrize("backend", sorted(parsers.BACKENDS))
+def test_backends_match_soup_events(backend):
+    data = scraper.fetch_all_tournament_data(EVENTS_HTML, backend)
+
+    assert data == scraper.fetch_all_tournament_data(EVENTS_HTML, "soup")
+    assert [row[3] for row in data[1:]] == ["NA02", None]
+    assert [row[6] for row in data[1:]] == ["rk9.gg/static/images/naic.png", None]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        parsers.table_rows(ROSTER_HTML, "regex")
+
+
+def test_teamlist_extractor_matches_soup():
+    with open(os.path.join(DATA_DIR, "teamlist.html"), encoding="utf-8") as file:
+        html = file.read()
+
+    members = parsers.parse_teamlist(html)
+
+    assert members == parsers.parse_teamlist(html, "soup")
+    assert len(members) == 6
+    assert members[2].pokemon == "Urshifu" and members[2].form == "Rapid Strike Style"
+    assert members[1].ability == "Intimidate"
+
+
+def test_teamlist_extractor_handles_incomplete_sets():
+    html = """
+    <div class="pokemon bg-light-green-50 p-3">
+      <img src="/sprites/025_000.png" /><!-- broadcast sprite -->
+      Pikachu
+      <br /><b>Ability:</b> Lightning Rod<br />
+      <h5><span class="badge">Fake Out</span> <span class="badge">Protect</span></h5>
+    </div>
+    """
+
+    (member,) = parsers.parse_teamlist(html)
+
+    assert member == parsers.TeamMember(
+        "/sprites/025_000.png", "Pikachu", "N/A", None, "Lightning Rod", None, "Fake Out", "Protect", None, None
+    )
+    assert parsers.parse_teamlist("") == []
@@ -0,0 +1,93 @@
+"""This module is for testing the staged fetch/parse/write pipeline in pipeline.py."""
+
+import concurrent.futures
+import concurrent.futures.process
+import os
+
+import pandas as pd
+import pytest
+from src.datacollection import pipeline, replay, scraper
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+with open(os.path.join(DATA_DIR, "teamlist.html"), encoding="utf-8") as file:
+    TEAMLIST_HTML = file.read()
+
+
+def test_pipeline_parses_in_worker_processes():
+    pages = {f"T/{i}": TEAMLIST_HTML for i in range(20)}
+    pages["T/broken"] = None
+    written = {}
+
+    def fetch(item):
+        if pages[item] is None:
+            raise ConnectionError("reset")
+        return pages[item]
+
+    def write(item, parsed, error):
+        written[item] = error if error is not None else parsed
+
+    staged = pipeline.StagedPipeline(fetch, scraper.parse_team_members, write, fetch_workers=4, parse_workers=2, batch_size=3)
+    stats = staged.run(pages)
+
+    assert len(written) == 21
+    assert isinstance(written["T/broken"], ConnectionError)
+    assert written["T/0"] == scraper.parse_team_members(TEAMLIST_HTML)
+    assert (stats["fetch"].items, stats["fetch"].errors) == (20, 1)
+    assert stats["parse"].items == 20
+    assert stats["write"].items == 21
+
+
+def test_an_executor_passed_in_is_left_running():
+    written = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        staged = pipeline.StagedPipeline(str, str.upper, lambda item, parsed, error: written.append(parsed), executor=executor)
+        staged.run(["a", "b"])
+
+        assert sorted(written) == ["A", "B"]
+        assert executor.submit(str.lower, "C").result() == "c"
+
+
+def test_a_broken_pool_is_raised_instead_of_dropping_items():
+    class BreakingExecutor(concurrent.futures.ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            if self.submitted:
+                raise concurrent.futures.process.BrokenProcessPool("a parser process died")
+            self.submitted = True
+            return super().submit(*args, **kwargs)
+
+    written = []
+    with BreakingExecutor(max_workers=1) as executor:
+        executor.submitted = False
+        staged = pipeline.StagedPipeline(
+            str, str.upper, lambda item, parsed, error: written.append(parsed), fetch_workers=1, batch_size=1, executor=executor
+        )
+        with pytest.raises(concurrent.futures.process.BrokenProcessPool):
+            staged.run(["a", "b", "c"])
+
+    assert written == ["A"]
+
+
+def test_staged_team_crawl_matches_threaded_crawl(tmp_path):
+    corpus = replay.Corpus(str(tmp_path / "corpus"))
+    for team_list in ("NA02/aaa", "NA02/ccc"):
+        corpus.add(scraper.teamlist_url(team_list), TEAMLIST_HTML)
+    standings = pd.DataFrame(
+        {
+            "tournament_id": ["t1"] * 4,
+            "player_id": ["p1", "p2", "p3", "p4"],
+            "team_list": ["NA02/aaa", "Submitted", "NA02/ccc", "NA02/missing"],
+        }
+    )
+
+    with replay.offline(corpus.corpus_dir):
+        threaded = scraper.fetch_team_data(standings, max_workers=2)
+        staged = scraper.fetch_team_data_staged(standings, fetch_workers=2, parse_workers=2)
+        resumable = scraper.fetch_team_data_staged(
+            standings, frontier_path=str(tmp_path / "frontier.sqlite"), fetch_workers=2, parse_workers=2
+        )
+
+    assert staged[0] == threaded[0]
+    assert sorted(staged[1:]) == sorted(threaded[1:])
+    assert sorted(resumable[1:]) == sorted(threaded[1:])
+    assert len(staged) == 1 + 12
@@ -1,6 +1,94 @@
 """This module is for testing all functions in the pokeapi.py module."""
 
+import time
+
 import pytest
 import requests
 from src.datacollection import pokeapi
 
+
+
+def fake_move(i):
+    return {
+        "name": f"move-{i}",
+        "type": {"name": "normal"},
+        "damage_class": {"name": "physical"},
+        "power": i,
+        "accuracy": 100,
+        "effect_entries": [{"language": {"name": "en"}, "effect": f"Effect {i}", "short_effect": f"Short {i}"}],
+    }
+
+
+@pytest.fixture
+def fake_moves(monkeypatch):
+    """Serves fake move resources with delays that make later IDs finish first. IDs divisible by 100 fail."""
+
+    def get_json(url):
+        i = int(url.rstrip("/").rsplit("/", 1)[-1])
+        time.sleep((1000 - i) / 2000000)
+        if i % 100 == 0:
+            raise requests.HTTPError(f"404 for {url}")
+        return fake_move(i)
+
+    monkeypatch.setattr(pokeapi.httpclient, "get_json", get_json)
+
+
+def test_concurrent_fetch_matches_sequential_order(fake_moves):
+    errors = {}
+
+    concurrent = pokeapi.fetch_move_api(range(1, 920), max_workers=16, errors=errors)
+    sequential = pokeapi.fetch_move_api(range(1, 920), max_workers=1)
+
+    assert concurrent == sequential
+    assert [row[0] for row in concurrent[1:]] == [i for i in range(1, 920) if i % 100]
+    assert concurrent[1] == [1, "Move 1", "normal", "physical", 1, 100, "Effect 1", "Short 1"]
+    assert sorted(errors) == list(range(100, 920, 100))
+    assert "404" in errors[100]
+
+
+def test_fetch_in_order_leaves_out_skipped_ids(capsys):
+    rows = pokeapi.fetch_in_order(range(6), lambda i: [i] if i % 2 else None, "items", max_workers=3)
+
+    assert rows == [[1], [3], [5]]
+    assert "Fetched 3 items" in capsys.readouterr().out
+
+
+def test_discovery_follows_list_endpoints(monkeypatch):
+    api = pokeapi.API_URL
+    pages = {
+        f"{api}pokemon/?limit=2&offset=0": {
+            "results": [{"url": f"{api}pokemon/1/"}, {"url": f"{api}pokemon/2/"}],
+            "next": f"{api}pokemon/?limit=2&offset=2",
+        },
+        f"{api}pokemon/?limit=2&offset=2": {"results": [{"url": f"{api}pokemon/10001/"}], "next": None},
+        f"{api}item-category/held-items/": {"items": [{"url": f"{api}item/191/"}, {"url": f"{api}item/197/"}]},
+        f"{api}item-category/species-specific/": {"items": [{"url": f"{api}item/197/"}]},
+        f"{api}item-category/memories/": {"items": []},
+        f"{api}item-attribute/holdable/": {"items": [{"url": f"{api}item/126/"}]},
+        f"{api}item-attribute/holdable-active/": {"items": [{"url": f"{api}item/191/"}]},
+    }
+    monkeypatch.setattr(pokeapi.httpclient, "get_json", pages.__getitem__)
+
+    assert pokeapi.list_resources("pokemon", page_size=2) == [1, 2]
+    assert pokeapi.held_item_candidates() == [126, 191, 197]
+
+
+def test_moves_without_an_effect_anywhere_are_left_out(monkeypatch):
+    def get_json(url):
+        move = fake_move(int(url.rstrip("/").rsplit("/", 1)[-1]))
+        move["effect_entries"] = [] if move["power"] > 1 else move["effect_entries"]
+        return move
+
+    class Fallback:
+        def effects(self, titles):
+            return {title: "Found\n" for title in titles if title == "Move 2 (move)"}
+
+    monkeypatch.setattr(pokeapi.httpclient, "get_json", get_json)
+    monkeypatch.setattr(pokeapi.bulbapedia, "get_fallback", Fallback)
+    errors = {}
+
+    moves = pokeapi.fetch_move_api([1, 2, 3], max_workers=1, errors=errors)
+
+    assert [row[0] for row in moves[1:]] == [1, 2]
+    assert moves[2][6] == "Found"
+    assert list(errors) == [3]
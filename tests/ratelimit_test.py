@@ -0,0 +1,52 @@
+"""This module is for testing the adaptive rate limiter in ratelimit.py."""
+
+import time
+
+from src.datacollection import httpclient, ratelimit
+
+
+def test_concurrency_grows_while_healthy_and_halves_on_throttling():
+    limiter = ratelimit.HostLimiter(rate=1000, burst=1000, max_concurrency=8, initial_concurrency=2)
+
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(200, 0.01)
+    grown = limiter.limit
+    assert grown > 4
+
+    limiter.acquire()
+    limiter.release(429, 0.01)
+    limiter.acquire()
+    limiter.release(503, 0.01)
+
+    assert limiter.limit == grown / 2
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_retry_after_pauses_the_host():
+    limiter = ratelimit.HostLimiter(rate=1000, burst=1000)
+
+    limiter.acquire()
+    limiter.release(429, 0.01, retry_after=0.2)
+
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+
+
+def test_token_bucket_caps_the_rate():
+    limiter = ratelimit.HostLimiter(rate=50, burst=1, max_concurrency=4)
+
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+        limiter.release(200, 0.001)
+
+    assert time.monotonic() - start >= 0.09
+
+
+def test_parse_retry_after():
+    assert httpclient.parse_retry_after("3") == 3.0
+    assert httpclient.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert httpclient.parse_retry_after("soon") is None
+    assert httpclient.parse_retry_after(None) is None
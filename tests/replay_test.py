@@ -0,0 +1,63 @@
+"""This module is for running the rk9 crawl end-to-end against the replay server in replay.py."""
+
+import os
+
+import pandas as pd
+import pytest
+import requests
+from src.datacollection import httpclient, replay, scraper
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def read_fixture(name):
+    with open(os.path.join(DATA_DIR, name), encoding="utf-8") as file:
+        return file.read()
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    corpus = replay.Corpus(str(tmp_path / "corpus"))
+    corpus.add("https://rk9.gg/roster/NA02", read_fixture("roster.html"))
+    corpus.add("https://rk9.gg/teamlist/public/NA02/aaa", read_fixture("teamlist.html"))
+    corpus.add("https://rk9.gg/teamlist/public/NA02/ccc", read_fixture("teamlist.html"))
+    return corpus
+
+
+def test_offline_crawl_of_standings_and_teams(corpus):
+    tournaments = pd.DataFrame({"tournament_id": ["t1"], "rk9_id": ["NA02"]})
+
+    with replay.offline(corpus.corpus_dir) as server:
+        standings = scraper.fetch_standings_data(tournaments)
+        teams = scraper.fetch_team_data(standings, max_workers=2)
+
+    assert list(standings["team_list"]) == ["NA02/aaa", "Submitted", "NA02/ccc"]
+    assert list(standings["country"].fillna("")) == ["US", "", "JP"]
+    assert len(teams) == 1 + 12
+    assert sorted({row[1] for row in teams[1:]}) == sorted(standings["player_id"][[0, 2]])
+    assert server.counters == {"served": 3, "missing": 0, "errors": 0}
+
+
+def test_injected_errors_are_retried(corpus):
+    client = httpclient.HttpClient(backoff_factor=0, max_retries=8)
+
+    with replay.offline(corpus.corpus_dir, error_rate=0.5, seed=1, client=client) as server:
+        html = scraper.fetch_html("https://rk9.gg/roster/NA02")
+
+    assert html == read_fixture("roster.html")
+    assert server.counters["errors"] > 0
+
+
+def test_recording_captures_responses(corpus, tmp_path):
+    recorded_dir = str(tmp_path / "recorded")
+
+    with replay.ReplayServer(corpus) as server:
+        client = httpclient.HttpClient(replay_base=server.url)
+        with replay.recording(recorded_dir, client=client):
+            scraper.fetch_html("https://rk9.gg/roster/NA02")
+            with pytest.raises(requests.HTTPError):
+                scraper.fetch_html("https://rk9.gg/roster/UNKNOWN")
+
+    recorded = replay.Corpus(recorded_dir)
+    assert recorded.get("https://rk9.gg/roster/NA02")[2].decode() == read_fixture("roster.html")
+    assert recorded.get("https://rk9.gg/roster/UNKNOWN")[0] == 404
@@ -0,0 +1,88 @@
+"""This module is for testing the rk9 crawling functions in scraper.py."""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+from src.datacollection import scraper
+
+ROSTER_HTML = """
+<table>
+<tr><th>ID</th><th>First</th><th>Last</th><th>Country</th><th>Division</th><th>Trainer</th><th>Team</th><th>Standing</th></tr>
+<tr><td>1.....2</td><td>ash</td><td>ketchum</td><td>US</td><td>Masters</td><td>ash</td>
+<td><a href="/teamlist/public/{rk9_id}/abc">View</a></td><td>1</td></tr>
+<tr><td>3.....4</td><td>misty</td><td>waterflower</td><td>CA</td><td>Masters</td><td>misty</td>
+<td></td><td>2</td></tr>
+</table>
+"""
+
+
+@pytest.fixture
+def rosters(monkeypatch):
+    def fake_fetch_html(url):
+        rk9_id = url.rsplit("/", 1)[-1]
+        if rk9_id == "BROKEN":
+            raise ConnectionError("roster unavailable")
+        # Make earlier tournaments slower so completion order differs from input order.
+        time.sleep(0.05 if rk9_id == "A" else 0)
+        return ROSTER_HTML.format(rk9_id=rk9_id)
+
+    monkeypatch.setattr(scraper, "fetch_html", fake_fetch_html)
+
+
+def tournaments(*rk9_ids):
+    return pd.DataFrame(
+        {"tournament_id": [f"t{rk9_id}" for rk9_id in rk9_ids], "rk9_id": list(rk9_ids)}
+    )
+
+
+def test_concurrent_standings_match_sequential(rosters):
+    data = tournaments("A", "B", "C")
+
+    sequential = scraper.fetch_standings_data(data)
+    concurrent = scraper.fetch_standings_data(data, max_workers=3)
+
+    pd.testing.assert_frame_equal(sequential, concurrent)
+    assert list(concurrent["tournament_id"]) == ["tA", "tA", "tB", "tB", "tC", "tC"]
+    assert list(concurrent["team_list"][:2]) == ["A/abc", "Submitted"]
+
+
+def test_failed_roster_is_skipped(rosters):
+    data = tournaments("A", "BROKEN", "C", "missing_rk9_id")
+
+    standings = scraper.fetch_standings_data(data, max_workers=4)
+
+    assert list(standings["tournament_id"].unique()) == ["tA", "tC"]
+
+
+def test_team_rows_keep_a_bounded_window(monkeypatch):
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_fetch_team_members(url):
+        with lock:
+            active.append(url)
+            peak.append(len(active))
+        time.sleep(0.001)
+        with lock:
+            active.remove(url)
+        return [[url, "Pikachu"]]
+
+    monkeypatch.setattr(scraper, "fetch_team_members", fake_fetch_team_members)
+    standings = pd.DataFrame(
+        {
+            "tournament_id": ["t1"] * 200,
+            "player_id": [f"p{i}" for i in range(200)],
+            "team_list": [f"T/{i}" for i in range(199)] + ["Submitted"],
+        }
+    )
+
+    consumed = 0
+    for row in scraper.iter_team_rows([standings[:100], standings[100:]], max_workers=4, max_in_flight=8):
+        consumed += 1
+        assert row[2] == scraper.teamlist_url(f"T/{row[1][1:]}")
+
+    assert consumed == 199
+    assert max(peak) <= 4
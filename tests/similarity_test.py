@@ -0,0 +1,96 @@
+"""This module is for testing the MinHash/LSH similar-team index in similarity.py."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.datacollection import scraper, similarity
+from tests.usage_test import member
+
+
+def team(tournament, player, species, item="Sitrus Berry"):
+    return pd.DataFrame(
+        [member(tournament, player, name, item, moves=("Protect", "Fake Out", "Tailwind", f"{name} Move")) for name in species],
+        columns=scraper.TEAM_COLUMNS,
+    )
+
+
+def teams():
+    return pd.concat(
+        [
+            team("worlds", "a", ["Incineroar", "Amoonguss", "Rillaboom", "Urshifu", "Tornadus", "Flutter Mane"]),
+            team("worlds", "b", ["Incineroar", "Amoonguss", "Rillaboom", "Urshifu", "Tornadus", "Chien-Pao"]),
+            team("worlds", "c", ["Dondozo", "Tatsugiri", "Gholdengo", "Kingambit", "Pelipper", "Archaludon"], item="Leftovers"),
+            team("naic", "d", ["Incineroar", "Amoonguss", "Rillaboom", "Urshifu", "Tornadus", "Flutter Mane"], item="Choice Scarf"),
+        ],
+        ignore_index=True,
+    )
+
+
+def test_query_finds_the_same_neighbors_as_brute_force():
+    index = similarity.SimilarityIndex(":memory:")
+    assert index.update(teams()) == 4
+
+    query = team("query", "q", ["Incineroar", "Amoonguss", "Rillaboom", "Urshifu", "Tornadus", "Flutter Mane"])
+    found = index.query(query, k=3)
+
+    pd.testing.assert_frame_equal(found, index.brute_force(query, k=3))
+    assert found[["tournament_id", "player_id"]].values.tolist() == [["worlds", "a"], ["naic", "d"], ["worlds", "b"]]
+    assert found["similarity"].iloc[0] == 1.0
+    assert "c" not in set(index.query(query, k=4)["player_id"])
+
+
+def test_index_is_updated_per_tournament_and_persisted(tmp_path):
+    path = str(tmp_path / "similarity.sqlite")
+    df = teams()
+    index = similarity.SimilarityIndex(path)
+    index.update(df[df["tournament_id"] == "worlds"])
+    index.update(df[df["tournament_id"] == "naic"])
+    index.update(df[df["tournament_id"] == "naic"])
+    signatures = index.signatures.copy()
+    index.close()
+
+    reopened = similarity.SimilarityIndex(path)
+    assert len(reopened) == 4 and reopened.tournaments() == {"worlds", "naic"}
+    np.testing.assert_array_equal(reopened.signatures, signatures)
+    assert reopened.query(df[df["player_id"] == "c"], k=1).values.tolist() == [["worlds", "c", 1.0]]
+    reopened.close()
+
+    with pytest.raises(ValueError):
+        similarity.SimilarityIndex(path, num_perm=64, bands=16)
+
+
+def test_updates_only_write_the_database_until_queried(monkeypatch):
+    df = teams()
+    index = similarity.SimilarityIndex(":memory:")
+    index.update(df[df["player_id"] == "c"])
+    assert index.query(df[df["player_id"] == "c"], k=1)["player_id"].tolist() == ["c"]
+
+    loads = []
+    load = index._load
+    monkeypatch.setattr(index, "_load", lambda: loads.append(1) or load())
+    index.update(df[df["tournament_id"] == "naic"])
+    index.update(df[df["tournament_id"] == "worlds"])
+    assert len(index) == 4 and index.tournaments() == {"worlds", "naic"} and not loads
+
+    query = team("query", "q", ["Incineroar", "Amoonguss", "Rillaboom", "Urshifu", "Tornadus", "Flutter Mane"])
+    pd.testing.assert_frame_equal(index.query(query, k=3), index.brute_force(query, k=3))
+    assert index.query(query, k=1)["player_id"].tolist() == ["a"] and len(loads) == 1
+
+
+def test_digests_are_stored_with_the_teams():
+    df = teams()
+    index = similarity.SimilarityIndex(":memory:")
+    index.update(df[df["tournament_id"] == "worlds"], {"worlds": "v1"})
+    index.update(df[df["tournament_id"] == "naic"])
+
+    assert index.digests() == {"worlds": "v1"}
+    assert index.tournaments() == {"worlds", "naic"}
+
+
+def test_signatures_estimate_jaccard_similarity():
+    hasher = similarity.MinHasher(num_perm=512)
+    tokens = np.arange(100, dtype=np.uint64)
+    # The second set shares 50 of the 150 tokens of the union.
+    signatures = hasher.signatures(np.array([0, 100, 200]), np.concatenate([tokens, tokens + np.uint64(50)]))
+
+    assert abs((signatures[0] == signatures[1]).mean() - 1 / 3) < 0.08
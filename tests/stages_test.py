@@ -0,0 +1,96 @@
+"""This module is for testing the dependency-aware stage runner in stages.py."""
+
+import linecache
+import threading
+
+import pytest
+from src.datacollection import stages
+
+
+def writer(path, text, calls, barrier=None):
+    def run():
+        if barrier is not None:
+            barrier.wait(timeout=5)
+        calls.append(path)
+        with open(path, "w") as file:
+            file.write(text)
+
+    return run
+
+
+def test_independent_stages_run_in_parallel_and_unchanged_ones_are_skipped(tmp_path):
+    tournaments, standings, moves = (str(tmp_path / name) for name in ["tournaments.csv", "standings.csv", "moves.csv"])
+    source = {"text": "worlds"}
+    calls = []
+    # Both sources have to reach the barrier together, so the run only succeeds if they are started in parallel.
+    barrier = threading.Barrier(2)
+
+    def make_tournaments():
+        writer(tournaments, source["text"], calls, barrier)()
+
+    runner = stages.StageRunner(
+        [
+            stages.Stage("standings", writer(standings, "standings", calls), inputs=[tournaments], outputs=[standings]),
+            stages.Stage("tournaments", make_tournaments, outputs=[tournaments], max_age=0),
+            stages.Stage("moves", writer(moves, "moves", calls, barrier), outputs=[moves], max_age=3600),
+        ],
+        state_path=str(tmp_path / "stages.sqlite"),
+    )
+
+    first = runner.run()
+    assert {name: result.status for name, result in first.items()} == {
+        "tournaments": stages.RAN,
+        "moves": stages.RAN,
+        "standings": stages.RAN,
+    }
+    assert calls.index(standings) > calls.index(tournaments)
+
+    barrier = None
+    calls.clear()
+    second = runner.run()
+    assert [second[name].status for name in ["tournaments", "moves", "standings"]] == [stages.RAN, stages.SKIPPED, stages.SKIPPED]
+
+    source["text"] = "naic"
+    third = runner.run()
+    assert third["standings"].status == stages.RAN
+
+
+def test_stages_after_a_failure_are_blocked(tmp_path):
+    def fail():
+        raise RuntimeError("rk9 is down")
+
+    output = str(tmp_path / "teams.csv")
+    results = stages.StageRunner(
+        [
+            stages.Stage("standings", fail, outputs=[str(tmp_path / "standings.csv")]),
+            stages.Stage("teams", writer(output, "", []), inputs=[str(tmp_path / "standings.csv")], outputs=[output]),
+        ],
+        state_path=":memory:",
+    ).run()
+
+    assert results["standings"].status == stages.FAILED
+    assert results["teams"].status == stages.BLOCKED
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(ValueError):
+        stages.StageRunner(
+            [stages.Stage("a", print, inputs=["b.csv"], outputs=["a.csv"]), stages.Stage("b", print, inputs=["a.csv"], outputs=["b.csv"])],
+            state_path=":memory:",
+        )
+
+
+def test_code_hash_covers_the_listed_modules(tmp_path, monkeypatch):
+    module = tmp_path / "crawler.py"
+    module.write_text("def fetch():\n    return 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import crawler
+
+    def run():
+        crawler.fetch()
+
+    before = stages.code_hash(run, [crawler])
+    module.write_text("def fetch():\n    return 2\n")
+    linecache.clearcache()
+
+    assert stages.code_hash(run, [crawler]) != before
@@ -0,0 +1,102 @@
+"""This module is for testing the PokeAPI static dump backend in staticdump.py and pokeapi.py."""
+
+import json
+import os
+import tarfile
+
+import pytest
+from src.datacollection import pokeapi, staticdump
+
+
+def write_resource(root, path, data):
+    directory = os.path.join(root, "data", "api", "v2", path)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "index.json"), "w", encoding="utf-8") as file:
+        json.dump(data, file)
+
+
+def move(name):
+    return {
+        "name": name,
+        "type": {"name": "normal"},
+        "damage_class": {"name": "physical"},
+        "power": 40,
+        "accuracy": 100,
+        "effect_entries": [{"language": {"name": "en"}, "effect": f"{name} effect", "short_effect": f"{name} short"}],
+    }
+
+
+@pytest.fixture
+def dump_dir(tmp_path):
+    root = str(tmp_path / "api-data")
+    # The listing holds every move, so its next link must not be followed. Shadow moves (10001+) are left out.
+    write_resource(root, "move", {"count": 3, "next": "/api/v2/move/?offset=3&limit=3", "results": [
+        {"name": "pound", "url": "/api/v2/move/1/"},
+        {"name": "tackle", "url": "/api/v2/move/33/"},
+        {"name": "shadow-rush", "url": "/api/v2/move/10001/"},
+    ]})
+    write_resource(root, "move/1", move("pound"))
+    write_resource(root, "move/33", move("tackle"))
+
+    write_resource(root, "item-category", {"results": [
+        {"name": "held-items", "url": "/api/v2/item-category/12/"},
+        {"name": "species-specific", "url": "/api/v2/item-category/13/"},
+        {"name": "memories", "url": "/api/v2/item-category/44/"},
+    ]})
+    write_resource(root, "item-category/12", {"items": [{"url": "/api/v2/item/191/"}]})
+    write_resource(root, "item-category/13", {"items": []})
+    write_resource(root, "item-category/44", {"items": []})
+    write_resource(root, "item-attribute", {"results": [
+        {"name": "holdable", "url": "/api/v2/item-attribute/5/"},
+        {"name": "holdable-active", "url": "/api/v2/item-attribute/7/"},
+    ]})
+    write_resource(root, "item-attribute/5", {"items": [{"url": "/api/v2/item/126/"}]})
+    write_resource(root, "item-attribute/7", {"items": []})
+    write_resource(root, "item/126", {
+        "name": "cheri-berry", "category": {"name": "medicine"}, "attributes": [{"name": "consumable"}], "effect_entries": []
+    })
+    write_resource(root, "item/191", {
+        "name": "leftovers", "category": {"name": "held-items"}, "attributes": [], "effect_entries": [{"effect": "Heals"}]
+    })
+    return root
+
+
+@pytest.fixture
+def no_network(monkeypatch):
+    def fail(url, **kwargs):
+        raise AssertionError(f"unexpected request to {url}")
+
+    monkeypatch.setattr(pokeapi.httpclient, "get_json", fail)
+    monkeypatch.setattr(pokeapi.httpclient, "get", fail)
+
+
+def test_game_data_is_read_from_the_dump_directory(dump_dir, no_network):
+    with pokeapi.static_dump(dump_dir):
+        moves = pokeapi.fetch_move_api()
+        items = pokeapi.fetch_held_item_api()
+
+    assert [row[:2] for row in moves[1:]] == [[1, "Pound"], [33, "Tackle"]]
+    assert moves[2][6:] == ["tackle effect", "tackle short"]
+    assert items[1:] == [[191, "leftovers", "Heals"]]
+
+
+def test_dump_tarball_matches_directory(dump_dir, tmp_path, no_network):
+    archive = str(tmp_path / "api-data-master.tar.gz")
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(dump_dir, arcname="api-data-master")
+
+    with pokeapi.static_dump(dump_dir):
+        from_directory = pokeapi.fetch_move_api()
+    with pokeapi.static_dump(archive):
+        from_archive = pokeapi.fetch_move_api()
+
+    assert from_archive == from_directory
+
+
+def test_missing_resources_raise(dump_dir):
+    dump = staticdump.StaticDump(dump_dir)
+
+    with pytest.raises(FileNotFoundError):
+        dump.get_json("https://pokeapi.co/api/v2/move/2/")
+    with pytest.raises(FileNotFoundError):
+        dump.get_json("https://pokeapi.co/api/v2/item-category/machines/")
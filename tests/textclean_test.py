@@ -0,0 +1,62 @@
+"""This module is for testing the single-pass text cleaning in textclean.py."""
+
+import re
+
+import pandas as pd
+from src.datacollection import textclean
+
+DESCRIPTIONS = pd.Series(
+    [
+        'Held items:\n  restores HP.  Used on a Pokémon: heals',
+        '  "Quoted"\ttext \n with   gaps :  and colons  ',
+        None,
+        float("nan"),
+        42,
+        "Ends with a colon:",
+        "",
+        " \u3000\xa0\x0b ",
+        "a::b : :c\xa0:\x1fd",
+    ],
+    index=[3, 5, 7, 11, 13, 17, 19, 23, 29],
+    name="item_description",
+)
+
+
+def chained(series):
+    """The item description cleaning as it was done before, one pandas .str call at a time."""
+
+    series = series.fillna("").astype(str)
+    series = series.str.split("Used on a", n=1).str[0]
+    series = series.str.replace("\n", "", regex=False).str.strip()
+    series = series.str.replace(r"\s*:\s*", ": ", regex=True)
+    series = series.str.replace(r"\s+", " ", regex=True)
+    return series.str.replace('"', "")
+
+
+def test_fused_rules_match_the_chained_pandas_calls():
+    cleaner = textclean.TextCleaner(
+        textclean.truncate("Used on a"),
+        textclean.remove("\n"),
+        textclean.strip(),
+        textclean.space_after(":"),
+        textclean.collapse_whitespace(),
+        textclean.remove('"'),
+    )
+
+    cleaned = cleaner.clean(DESCRIPTIONS)
+
+    pd.testing.assert_series_equal(cleaned, chained(DESCRIPTIONS), check_dtype=False)
+    assert cleaned[3] == "Held items: restores HP."
+    assert cleaned[7] == "" and cleaned[13] == "42"
+    assert cleaned[17] == "Ends with a colon: "
+    assert cleaned[23] == "" and cleaned[29] == "a: : b: : c: d"
+
+
+def test_rules_match_their_regular_expressions():
+    texts = ["", " ", " \t\n", "  lead", "trail\u2003", " both \xa0", "a  b\x1cc", ":", " : ", "x :y: z :"]
+    collapse = textclean.TextCleaner(textclean.collapse_whitespace())
+    colon = textclean.TextCleaner(textclean.space_after(":"))
+
+    for text in texts:
+        assert collapse(text) == re.sub(r"\s+", " ", text)
+        assert colon(text) == re.sub(r"\s*:\s*", ": ", text)
@@ -0,0 +1,94 @@
+"""This module is for testing the incremental usage statistics in usage.py."""
+
+import numpy as np
+import pandas as pd
+from src.datacollection import compact, scraper, usage
+
+
+def member(tournament, player, pokemon, item, tera="Grass", moves=("Protect", "Fake Out", "Tailwind", "Follow Me")):
+    return [tournament, player, None, pokemon, None, tera, "Intimidate", item, *moves]
+
+
+def teams():
+    return pd.DataFrame(
+        [
+            member("worlds", "a", "Incineroar", "Assault Vest"),
+            member("worlds", "a", "Amoonguss", "Sitrus Berry"),
+            member("worlds", "b", "Incineroar", "Safety Goggles", tera=None),
+            member("worlds", "b", "Amoonguss", "Rocky Helmet"),
+            member("worlds", "c", "Incineroar", "Assault Vest"),
+            member("naic", "d", "Incineroar", "Assault Vest"),
+            member("naic", "d", "Rillaboom", "Miracle Seed"),
+        ],
+        columns=scraper.TEAM_COLUMNS,
+    )
+
+
+def standings():
+    return pd.DataFrame(
+        {
+            "tournament_id": ["worlds", "worlds", "worlds", "naic"],
+            "player_id": ["a", "b", "c", "d"],
+            "division": ["Masters", "Masters", "Seniors", "Masters"],
+            "standing": [1, 40, 3, 12],
+        }
+    )
+
+
+def test_rollups_match_a_groupby_over_the_rows():
+    store = usage.UsageStore(":memory:")
+    assert store.update(teams(), standings()) == 3
+
+    stats = store.rollup()
+    assert stats.teams == 4
+    species = stats.species()
+    assert species.iloc[0].tolist() == ["Incineroar", 4, 1.0]
+    assert dict(zip(species["pokemon"], species["count"])) == teams()["pokemon"].value_counts().to_dict()
+
+    items = stats.partners("species_item", "Incineroar")
+    assert items.iloc[0].tolist() == ["Assault Vest", 3, 0.75]
+    assert stats.partners("species_tera", "Incineroar")["count"].tolist() == [3]
+    assert stats.cores().iloc[0][["pokemon1", "pokemon2", "count"]].tolist() == ["Incineroar", "Amoonguss", 2]
+
+    masters = store.rollup(divisions=["Masters"]).performance().set_index("pokemon")
+    assert masters.loc["Incineroar", "average_standing"] == (1 + 40 + 12) / 3
+    assert masters.loc["Incineroar", "top16"] == 2 / 3 and masters.loc["Amoonguss", "top8"] == 0.5
+    assert store.rollup(tournament_ids=["naic"]).species()["pokemon"].tolist() == ["Incineroar", "Rillaboom"]
+
+
+def test_updates_only_replace_the_tournaments_they_contain(tmp_path):
+    path = str(tmp_path / "usage.sqlite")
+    df = teams()
+    store = usage.UsageStore(path)
+    store.update(df[df["tournament_id"] == "worlds"], standings())
+    store.close()
+
+    # A new process restores the stored codes, so counts added later line up with the earlier ones.
+    store = usage.UsageStore(path, compact.Vocabularies())
+    store.update(df[df["tournament_id"] == "naic"], standings())
+    store.update(df[df["tournament_id"] == "naic"], standings())
+
+    assert store.tournaments() == {"worlds", "naic"}
+    stats = store.rollup()
+    assert stats.teams == 4
+    assert dict(zip(*stats.species(2)[["pokemon", "count"]].to_numpy().T)) == {"Incineroar": 4, "Amoonguss": 2}
+
+
+def test_digests_are_stored_with_the_counts():
+    df = teams()
+    store = usage.UsageStore(":memory:")
+    store.update(df[df["tournament_id"] == "worlds"], standings(), {"worlds": "v1"})
+    store.update(df[df["tournament_id"] == "worlds"], standings(), {"worlds": "v2"})
+    store.update(df[df["tournament_id"] == "naic"], standings())
+
+    assert store.digests() == {"worlds": "v2"}
+    assert store.tournaments() == {"worlds", "naic"}
+
+
+def test_team_pairs_counts_every_pair_once():
+    team = np.array([0, 0, 0, 1, 1])
+    species = np.array([5, 3, 9, 3, 5])
+
+    keys, counts = usage.count(usage.team_pairs(team, species))
+
+    assert dict(zip(map(tuple, np.column_stack(usage.unpack(keys)).tolist()), counts)) == {(3, 5): 2, (3, 9): 1, (5, 9): 1}